@@ -0,0 +1,142 @@
+"""
+Cache em memória (por processo) das leituras de formulários e perguntas.
+
+Guarda o JSON já serializado da árvore do formulário e de cada pergunta, e a
+estrutura usada para validar as respostas enviadas, com limite de entradas
+(LRU) e tempo de vida (TTL). As funções de escrita do CRUD invalidam as
+entradas afetadas logo após o commit.
+
+Uma leitura que não achou a entrada pega `cache.marca()` antes de ir ao banco e
+a repassa a `cache.set`: se alguma invalidação aconteceu no meio, o valor lido
+pode ser anterior à escrita e não é guardado (senão ficaria no cache até o TTL).
+
+Como o cache é local a cada processo, com vários workers uma escrita só
+invalida o cache do worker que a recebeu; os demais convergem pelo TTL.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from fastapi import Request
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", 1024))  # 0 desabilita o cache
+CACHE_TTL = float(os.getenv("CACHE_TTL", 60))
+
+
+class CacheLRU:
+    """Dicionário com limite de tamanho (descarta o menos usado) e expiração"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._invalidacoes = 0
+
+    @property
+    def habilitado(self) -> bool:
+        return self.maxsize > 0
+
+    def get(self, chave: Hashable):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                self.misses += 1
+                return None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._dados[chave]
+                self.misses += 1
+                return None
+            self._dados.move_to_end(chave)
+            self.hits += 1
+            return valor
+
+    def marca(self) -> int:
+        """Contador de invalidações, a ser repassado a `set` pela leitura que vai ao banco"""
+        return self._invalidacoes
+
+    def set(self, chave: Hashable, valor, marca: Optional[int] = None):
+        """Guarda o valor; com `marca`, só se não houve invalidação desde que ela foi obtida"""
+        if not self.habilitado:
+            return
+        with self._lock:
+            if marca is not None and marca != self._invalidacoes:
+                return
+            self._dados[chave] = (time.monotonic() + self.ttl, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *chaves: Hashable):
+        with self._lock:
+            self._invalidacoes += 1
+            for chave in chaves:
+                self._dados.pop(chave, None)
+
+    def clear(self):
+        with self._lock:
+            self._invalidacoes += 1
+            self._dados.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.habilitado,
+                "size": len(self._dados),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+cache = CacheLRU(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+
+
+def chave_formulario(formulario_id: int):
+    return ("formulario", formulario_id)
+
+
+def chave_pergunta(pergunta_id: int):
+    return ("pergunta", pergunta_id)
+
+
+def chave_estrutura(formulario_id: int):
+    # Perguntas e opções usadas para validar as respostas enviadas (app/ingestao.py)
+    return ("estrutura", formulario_id)
+
+
+def invalidar_formulario(formulario_id: Optional[int], perguntas_ids=()):
+    cache.invalidate(
+        chave_formulario(formulario_id),
+        chave_estrutura(formulario_id),
+        *(chave_pergunta(pergunta_id) for pergunta_id in perguntas_ids)
+    )
+
+
+def invalidar_pergunta(pergunta_id: int, *formularios_ids: Optional[int]):
+    """Invalida a pergunta e a árvore dos formulários que a contêm (ou continham)"""
+    cache.invalidate(
+        chave_pergunta(pergunta_id),
+        *(chave_formulario(formulario_id) for formulario_id in formularios_ids),
+        *(chave_estrutura(formulario_id) for formulario_id in formularios_ids)
+    )
+
+
+def cache_habilitado(request: Request) -> bool:
+    """
+    Dependency: permite ignorar o cache em uma requisição, para depuração,
+    enviando o cabeçalho `Cache-Control: no-cache`
+    """
+    return cache.habilitado and "no-cache" not in request.headers.get("cache-control", "").lower()
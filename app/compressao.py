@@ -0,0 +1,164 @@
+"""
+Compressão das respostas (brotli ou gzip) negociada pelo Accept-Encoding.
+
+Respostas JSON/texto a partir de `COMPRESSAO_MIN_BYTES` são comprimidas; em
+respostas em streaming (tamanho desconhecido) cada parte é comprimida e
+enviada assim que chega, sem acumular o corpo. Ao comprimir, um ETag forte
+vira fraco (W/"..."), já que os bytes enviados deixam de ser os da
+representação original; os ETags de `app.etag` já são fracos, então o 304
+traz o mesmo ETag do 200 comprimido.
+"""
+import os
+import zlib
+from typing import Optional
+
+from dotenv import load_dotenv
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele, apenas gzip
+    brotli = None
+
+load_dotenv()
+
+COMPRESSAO_MIN_BYTES = int(os.getenv("COMPRESSAO_MIN_BYTES", 1024))  # -1 desabilita
+COMPRESSAO_NIVEL_GZIP = int(os.getenv("COMPRESSAO_NIVEL_GZIP", 6))
+COMPRESSAO_NIVEL_BROTLI = int(os.getenv("COMPRESSAO_NIVEL_BROTLI", 4))
+
+_TIPOS_COMPRIMIVEIS = (b"application/json", b"application/x-ndjson", b"text/")
+
+
+def escolher_codificacao(accept_encoding: str) -> Optional[str]:
+    """"br" ou "gzip" conforme o Accept-Encoding (respeitando q=0), ou None"""
+    aceitas = {}
+    for item in accept_encoding.lower().split(","):
+        nome, _, parametros = item.strip().partition(";")
+        qualidade = 1.0
+        for parametro in parametros.split(";"):
+            chave, _, valor = parametro.strip().partition("=")
+            if chave == "q":
+                try:
+                    qualidade = float(valor)
+                except ValueError:
+                    qualidade = 0.0
+        aceitas[nome.strip()] = qualidade
+
+    candidatas = ["br", "gzip"] if brotli is not None else ["gzip"]
+    candidatas = [nome for nome in candidatas if aceitas.get(nome, aceitas.get("*", 0.0)) > 0]
+    if not candidatas:
+        return None
+    return max(candidatas, key=lambda nome: aceitas.get(nome, aceitas.get("*", 0.0)))
+
+
+class _Compressor:
+    def __init__(self, codificacao: str):
+        if codificacao == "br":
+            self._brotli = brotli.Compressor(quality=COMPRESSAO_NIVEL_BROTLI)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits=31: formato gzip (cabeçalho e CRC)
+            self._zlib = zlib.compressobj(COMPRESSAO_NIVEL_GZIP, zlib.DEFLATED, 31)
+
+    def parte(self, dados: bytes) -> bytes:
+        """Comprime e descarrega `dados`, para que o cliente já possa processá-los"""
+        if self._brotli is not None:
+            return self._brotli.process(dados) + self._brotli.flush()
+        return self._zlib.compress(dados) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def fim(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+    def tudo(self, dados: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(dados) + self._brotli.finish()
+        return self._zlib.compress(dados) + self._zlib.flush()
+
+
+def _comprimivel(headers: list) -> bool:
+    for nome, valor in headers:
+        if nome == b"content-encoding":
+            return False
+        if nome == b"content-type" and not valor.startswith(_TIPOS_COMPRIMIVEIS):
+            return False
+    return any(nome == b"content-type" for nome, _ in headers)
+
+
+def _headers_comprimidos(headers: list, codificacao: str, tamanho: Optional[int]) -> list:
+    novos = []
+    for nome, valor in headers:
+        if nome == b"content-length":
+            continue
+        if nome == b"etag" and valor.startswith(b'"'):
+            valor = b"W/" + valor
+        novos.append((nome, valor))
+    novos.append((b"content-encoding", codificacao.encode()))
+    novos.append((b"vary", b"Accept-Encoding"))
+    if tamanho is not None:
+        novos.append((b"content-length", str(tamanho).encode()))
+    return novos
+
+
+class MiddlewareCompressao:
+    """Middleware ASGI de compressão (ver docstring do módulo)"""
+
+    def __init__(self, app, minimo: int = COMPRESSAO_MIN_BYTES):
+        self.app = app
+        self.minimo = minimo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.minimo < 0:
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = next(
+            (valor.decode("latin-1") for nome, valor in scope["headers"] if nome == b"accept-encoding"), ""
+        )
+        codificacao = escolher_codificacao(accept_encoding)
+        if codificacao is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        compressor = None
+        repassar = False
+
+        async def send_comprimido(message):
+            nonlocal inicio, compressor, repassar
+            if message["type"] == "http.response.start":
+                # Segura o início até saber o tamanho do corpo
+                inicio = message
+                return
+            if message["type"] != "http.response.body" or repassar:
+                await send(message)
+                return
+
+            corpo = message.get("body", b"")
+            mais = message.get("more_body", False)
+
+            if compressor is None:
+                headers = list(inicio.get("headers", []))
+                if not _comprimivel(headers) or (not mais and len(corpo) < self.minimo):
+                    if _comprimivel(headers):
+                        inicio["headers"] = [*headers, (b"vary", b"Accept-Encoding")]
+                    repassar = True
+                    await send(inicio)
+                    await send(message)
+                    return
+                compressor = _Compressor(codificacao)
+                if not mais:
+                    comprimido = compressor.tudo(corpo)
+                    inicio["headers"] = _headers_comprimidos(headers, codificacao, len(comprimido))
+                    await send(inicio)
+                    await send({"type": "http.response.body", "body": comprimido})
+                    return
+                inicio["headers"] = _headers_comprimidos(headers, codificacao, None)
+                await send(inicio)
+
+            if mais:
+                await send({"type": "http.response.body", "body": compressor.parte(corpo), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": compressor.parte(corpo) + compressor.fim()})
+
+        await self.app(scope, receive, send_comprimido)
@@ -1,174 +1,1423 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc
-from typing import List, Optional
-from app.models import Formulario, Pergunta, OpcoesRespostas
+import base64
+import json
+import os
+import re
+from collections import Counter
+import orjson
+from sqlalchemy.orm import Session, selectinload, ColumnProperty
+from sqlalchemy import (
+    desc, asc, tuple_, select, insert, update, delete, func, true, literal, literal_column, or_, null, text, case, Integer
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from typing import List, Optional, Tuple
+from app import schemas
+from app.cache import (
+    cache, chave_formulario, chave_pergunta, chave_estrutura, invalidar_formulario, invalidar_pergunta
+)
+from app.ingestao import EstruturaFormulario, montar_estrutura
+from app.instrumentacao import medir_serializacao
+from app.models import Formulario, Pergunta, OpcoesRespostas, CONFIG_BUSCA
+from app.projecao import Projecao
 from app.schemas import (
     FormularioCreate, FormularioUpdate,
     PerguntaCreate, PerguntaUpdate, PerguntaFilter,
     OpcoesRespostasCreate, OpcoesRespostasUpdate,
-    TipoPerguntaEnum
+    TipoPerguntaEnum, ModoBuscaEnum
 )
 
 
+# Paginação por cursor (keyset)
+def _coluna_ordenacao(model, order_by: str):
+    coluna = getattr(model, order_by, None)
+    if isinstance(getattr(coluna, "property", None), ColumnProperty):
+        return coluna
+    return None
+
+
+def _aceita_cursor(coluna) -> bool:
+    # Comparação de tuplas com NULL não é confiável, então o cursor exige coluna NOT NULL
+    return coluna is not None and not coluna.property.columns[0].nullable
+
+
+def encode_cursor(item, order_by: str, order_desc: bool) -> str:
+    payload = {"o": order_by, "d": order_desc, "v": getattr(item, order_by), "id": item.id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str, order_desc: bool):
+    """Retorna (valor, id) do último item da página anterior ou levanta ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload["o"] != order_by or payload["d"] != order_desc:
+            raise ValueError("Cursor gerado para outra ordenação")
+        return payload["v"], payload["id"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
+
+
+def _ordenacao(model, order_by: str, order_desc: bool):
+    """Cláusulas ORDER BY (order_by, id); vazio se o campo não for uma coluna"""
+    coluna = _coluna_ordenacao(model, order_by)
+    if coluna is None:
+        return []
+    direcao = desc if order_desc else asc
+    return [direcao(coluna), direcao(model.id)]
+
+
+def _paginar(query, model, skip: int, limit: int, order_by: str, order_desc: bool, cursor: Optional[str] = None):
+    """
+    Ordena por (order_by, id) e pagina. Com cursor, busca a partir do último
+    item visto (WHERE (col, id) > (:v, :id)) em vez de descartar `skip` linhas.
+    """
+    coluna = _coluna_ordenacao(model, order_by)
+    if coluna is None:
+        if cursor:
+            raise ValueError(f"Campo de ordenação inválido: {order_by}")
+        return query.offset(skip).limit(limit)
+
+    query = query.order_by(*_ordenacao(model, order_by, order_desc))
+
+    if cursor:
+        if not _aceita_cursor(coluna):
+            raise ValueError(f"Paginação por cursor não suportada para o campo: {order_by}")
+        valor, ultimo_id = decode_cursor(cursor, order_by, order_desc)
+        chave = tuple_(coluna, model.id)
+        ultimo = tuple_(valor, ultimo_id, types=[coluna.type, model.id.type])
+        query = query.filter(chave < ultimo if order_desc else chave > ultimo)
+        return query.limit(limit)
+
+    return query.offset(skip).limit(limit)
+
+
+def cursor_proxima_pagina(model, items, limit: int, order_by: str = "ordem", order_desc: bool = False):
+    """Cursor opaco para a página seguinte, ou None se esta for a última"""
+    if len(items) < limit or not _aceita_cursor(_coluna_ordenacao(model, order_by)):
+        return None
+    return encode_cursor(items[-1], order_by, order_desc)
+
+
+# Versão dos formulários (ETag)
+def _stmt_incrementar_versao(*formularios_ids: Optional[int]):
+    ids = {formulario_id for formulario_id in formularios_ids if formulario_id is not None}
+    if not ids:
+        return None
+    return (
+        update(Formulario)
+        .where(Formulario.id.in_(ids))
+        .values(versao=Formulario.versao + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _stmt_versao_formulario(formulario_id: int):
+    return select(Formulario.versao).where(Formulario.id == formulario_id)
+
+
+def _stmt_versao_pergunta(pergunta_id: int):
+    # A versão de uma pergunta é a versão do formulário que a contém
+    return (
+        select(Formulario.versao)
+        .join(Pergunta, Pergunta.id_formulario == Formulario.id)
+        .where(Pergunta.id == pergunta_id)
+    )
+
+
+def _stmt_incrementar_versao_da_pergunta(pergunta_id: int):
+    # Formulário localizado pela pergunta no próprio UPDATE, que devolve seu id
+    formulario_id = select(Pergunta.id_formulario).where(Pergunta.id == pergunta_id).scalar_subquery()
+    return (
+        update(Formulario)
+        .where(Formulario.id == formulario_id)
+        .values(versao=Formulario.versao + 1)
+        .returning(Formulario.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _incrementar_versao(db: Session, *formularios_ids: Optional[int]):
+    """Marca os formulários como alterados, na mesma transação da escrita"""
+    stmt = _stmt_incrementar_versao(*formularios_ids)
+    if stmt is not None:
+        db.execute(stmt)
+
+
+def get_versao_formulario(db: Session, formulario_id: int) -> Optional[int]:
+    return db.execute(_stmt_versao_formulario(formulario_id)).scalar()
+
+
+def get_versao_pergunta(db: Session, pergunta_id: int) -> Optional[int]:
+    return db.execute(_stmt_versao_pergunta(pergunta_id)).scalar()
+
+
+# Escritas: um único INSERT/UPDATE/DELETE ... RETURNING com as colunas dos
+# schemas de resposta, sem SELECT para localizar a linha antes nem refresh
+# depois do commit. Nenhuma linha retornada significa item inexistente, e uma
+# referência a formulário ou pergunta inexistente aparece como violação de
+# chave estrangeira, tratada da mesma forma
+def _violacao_chave_estrangeira(erro: IntegrityError) -> bool:
+    # SQLSTATE 23503 no Postgres (psycopg2 e asyncpg expõem `pgcode`); o SQLite só informa na mensagem
+    return getattr(erro.orig, "pgcode", None) == "23503" or "FOREIGN KEY constraint failed" in str(erro.orig)
+
+
+def _stmt_atualizar(model, item_id: int, valores: dict, campos: Tuple[str, ...]):
+    """UPDATE ... RETURNING dos `campos`; sem valores a alterar, apenas lê a linha"""
+    colunas = _colunas(model, campos)
+    if not valores:
+        return select(*colunas).where(model.id == item_id)
+    return update(model).where(model.id == item_id).values(**valores).returning(*colunas)
+
+
+def _stmt_criar_formulario(formulario: FormularioCreate):
+    return insert(Formulario).values(**formulario.model_dump()).returning(*_colunas(Formulario, _CAMPOS_FORMULARIO_RESUMO))
+
+
+def _stmt_criar_pergunta(pergunta: PerguntaCreate):
+    return (
+        insert(Pergunta)
+        .values(**pergunta.model_dump(exclude={"opcoes_respostas"}))
+        .returning(*_colunas(Pergunta, _CAMPOS_PERGUNTA))
+    )
+
+
+def _stmt_criar_opcoes():
+    # Executado com a lista de opções (insertmanyvalues): as linhas voltam na ordem dos
+    # parâmetros. Colunas sem rótulo, que colidiriam com a coluna sentinela (id)
+    colunas = [getattr(OpcoesRespostas, campo) for campo in _CAMPOS_OPCAO]
+    return insert(OpcoesRespostas).returning(*colunas, sort_by_parameter_order=True)
+
+
+def _stmt_criar_opcao(pergunta_id: int, opcao: OpcoesRespostasCreate):
+    return (
+        insert(OpcoesRespostas)
+        .values(id_pergunta=pergunta_id, **opcao.model_dump())
+        .returning(*_colunas(OpcoesRespostas, _CAMPOS_OPCAO))
+    )
+
+
+def _valores_formulario(formulario: FormularioUpdate) -> dict:
+    return {**formulario.model_dump(exclude_unset=True), "versao": Formulario.versao + 1}
+
+
+def _json_formulario_atualizado(formulario_row, perguntas_rows, opcoes_rows) -> bytes:
+    return _formularios_lote_json([formulario_row], perguntas_rows, opcoes_rows)[formulario_row.id][1]
+
+
 # CRUD para Formulario
-def get_formulario(db: Session, formulario_id: int):
-    return db.query(Formulario).filter(Formulario.id == formulario_id).first()
+def get_formulario_completo(db: Session, formulario_id: int):
+    """
+    Carrega o formulário com perguntas e opções de resposta em um número fixo
+    de consultas (uma por nível da árvore), independente do tamanho do formulário.
+    A ordenação por `ordem` vem do `order_by` dos relacionamentos.
+    """
+    return (
+        db.query(Formulario)
+        .options(
+            selectinload(Formulario.perguntas)
+            .selectinload(Pergunta.opcoes_respostas)
+        )
+        .filter(Formulario.id == formulario_id)
+        .first()
+    )
 
 
-def get_formularios(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(Formulario).offset(skip).limit(limit).all()
+def get_formulario_json(
+    db: Session,
+    formulario_id: int,
+    usar_cache: bool = True,
+    versao_cliente: Optional[int] = None
+) -> Optional[Tuple[int, Optional[bytes]]]:
+    """
+    Árvore completa do formulário já serializada em JSON, lida do cache quando possível.
+    Retorna (versao, conteudo), com conteudo None se `versao_cliente` ainda for
+    a atual (nesse caso a árvore não é carregada), ou None se não existir.
+    """
+    chave = chave_formulario(formulario_id)
+    if usar_cache:
+        item = cache.get(chave)
+        if item is not None:
+            versao, conteudo = item
+            return versao, (None if versao == versao_cliente else conteudo)
+    # Antes de ir ao banco: uma escrita no meio da leitura impede o `cache.set`
+    marca = cache.marca()
+    
+    if versao_cliente is not None:
+        versao = get_versao_formulario(db, formulario_id)
+        if versao is None:
+            return None
+        if versao == versao_cliente:
+            return versao, None
+    
+    db_formulario = get_formulario_completo(db, formulario_id)
+    if db_formulario is None:
+        return None
+    with medir_serializacao():
+        conteudo = schemas.Formulario.model_validate(db_formulario).model_dump_json().encode()
+    if usar_cache:
+        cache.set(chave, (db_formulario.versao, conteudo), marca)
+    return db_formulario.versao, conteudo
 
 
 def create_formulario(db: Session, formulario: FormularioCreate):
-    db_formulario = Formulario(**formulario.dict())
-    db.add(db_formulario)
+    db_formulario = db.execute(_stmt_criar_formulario(formulario)).one()
     db.commit()
-    db.refresh(db_formulario)
     return db_formulario
 
 
-def update_formulario(db: Session, formulario_id: int, formulario: FormularioUpdate):
-    db_formulario = db.query(Formulario).filter(Formulario.id == formulario_id).first()
-    if db_formulario:
-        update_data = formulario.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_formulario, field, value)
-        db.commit()
-        db.refresh(db_formulario)
-    return db_formulario
+def update_formulario(db: Session, formulario_id: int, formulario: FormularioUpdate) -> Optional[bytes]:
+    """
+    Atualiza o formulário e devolve o JSON de `schemas.Formulario` (com as
+    perguntas, lidas na mesma transação), ou None se não existir
+    """
+    stmt = _stmt_atualizar(Formulario, formulario_id, _valores_formulario(formulario), _CAMPOS_FORMULARIO_RESUMO)
+    db_formulario = db.execute(stmt).first()
+    if db_formulario is None:
+        db.rollback()
+        return None
+    perguntas_rows = db.execute(_stmt_perguntas_dos_formularios([formulario_id])).all()
+    opcoes_rows = db.execute(_stmt_opcoes_dos_formularios([formulario_id])).all()
+    db.commit()
+    invalidar_formulario(formulario_id)
+    return _json_formulario_atualizado(db_formulario, perguntas_rows, opcoes_rows)
 
 
-def delete_formulario(db: Session, formulario_id: int):
-    db_formulario = db.query(Formulario).filter(Formulario.id == formulario_id).first()
-    if db_formulario:
-        db.delete(db_formulario)
-        db.commit()
-    return db_formulario
+# Exclusões: um único DELETE, e as linhas dependentes (perguntas, opções e
+# vínculos) saem pelo ON DELETE CASCADE do banco (migração 0005), sem serem
+# carregadas na sessão
+def _stmt_delete_formulario(formulario_id: int):
+    return delete(Formulario).where(Formulario.id == formulario_id).returning(Formulario.id)
 
 
-# CRUD para Pergunta
-def get_pergunta(db: Session, pergunta_id: int):
-    return db.query(Pergunta).filter(Pergunta.id == pergunta_id).first()
+def _stmt_delete_pergunta(pergunta_id: int):
+    return delete(Pergunta).where(Pergunta.id == pergunta_id).returning(Pergunta.id_formulario)
 
 
-def get_perguntas_by_formulario(
-    db: Session,
-    formulario_id: int,
-    skip: int = 0,
-    limit: int = 10,
-    filters: Optional[PerguntaFilter] = None,
-    order_by: str = "ordem",
-    order_desc: bool = False
-):
-    query = db.query(Pergunta).filter(Pergunta.id_formulario == formulario_id)
-    
-    # Aplicar filtros
+def _stmt_delete_opcao(opcao_id: int):
+    return delete(OpcoesRespostas).where(OpcoesRespostas.id == opcao_id).returning(OpcoesRespostas.id_pergunta)
+
+
+def delete_formulario(db: Session, formulario_id: int) -> Optional[int]:
+    """Remove o formulário e toda a sua árvore; retorna o id, ou None se não existir"""
+    # Só os ids, para invalidar as perguntas em cache
+    perguntas_ids = db.scalars(_stmt_ids_perguntas(formulario_id)).all() if cache.habilitado else []
+    removido = db.execute(_stmt_delete_formulario(formulario_id)).scalar()
+    if removido is None:
+        db.rollback()
+        return None
+    db.commit()
+    invalidar_formulario(formulario_id, perguntas_ids)
+    return removido
+
+
+# CRUD para Pergunta
+def _filtros_pergunta(formulario_id: int, filters: Optional[PerguntaFilter] = None):
+    """Critérios WHERE das listagens de perguntas de um formulário"""
+    criterios = [Pergunta.id_formulario == formulario_id]
     if filters:
         if filters.tipo_pergunta:
-            query = query.filter(Pergunta.tipo_pergunta == filters.tipo_pergunta.value)
+            criterios.append(Pergunta.tipo_pergunta == filters.tipo_pergunta.value)
         if filters.obrigatoria is not None:
-            query = query.filter(Pergunta.obrigatoria == filters.obrigatoria)
+            criterios.append(Pergunta.obrigatoria == filters.obrigatoria)
         if filters.sub_pergunta is not None:
-            query = query.filter(Pergunta.sub_pergunta == filters.sub_pergunta)
+            criterios.append(Pergunta.sub_pergunta == filters.sub_pergunta)
+    return criterios
+
+
+def get_pergunta_json(
+    db: Session,
+    pergunta_id: int,
+    usar_cache: bool = True,
+    versao_cliente: Optional[int] = None
+) -> Optional[Tuple[int, Optional[bytes]]]:
+    """
+    Pergunta com opções de resposta já serializada em JSON, lida do cache quando possível.
+    Mesmo retorno de `get_formulario_json`, usando a versão do formulário da pergunta.
+    """
+    chave = chave_pergunta(pergunta_id)
+    if usar_cache:
+        item = cache.get(chave)
+        if item is not None:
+            versao, conteudo = item
+            return versao, (None if versao == versao_cliente else conteudo)
+    # Antes de ir ao banco: uma escrita no meio da leitura impede o `cache.set`
+    marca = cache.marca()
     
-    # Aplicar ordenação
-    if hasattr(Pergunta, order_by):
-        order_column = getattr(Pergunta, order_by)
-        if order_desc:
-            query = query.order_by(desc(order_column))
-        else:
-            query = query.order_by(asc(order_column))
+    # Lida antes do conteúdo: no pior caso o ETag fica mais antigo que o corpo, nunca o contrário
+    versao = get_versao_pergunta(db, pergunta_id)
+    if versao is None:
+        return None
+    if versao == versao_cliente:
+        return versao, None
     
-    return query.offset(skip).limit(limit).all()
+    pergunta = db.execute(_stmt_pergunta(pergunta_id)).first()
+    if pergunta is None:
+        return None
+    opcoes = db.execute(_stmt_opcoes_da_pergunta(pergunta_id)).all()
+    conteudo = _serializar(_perguntas_com_opcoes([pergunta], opcoes)[0])
+    if usar_cache:
+        cache.set(chave, (versao, conteudo), marca)
+    return versao, conteudo
+
+
+def _stmt_contar_perguntas(formulario_id: int, filters: Optional[PerguntaFilter] = None):
+    return select(func.count()).select_from(Pergunta).where(*_filtros_pergunta(formulario_id, filters))
 
 
 def count_perguntas_by_formulario(
     db: Session,
     formulario_id: int,
     filters: Optional[PerguntaFilter] = None
+) -> int:
+    return db.execute(_stmt_contar_perguntas(formulario_id, filters)).scalar_one()
+
+
+# Leitura enxuta das listagens: apenas as colunas dos schemas de resposta, como
+# tuplas, serializadas direto com orjson (sem objetos do ORM e sem revalidar
+# com o Pydantic dados que vieram do próprio banco)
+_CAMPOS_FORMULARIO_RESUMO = tuple(schemas.FormularioSummary.model_fields)
+_CAMPOS_PERGUNTA = tuple(campo for campo in schemas.Pergunta.model_fields if campo != "opcoes_respostas")
+_CAMPOS_OPCAO = tuple(schemas.OpcoesRespostas.model_fields)
+
+
+def _colunas(entidade, campos):
+    return [getattr(entidade, campo).label(campo) for campo in campos]
+
+
+def _campos_consulta(projecao: Optional[Projecao], padrao: Tuple[str, ...], *auxiliares: str) -> Tuple[str, ...]:
+    """
+    Colunas a consultar: todas as do schema, ou as pedidas na projeção seguidas
+    das auxiliares (chaves, ordenação) que faltarem. Como as auxiliares vêm no
+    fim, `zip(projecao.campos, row)` devolve exatamente os campos pedidos.
+    """
+    if projecao is None:
+        return padrao
+    return projecao.campos + tuple(
+        campo for campo in dict.fromkeys(auxiliares) if campo not in projecao.campos
+    )
+
+
+def _campos_resposta(projecao: Optional[Projecao], padrao: Tuple[str, ...]) -> Tuple[str, ...]:
+    return padrao if projecao is None else projecao.campos
+
+
+def _serializar(dados) -> bytes:
+    with medir_serializacao():
+        return orjson.dumps(dados)
+
+
+def _stmt_formularios_resumo(skip: int, limit: int, cursor: Optional[str], projecao: Optional[Projecao] = None):
+    campos = _campos_consulta(projecao, _CAMPOS_FORMULARIO_RESUMO, "id", "ordem")
+    stmt = select(*_colunas(Formulario, campos))
+    return _paginar(stmt, Formulario, skip, limit, "ordem", False, cursor)
+
+
+def _stmt_perguntas_formulario(
+    formulario_id: int,
+    skip: int,
+    limit: int,
+    filters: Optional[PerguntaFilter],
+    order_by: str,
+    order_desc: bool,
+    cursor: Optional[str],
+    projecao: Optional[Projecao] = None
+):
+    campos = _campos_consulta(projecao, _CAMPOS_PERGUNTA, "id", order_by)
+    stmt = select(*_colunas(Pergunta, campos)).where(*_filtros_pergunta(formulario_id, filters))
+    return _paginar(stmt, Pergunta, skip, limit, order_by, order_desc, cursor)
+
+
+def _colunas_opcoes(projecao: Optional[Projecao]):
+    return _colunas(OpcoesRespostas, _campos_consulta(projecao, _CAMPOS_OPCAO, "id_pergunta", "ordem", "id"))
+
+
+def _stmt_opcoes_das_perguntas(perguntas_ids, projecao: Optional[Projecao] = None):
+    # Sem ORDER BY: com IN o Postgres ordenaria em memória; as poucas opções de
+    # cada pergunta são ordenadas em `_perguntas_com_opcoes`
+    return (
+        select(*_colunas_opcoes(projecao))
+        .where(OpcoesRespostas.id_pergunta.in_(perguntas_ids))
+    )
+
+
+def _stmt_opcoes_da_pergunta(pergunta_id: int, projecao: Optional[Projecao] = None):
+    return (
+        select(*_colunas_opcoes(projecao))
+        .where(OpcoesRespostas.id_pergunta == pergunta_id)
+        .order_by(OpcoesRespostas.ordem, OpcoesRespostas.id)
+    )
+
+
+def _projecao_opcoes(projecao: Optional[Projecao]) -> Optional[Projecao]:
+    return None if projecao is None else projecao.relacionamentos["opcoes_respostas"]
+
+
+def _inclui_opcoes(projecao: Optional[Projecao]) -> bool:
+    return projecao is None or projecao.inclui("opcoes_respostas")
+
+
+def _perguntas_com_opcoes(perguntas_rows, opcoes_rows, projecao: Optional[Projecao] = None) -> List[dict]:
+    """
+    Monta o JSON de `schemas.Pergunta` a partir das tuplas de perguntas e
+    opções, restrito aos campos da projeção quando houver
+    """
+    campos = _campos_resposta(projecao, _CAMPOS_PERGUNTA)
+    if not _inclui_opcoes(projecao):
+        return [dict(zip(campos, pergunta)) for pergunta in perguntas_rows]
+
+    campos_opcao = _campos_resposta(_projecao_opcoes(projecao), _CAMPOS_OPCAO)
+    opcoes = {}
+    for opcao in sorted(opcoes_rows, key=lambda opcao: (opcao.ordem, opcao.id)):
+        opcoes.setdefault(opcao.id_pergunta, []).append(dict(zip(campos_opcao, opcao)))
+    return [
+        {**dict(zip(campos, pergunta)), "opcoes_respostas": opcoes.get(pergunta.id, [])}
+        for pergunta in perguntas_rows
+    ]
+
+
+def _stmt_pagina_perguntas(
+    formulario_id: int,
+    skip: int,
+    limit: int,
+    filters: Optional[PerguntaFilter],
+    order_by: str,
+    order_desc: bool,
+    cursor: Optional[str],
+    projecao: Optional[Projecao] = None
+):
+    """
+    Uma única instrução que devolve a página e o total:
+
+        SELECT pagina.*, formulario.id, (SELECT count(*) ...) AS total
+        FROM formulario LEFT OUTER JOIN (SELECT ... LIMIT ...) AS pagina ON true
+        WHERE formulario.id = :id
+
+    Nenhuma linha significa formulário inexistente; uma linha com a pergunta
+    nula significa página vazia.
+    """
+    criterios = _filtros_pergunta(formulario_id, filters)
+    total = select(func.count()).select_from(Pergunta).where(*criterios).scalar_subquery()
+    pagina = _stmt_perguntas_formulario(
+        formulario_id, skip, limit, filters, order_by, order_desc, cursor, projecao
+    ).subquery()
+    direcao = desc if order_desc else asc
+    return (
+        select(*pagina.c, Formulario.id.label("formulario_id"), total.label("total"))
+        .select_from(Formulario)
+        .outerjoin(pagina, true())
+        .where(Formulario.id == formulario_id)
+        .order_by(direcao(pagina.c[order_by]), direcao(pagina.c.id))
+    )
+
+
+def _resultado_pagina_perguntas(rows):
+    """(perguntas, total) das linhas de `_stmt_pagina_perguntas`, ou None"""
+    if not rows:
+        return None
+    return [row for row in rows if row.id is not None], rows[0].total
+
+
+def _json_pagina_perguntas(
+    perguntas_rows, opcoes_rows, total: int, skip: int, limit: int, order_by: str, order_desc: bool,
+    projecao: Optional[Projecao] = None
+):
+    return _serializar({
+        "items": _perguntas_com_opcoes(perguntas_rows, opcoes_rows, projecao),
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "next_cursor": cursor_proxima_pagina(Pergunta, perguntas_rows, limit, order_by, order_desc),
+    })
+
+
+def _linhas_json(rows, projecao: Optional[Projecao]) -> List[dict]:
+    if projecao is None:
+        return [row._asdict() for row in rows]
+    return [dict(zip(projecao.campos, row)) for row in rows]
+
+
+def _opcoes_das_perguntas(db: Session, perguntas_rows, projecao: Optional[Projecao] = None):
+    if not perguntas_rows or not _inclui_opcoes(projecao):
+        return []
+    stmt = _stmt_opcoes_das_perguntas([row.id for row in perguntas_rows], _projecao_opcoes(projecao))
+    return db.execute(stmt).all()
+
+
+def get_formularios_json(
+    db: Session,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    projecao: Optional[Projecao] = None
+) -> Tuple[bytes, Optional[str]]:
+    """Página de formulários (`FormularioSummary`) já em JSON e o cursor da próxima"""
+    rows = db.execute(_stmt_formularios_resumo(skip, limit, cursor, projecao)).all()
+    return _serializar(_linhas_json(rows, projecao)), cursor_proxima_pagina(Formulario, rows, limit)
+
+
+def get_perguntas_by_formulario_json(
+    db: Session,
+    formulario_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    filters: Optional[PerguntaFilter] = None,
+    order_by: str = "ordem",
+    order_desc: bool = False,
+    cursor: Optional[str] = None,
+    projecao: Optional[Projecao] = None
+) -> Tuple[bytes, Optional[str]]:
+    """
+    Página de perguntas com opções já em JSON e o cursor da próxima (duas
+    consultas; uma só se a projeção não incluir as opções)
+    """
+    rows = db.execute(
+        _stmt_perguntas_formulario(formulario_id, skip, limit, filters, order_by, order_desc, cursor, projecao)
+    ).all()
+    opcoes = _opcoes_das_perguntas(db, rows, projecao)
+    return (
+        _serializar(_perguntas_com_opcoes(rows, opcoes, projecao)),
+        cursor_proxima_pagina(Pergunta, rows, limit, order_by, order_desc),
+    )
+
+
+def get_pagina_perguntas_json(
+    db: Session,
+    formulario_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    filters: Optional[PerguntaFilter] = None,
+    order_by: str = "ordem",
+    order_desc: bool = False,
+    cursor: Optional[str] = None,
+    projecao: Optional[Projecao] = None
+) -> Optional[bytes]:
+    """
+    `PerguntaPage` já em JSON: página e total em uma ida ao banco, mais uma
+    consulta para as opções de resposta. None se o formulário não existir.
+    A projeção, se houver, vale para cada item de `items`.
+    """
+    stmt = _stmt_pagina_perguntas(formulario_id, skip, limit, filters, order_by, order_desc, cursor, projecao)
+    resultado = _resultado_pagina_perguntas(db.execute(stmt).all())
+    if resultado is None:
+        return None
+    perguntas, total = resultado
+    opcoes = _opcoes_das_perguntas(db, perguntas, projecao)
+    return _json_pagina_perguntas(perguntas, opcoes, total, skip, limit, order_by, order_desc, projecao)
+
+
+def get_opcoes_resposta_json(db: Session, pergunta_id: int) -> bytes:
+    rows = db.execute(_stmt_opcoes_da_pergunta(pergunta_id)).all()
+    return _serializar([row._asdict() for row in rows])
+
+
+# Leituras parciais (`fields`/`include`, ver app/projecao.py): só as colunas
+# pedidas e só os níveis incluídos são consultados. Não passam pelo cache, que
+# guarda apenas a representação completa
+def _stmt_formulario_parcial(formulario_id: int, projecao: Projecao):
+    campos = _campos_consulta(projecao, (), "versao")
+    return select(*_colunas(Formulario, campos)).where(Formulario.id == formulario_id)
+
+
+def _stmt_perguntas_parcial(formulario_id: int, projecao: Projecao):
+    return (
+        select(*_colunas(Pergunta, _campos_consulta(projecao, (), "id")))
+        .where(Pergunta.id_formulario == formulario_id)
+        .order_by(Pergunta.ordem, Pergunta.id)
+    )
+
+
+def _stmt_opcoes_do_formulario(formulario_id: int, projecao: Projecao):
+    perguntas_ids = select(Pergunta.id).where(Pergunta.id_formulario == formulario_id)
+    return _stmt_opcoes_das_perguntas(perguntas_ids, projecao)
+
+
+def _stmt_pergunta(pergunta_id: int, projecao: Optional[Projecao] = None):
+    campos = _campos_consulta(projecao, _CAMPOS_PERGUNTA, "id")
+    return select(*_colunas(Pergunta, campos)).where(Pergunta.id == pergunta_id)
+
+
+def _json_formulario_parcial(formulario_row, perguntas_rows, opcoes_rows, projecao: Projecao) -> bytes:
+    dados = dict(zip(projecao.campos, formulario_row))
+    if projecao.inclui("perguntas"):
+        dados["perguntas"] = _perguntas_com_opcoes(perguntas_rows, opcoes_rows, projecao.relacionamentos["perguntas"])
+    return _serializar(dados)
+
+
+def get_formulario_parcial_json(
+    db: Session,
+    formulario_id: int,
+    projecao: Projecao,
+    versao_cliente: Optional[int] = None
+) -> Optional[Tuple[int, Optional[bytes]]]:
+    """
+    Como `get_formulario_json`, com a resposta restrita à projeção: uma consulta
+    por nível incluído (formulário, perguntas, opções), sem carregar o ORM.
+    """
+    formulario = db.execute(_stmt_formulario_parcial(formulario_id, projecao)).first()
+    if formulario is None:
+        return None
+    if formulario.versao == versao_cliente:
+        return formulario.versao, None
+
+    perguntas, opcoes = [], []
+    if projecao.inclui("perguntas"):
+        projecao_perguntas = projecao.relacionamentos["perguntas"]
+        perguntas = db.execute(_stmt_perguntas_parcial(formulario_id, projecao_perguntas)).all()
+        if perguntas and _inclui_opcoes(projecao_perguntas):
+            stmt = _stmt_opcoes_do_formulario(formulario_id, _projecao_opcoes(projecao_perguntas))
+            opcoes = db.execute(stmt).all()
+    return formulario.versao, _json_formulario_parcial(formulario, perguntas, opcoes, projecao)
+
+
+def get_pergunta_parcial_json(
+    db: Session,
+    pergunta_id: int,
+    projecao: Projecao,
+    versao_cliente: Optional[int] = None
+) -> Optional[Tuple[int, Optional[bytes]]]:
+    """Como `get_pergunta_json`, com a resposta restrita à projeção"""
+    versao = get_versao_pergunta(db, pergunta_id)
+    if versao is None:
+        return None
+    if versao == versao_cliente:
+        return versao, None
+
+    pergunta = db.execute(_stmt_pergunta(pergunta_id, projecao)).first()
+    if pergunta is None:
+        return None
+    opcoes = []
+    if _inclui_opcoes(projecao):
+        opcoes = db.execute(_stmt_opcoes_da_pergunta(pergunta_id, _projecao_opcoes(projecao))).all()
+    return versao, _serializar(_perguntas_com_opcoes([pergunta], opcoes, projecao)[0])
+
+
+# Leituras em lote (multi-get, ver app/lote.py): os itens que estão no cache são
+# reaproveitados e os demais são lidos com IN em um número fixo de consultas,
+# qualquer que seja o tamanho do lote. O JSON de cada item é o mesmo da leitura
+# individual, então também vai para o cache
+def _stmt_formularios_lote(formularios_ids):
+    return select(*_colunas(Formulario, _CAMPOS_FORMULARIO_RESUMO)).where(Formulario.id.in_(formularios_ids))
+
+
+def _stmt_perguntas_dos_formularios(formularios_ids):
+    # Sem ORDER BY, como em `_stmt_opcoes_das_perguntas`: ordenadas em `_formularios_lote_json`
+    return select(*_colunas(Pergunta, _CAMPOS_PERGUNTA)).where(Pergunta.id_formulario.in_(formularios_ids))
+
+
+def _stmt_opcoes_dos_formularios(formularios_ids):
+    perguntas_ids = select(Pergunta.id).where(Pergunta.id_formulario.in_(formularios_ids))
+    return _stmt_opcoes_das_perguntas(perguntas_ids)
+
+
+def _stmt_perguntas_lote(perguntas_ids):
+    # A versão (ETag) de cada pergunta vem na mesma consulta, antes das opções
+    return (
+        select(*_colunas(Pergunta, _CAMPOS_PERGUNTA), Formulario.versao.label("versao"))
+        .join(Formulario, Formulario.id == Pergunta.id_formulario)
+        .where(Pergunta.id.in_(perguntas_ids))
+    )
+
+
+def _stmt_perguntas_existentes(perguntas_ids):
+    return select(Pergunta.id).where(Pergunta.id.in_(perguntas_ids))
+
+
+def _em_cache(chave, ids: List[int], usar_cache: bool) -> dict:
+    """JSON dos itens do lote que estão no cache, por id"""
+    conteudos = {}
+    if usar_cache:
+        for item_id in ids:
+            item = cache.get(chave(item_id))
+            if item is not None:
+                conteudos[item_id] = item[1]
+    return conteudos
+
+
+def _guardar(chave, lidos: dict, usar_cache: bool, marca: int) -> dict:
+    """
+    Coloca no cache os itens lidos do banco ({id: (versao, conteudo)}), a menos
+    que haja invalidação depois de `marca`, e devolve {id: conteudo}
+    """
+    if usar_cache:
+        for item_id, item in lidos.items():
+            cache.set(chave(item_id), item, marca)
+    return {item_id: conteudo for item_id, (versao, conteudo) in lidos.items()}
+
+
+def _formularios_lote_json(formularios_rows, perguntas_rows, opcoes_rows) -> dict:
+    """{id: (versao, JSON de `schemas.Formulario`)}, com as perguntas na ordem da árvore"""
+    perguntas_rows = sorted(perguntas_rows, key=lambda pergunta: (pergunta.ordem, pergunta.id))
+    perguntas = {}
+    for pergunta in _perguntas_com_opcoes(perguntas_rows, opcoes_rows):
+        perguntas.setdefault(pergunta["id_formulario"], []).append(pergunta)
+    return {
+        formulario.id: (
+            formulario.versao,
+            _serializar({**formulario._asdict(), "perguntas": perguntas.get(formulario.id, [])}),
+        )
+        for formulario in formularios_rows
+    }
+
+
+def _perguntas_lote_json(perguntas_rows, opcoes_rows) -> dict:
+    """{id: (versao, JSON de `schemas.Pergunta`)}"""
+    dados = _perguntas_com_opcoes(perguntas_rows, opcoes_rows)
+    return {
+        pergunta.id: (pergunta.versao, _serializar(item))
+        for pergunta, item in zip(perguntas_rows, dados)
+    }
+
+
+def _json_lote(conteudos: dict, ids: List[int]) -> bytes:
+    """`{"items": {"<id>": ..., ...}, "nao_encontrados": [...]}` com o JSON já pronto de cada item"""
+    items = b",".join(b'"%d":%s' % (item_id, conteudos[item_id]) for item_id in ids if item_id in conteudos)
+    nao_encontrados = [item_id for item_id in ids if item_id not in conteudos]
+    return b'{"items":{' + items + b'},"nao_encontrados":' + orjson.dumps(nao_encontrados) + b"}"
+
+
+def _json_opcoes_lote(perguntas_ids: List[int], existentes, opcoes_rows) -> bytes:
+    opcoes = {}
+    for opcao in sorted(opcoes_rows, key=lambda opcao: (opcao.ordem, opcao.id)):
+        opcoes.setdefault(opcao.id_pergunta, []).append(opcao._asdict())
+    existentes = set(existentes)
+    return _serializar({
+        "items": {
+            str(pergunta_id): opcoes.get(pergunta_id, [])
+            for pergunta_id in perguntas_ids if pergunta_id in existentes
+        },
+        "nao_encontrados": [pergunta_id for pergunta_id in perguntas_ids if pergunta_id not in existentes],
+    })
+
+
+def get_formularios_lote_json(db: Session, formularios_ids: List[int], usar_cache: bool = True) -> bytes:
+    """
+    `FormularioLote` já em JSON: a árvore completa de cada formulário pedido
+    (como em `get_formulario_json`) e os ids inexistentes. Os que não estão no
+    cache são lidos em até três consultas (formulários, perguntas, opções).
+    """
+    conteudos = _em_cache(chave_formulario, formularios_ids, usar_cache)
+    faltantes = [formulario_id for formulario_id in formularios_ids if formulario_id not in conteudos]
+    if faltantes:
+        marca = cache.marca()
+        formularios = db.execute(_stmt_formularios_lote(faltantes)).all()
+        perguntas, opcoes = [], []
+        if formularios:
+            encontrados = [formulario.id for formulario in formularios]
+            perguntas = db.execute(_stmt_perguntas_dos_formularios(encontrados)).all()
+            if perguntas:
+                opcoes = db.execute(_stmt_opcoes_dos_formularios(encontrados)).all()
+        lidos = _formularios_lote_json(formularios, perguntas, opcoes)
+        conteudos.update(_guardar(chave_formulario, lidos, usar_cache, marca))
+    return _json_lote(conteudos, formularios_ids)
+
+
+def get_perguntas_lote_json(db: Session, perguntas_ids: List[int], usar_cache: bool = True) -> bytes:
+    """
+    `PerguntaLote` já em JSON, como em `get_pergunta_json`; as perguntas fora
+    do cache são lidas em até duas consultas (perguntas com a versão, opções)
+    """
+    conteudos = _em_cache(chave_pergunta, perguntas_ids, usar_cache)
+    faltantes = [pergunta_id for pergunta_id in perguntas_ids if pergunta_id not in conteudos]
+    if faltantes:
+        marca = cache.marca()
+        perguntas = db.execute(_stmt_perguntas_lote(faltantes)).all()
+        opcoes = []
+        if perguntas:
+            opcoes = db.execute(_stmt_opcoes_das_perguntas([pergunta.id for pergunta in perguntas])).all()
+        lidos = _perguntas_lote_json(perguntas, opcoes)
+        conteudos.update(_guardar(chave_pergunta, lidos, usar_cache, marca))
+    return _json_lote(conteudos, perguntas_ids)
+
+
+def get_opcoes_resposta_lote_json(db: Session, perguntas_ids: List[int]) -> bytes:
+    """`OpcoesRespostasLote` já em JSON: as opções de cada pergunta, em duas consultas"""
+    existentes = db.execute(_stmt_perguntas_existentes(perguntas_ids)).scalars().all()
+    opcoes = db.execute(_stmt_opcoes_das_perguntas(existentes)).all() if existentes else []
+    return _json_opcoes_lote(perguntas_ids, existentes, opcoes)
+
+
+# Busca textual de perguntas (migração 0004). Os termos viram uma tsquery (o
+# último como prefixo, para busca enquanto se digita) comparada com a coluna
+# `busca` pelo índice GIN e ordenada por ts_rank. Se nada for encontrado, a
+# busca é refeita por similaridade de trigramas (pg_trgm, tolera erros de
+# digitação) ou, fora do Postgres, por ILIKE.
+#
+# A relevância é calculada para todas as perguntas encontradas, com a consulta
+# limitada a BUSCA_TIMEOUT_MS (statement_timeout): termos muito comuns casam
+# com uma fração grande da tabela, e o ranking de todas custaria centenas de ms
+# com 1 milhão de perguntas. Estourando o limite (ou com BUSCA_TIMEOUT_MS=0),
+# só as BUSCA_MAX_CANDIDATOS perguntas de menor id encontradas são ordenadas, e
+# a página traz `truncado: true`.
+BUSCA_MAX_CANDIDATOS = int(os.getenv("BUSCA_MAX_CANDIDATOS", 1000))
+BUSCA_TIMEOUT_MS = int(os.getenv("BUSCA_TIMEOUT_MS", 100))
+_CAMPOS_BUSCA = tuple(campo for campo in schemas.PerguntaBuscaItem.model_fields if campo != "relevancia")
+# Letras e dígitos: separadores (inclusive "_" e "-") dividem os termos, como
+# no documento, em que o código é indexado com a pontuação trocada por espaços
+_TERMO = re.compile(r"[^\W_]+")
+_CONFIG_BUSCA = literal_column(f"'{CONFIG_BUSCA}'::regconfig")
+# Mesma expressão do índice ix_pergunta_busca_trgm (TEXTO_TRIGRAMA em app.models)
+_TEXTO_TRIGRAMA = (Pergunta.titulo + literal_column("' '") + Pergunta.codigo).self_group()
+# Extensões instaladas por banco (url), consultadas uma vez
+_extensoes_busca = {}
+
+
+def _termos_busca(texto: str) -> List[str]:
+    termos = _TERMO.findall(texto.lower())
+    if not termos:
+        raise ValueError("Informe ao menos uma palavra ou código para a busca")
+    return termos
+
+
+def _tsquery(termos: List[str]) -> str:
+    # Os termos só têm caracteres de palavra, então não há sintaxe a escapar
+    return " & ".join(termos[:-1] + [termos[-1] + ":*"])
+
+
+def _stmt_extensoes_busca():
+    return text("SELECT extname FROM pg_extension WHERE extname IN ('pg_trgm', 'unaccent')")
+
+
+def _modo_alternativo(bind, extensoes, id_formulario: Optional[int]) -> Optional[ModoBuscaEnum]:
+    """
+    Modo usado quando a busca por tsvector não encontra nada, ou None. No
+    Postgres sem pg_trgm o ILIKE percorreria a tabela inteira, então só é
+    usado dentro de um formulário.
+    """
+    if bind.dialect.name != "postgresql":
+        return ModoBuscaEnum.SUBSTRING
+    if "pg_trgm" in extensoes:
+        return ModoBuscaEnum.TRIGRAMA
+    return ModoBuscaEnum.SUBSTRING if id_formulario is not None else None
+
+
+def _filtros_busca(id_formulario: Optional[int], tipo_pergunta: Optional[TipoPerguntaEnum]):
+    criterios = []
+    if id_formulario is not None:
+        criterios.append(Pergunta.id_formulario == id_formulario)
+    if tipo_pergunta is not None:
+        criterios.append(Pergunta.tipo_pergunta == tipo_pergunta.value)
+    return criterios
+
+
+def _documento_busca(modo: ModoBuscaEnum, texto: str, termos: List[str]):
+    """(documento, condição de busca, relevância em função do documento) dos modos com ranking"""
+    if modo == ModoBuscaEnum.TEXTO_COMPLETO:
+        consulta = func.to_tsquery(_CONFIG_BUSCA, _tsquery(termos))
+        return Pergunta.busca, Pergunta.busca.op("@@")(consulta), lambda documento: func.ts_rank(documento, consulta)
+    return (
+        _TEXTO_TRIGRAMA, literal(texto).op("<%")(_TEXTO_TRIGRAMA),
+        lambda documento: func.word_similarity(texto, documento),
+    )
+
+
+def _stmt_busca(
+    modo: ModoBuscaEnum,
+    texto: str,
+    termos: List[str],
+    criterios: list,
+    skip: int,
+    limit: int,
+    max_candidatos: Optional[int] = None
 ):
-    query = db.query(Pergunta).filter(Pergunta.id_formulario == formulario_id)
+    colunas = _colunas(Pergunta, _CAMPOS_BUSCA)
+    if modo == ModoBuscaEnum.SUBSTRING:
+        # Sem relevância: cada termo precisa aparecer em algum dos campos
+        stmt = select(*colunas, null().label("relevancia")).where(*criterios, *(
+            or_(*(
+                coluna.icontains(termo, autoescape=True)
+                for coluna in (Pergunta.titulo, Pergunta.codigo, Pergunta.orientacao_resposta)
+            ))
+            for termo in termos
+        ))
+        return stmt.order_by(Pergunta.id).offset(skip).limit(limit)
+
+    documento, filtro, relevancia = _documento_busca(modo, texto, termos)
+    candidatos = select(*colunas, documento.label("documento")).where(filtro, *criterios)
+    if max_candidatos is not None:
+        # Candidatos por id, para que as páginas de uma mesma busca venham sempre
+        # do mesmo conjunto: para termos comuns o Postgres percorre a chave
+        # primária e para ao chegar ao limite, e para termos raros usa o índice
+        candidatos = candidatos.order_by(Pergunta.id).limit(max_candidatos)
+    candidatos = candidatos.subquery()
+    relevancia = relevancia(candidatos.c.documento)
+    return (
+        select(*(candidatos.c[campo] for campo in _CAMPOS_BUSCA), relevancia.label("relevancia"))
+        .order_by(relevancia.desc(), candidatos.c.id)
+        .offset(skip)
+        .limit(limit)
+    )
+
+
+def _stmt_busca_excede_candidatos(modo: ModoBuscaEnum, texto: str, termos: List[str], criterios: list):
+    """Linha presente se a busca encontra mais de BUSCA_MAX_CANDIDATOS perguntas"""
+    _, filtro, _ = _documento_busca(modo, texto, termos)
+    return select(Pergunta.id).where(filtro, *criterios).order_by(Pergunta.id).offset(BUSCA_MAX_CANDIDATOS).limit(1)
+
+
+def _stmt_timeout_busca():
+    # SET LOCAL dentro de um savepoint, que é sempre desfeito depois da consulta
+    return text(f"SET LOCAL statement_timeout = {int(BUSCA_TIMEOUT_MS)}")
+
+
+def _consulta_cancelada(erro: DBAPIError) -> bool:
+    # SQLSTATE 57014 (query_canceled): o statement_timeout da busca estourou
+    return getattr(erro.orig, "pgcode", None) == "57014"
+
+
+def _json_busca(rows, modo: ModoBuscaEnum, skip: int, limit: int, truncado: bool = False) -> bytes:
+    return _serializar({
+        "items": [row._asdict() for row in rows], "modo": modo.value, "skip": skip, "limit": limit,
+        "truncado": truncado,
+    })
+
+
+def _extensoes(db: Session) -> set:
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return set()
+    chave = str(bind.url)
+    if chave not in _extensoes_busca:
+        _extensoes_busca[chave] = set(db.execute(_stmt_extensoes_busca()).scalars())
+    return _extensoes_busca[chave]
+
+
+def _buscar_ranqueada(db: Session, modo: ModoBuscaEnum, texto: str, termos: List[str], criterios: list,
+                      skip: int, limit: int) -> Tuple[list, bool]:
+    """
+    Página da busca com relevância e se ela foi truncada: primeiro o ranking de
+    todas as perguntas encontradas, dentro de BUSCA_TIMEOUT_MS; se estourar, o
+    dos BUSCA_MAX_CANDIDATOS primeiros candidatos
+    """
+    if BUSCA_TIMEOUT_MS > 0:
+        savepoint = db.begin_nested()
+        try:
+            db.execute(_stmt_timeout_busca())
+            return db.execute(_stmt_busca(modo, texto, termos, criterios, skip, limit)).all(), False
+        except DBAPIError as erro:
+            if not _consulta_cancelada(erro):
+                raise
+        finally:
+            savepoint.rollback()
+    rows = db.execute(_stmt_busca(modo, texto, termos, criterios, skip, limit, BUSCA_MAX_CANDIDATOS)).all()
+    truncado = db.execute(_stmt_busca_excede_candidatos(modo, texto, termos, criterios)).first() is not None
+    return rows, truncado
+
+
+def buscar_perguntas_json(
+    db: Session,
+    texto: str,
+    skip: int = 0,
+    limit: int = 10,
+    id_formulario: Optional[int] = None,
+    tipo_pergunta: Optional[TipoPerguntaEnum] = None
+) -> bytes:
+    """
+    `PerguntaBuscaPage` já em JSON, com as perguntas de todos os formulários que
+    casam com `texto` por ordem de relevância (`truncado` quando só parte delas
+    pôde ser ordenada, ver BUSCA_TIMEOUT_MS). Levanta ValueError sem termos.
+    """
+    termos = _termos_busca(texto)
+    criterios = _filtros_busca(id_formulario, tipo_pergunta)
+    bind = db.get_bind()
+    extensoes = _extensoes(db)
+
+    if bind.dialect.name == "postgresql":
+        modo = ModoBuscaEnum.TEXTO_COMPLETO
+        rows, truncado = _buscar_ranqueada(db, modo, texto, termos, criterios, skip, limit)
+        # Página vazia: recorre ao modo alternativo só se o tsvector não casar nada
+        if rows or (skip and db.execute(_stmt_busca(modo, texto, termos, criterios, 0, 1, 1)).first()):
+            return _json_busca(rows, modo, skip, limit, truncado)
+
+    modo = _modo_alternativo(bind, extensoes, id_formulario)
+    if modo is None:
+        return _json_busca([], ModoBuscaEnum.TEXTO_COMPLETO, skip, limit)
+    if modo == ModoBuscaEnum.SUBSTRING:
+        return _json_busca(db.execute(_stmt_busca(modo, texto, termos, criterios, skip, limit)).all(), modo, skip, limit)
+    rows, truncado = _buscar_ranqueada(db, modo, texto, termos, criterios, skip, limit)
+    return _json_busca(rows, modo, skip, limit, truncado)
+
+
+# Árvore do formulário em streaming: as perguntas são lidas em lotes de um
+# cursor no servidor e cada lote é serializado e enviado antes do próximo, então
+# a memória por requisição não cresce com o tamanho do formulário
+LOTE_STREAM = 500
+
+
+def _stmt_formulario_resumo(formulario_id: int):
+    return select(*_colunas(Formulario, _CAMPOS_FORMULARIO_RESUMO)).where(Formulario.id == formulario_id)
+
+
+def _stmt_perguntas_stream(formulario_id: int):
+    return (
+        select(*_colunas(Pergunta, _CAMPOS_PERGUNTA))
+        .where(Pergunta.id_formulario == formulario_id)
+        .order_by(Pergunta.ordem, Pergunta.id)
+    )
+
+
+def _abertura_stream(formulario_row) -> bytes:
+    """`{"titulo": ..., "perguntas": [` (o JSON de `schemas.Formulario` até a lista de perguntas)"""
+    return orjson.dumps(formulario_row._asdict())[:-1] + b',"perguntas":['
+
+
+def _lote_stream(perguntas_rows, opcoes_rows, primeiro: bool) -> bytes:
+    lote = orjson.dumps(_perguntas_com_opcoes(perguntas_rows, opcoes_rows))[1:-1]
+    return lote if primeiro else b"," + lote
+
+
+def _isolamento_stream(conn) -> dict:
+    # Todos os lotes leem o mesmo snapshot, mesmo com escritas concorrentes
+    return {"isolation_level": "REPEATABLE READ"} if conn.dialect.name == "postgresql" else {}
+
+
+def _gerar_formulario_stream(conn, formulario_row, lote: int):
+    try:
+        yield _abertura_stream(formulario_row)
+        resultado = conn.execute(_stmt_perguntas_stream(formulario_row.id).execution_options(yield_per=lote))
+        primeiro = True
+        for perguntas in resultado.partitions():
+            opcoes = conn.execute(_stmt_opcoes_das_perguntas([pergunta.id for pergunta in perguntas])).all()
+            yield _lote_stream(perguntas, opcoes, primeiro)
+            primeiro = False
+        yield b"]}"
+    finally:
+        conn.close()
+
+
+def get_formulario_stream(
+    db: Session,
+    formulario_id: int,
+    usar_cache: bool = True,
+    versao_cliente: Optional[int] = None,
+    lote: int = LOTE_STREAM
+):
+    """
+    Como `get_formulario_json`, mas com o conteúdo como um iterável de partes do
+    JSON. Fora do cache, as partes vêm de uma conexão própria (aberta aqui),
+    independente do ciclo de vida da sessão. Retorna (versao, partes, fechar),
+    (versao, None, None) se `versao_cliente` for a atual, ou None se o
+    formulário não existir. `fechar` (None quando não há conexão) devolve a
+    conexão ao pool e precisa ser chamado ao fim da resposta mesmo que as partes
+    não sejam consumidas: se o cliente desconectar antes da primeira, o
+    gerador nunca começa e o seu `finally` não roda.
+    """
+    if usar_cache:
+        item = cache.get(chave_formulario(formulario_id))
+        if item is not None:
+            versao, conteudo = item
+            return versao, (None if versao == versao_cliente else iter([conteudo])), None
+
+    conn = db.get_bind().connect()
+    try:
+        conn.execution_options(**_isolamento_stream(conn))
+        conn.begin()
+        formulario = conn.execute(_stmt_formulario_resumo(formulario_id)).first()
+    except Exception:
+        conn.close()
+        raise
+    if formulario is None or formulario.versao == versao_cliente:
+        conn.close()
+        return None if formulario is None else (formulario.versao, None, None)
+    return formulario.versao, _gerar_formulario_stream(conn, formulario, lote), conn.close
+
+
+def create_pergunta(db: Session, pergunta: PerguntaCreate) -> Optional[dict]:
+    """Cria a pergunta com suas opções de resposta; None se o formulário não existir"""
+    try:
+        db_pergunta = db.execute(_stmt_criar_pergunta(pergunta)).one()
+    except IntegrityError as erro:
+        db.rollback()
+        if _violacao_chave_estrangeira(erro):
+            return None
+        raise
     
-    # Aplicar filtros
-    if filters:
-        if filters.tipo_pergunta:
-            query = query.filter(Pergunta.tipo_pergunta == filters.tipo_pergunta.value)
-        if filters.obrigatoria is not None:
-            query = query.filter(Pergunta.obrigatoria == filters.obrigatoria)
-        if filters.sub_pergunta is not None:
-            query = query.filter(Pergunta.sub_pergunta == filters.sub_pergunta)
+    # Opções de resposta na mesma transação da pergunta, para que a nova versão
+    # do formulário nunca seja vista sem elas
+    opcoes_rows = []
+    if pergunta.opcoes_respostas:
+        opcoes = [{"id_pergunta": db_pergunta.id, **opcao.model_dump()} for opcao in pergunta.opcoes_respostas]
+        opcoes_rows = db.execute(_stmt_criar_opcoes(), opcoes).all()
     
-    return query.count()
+    _incrementar_versao(db, db_pergunta.id_formulario)
+    db.commit()
+    invalidar_pergunta(db_pergunta.id, db_pergunta.id_formulario)
+    return _perguntas_com_opcoes([db_pergunta], opcoes_rows)[0]
 
 
-def create_pergunta(db: Session, pergunta: PerguntaCreate):
-    # Criar pergunta
-    pergunta_data = pergunta.dict(exclude={"opcoes_respostas"})
-    db_pergunta = Pergunta(**pergunta_data)
-    db.add(db_pergunta)
-    db.commit()
-    db.refresh(db_pergunta)
+def create_perguntas_bulk(db: Session, perguntas: List[PerguntaCreate], atomico: bool = False):
+    """
+    Cria várias perguntas (com suas opções de resposta) em uma única transação,
+    com um INSERT multi-linha ... RETURNING para as perguntas e um executemany
+    para as opções.
+
+    Itens inválidos (formulário inexistente, `codigo` repetido no lote ou já
+    cadastrado) são reportados em `erros` sem impedir os demais, a menos que
+    `atomico` seja verdadeiro: nesse caso nada é gravado se houver erro.
+    Retorna {"criadas": [...], "erros": [...]}.
+    """
+    erros = []
     
-    # Criar opções de resposta se fornecidas
-    if pergunta.opcoes_respostas:
-        for opcao in pergunta.opcoes_respostas:
-            db_opcao = OpcoesRespostas(
-                id_pergunta=db_pergunta.id,
-                **opcao.dict()
-            )
-            db.add(db_opcao)
-        db.commit()
-        db.refresh(db_pergunta)
+    def erro(indice: int, pergunta: PerguntaCreate, detail: str):
+        erros.append({"indice": indice, "codigo": pergunta.codigo, "detail": detail})
     
-    return db_pergunta
+    formularios_ids = {p.id_formulario for p in perguntas}
+    existentes = set(db.scalars(select(Formulario.id).where(Formulario.id.in_(formularios_ids))))
+    codigos = [p.codigo for p in perguntas]
+    codigos_cadastrados = set(db.scalars(select(Pergunta.codigo).where(Pergunta.codigo.in_(codigos))))
+    
+    validas = {}
+    for indice, pergunta in enumerate(perguntas):
+        if pergunta.id_formulario not in existentes:
+            erro(indice, pergunta, "Formulário não encontrado")
+        elif pergunta.codigo in codigos_cadastrados:
+            erro(indice, pergunta, "Código já cadastrado")
+        elif pergunta.codigo in validas:
+            erro(indice, pergunta, "Código repetido no lote")
+        else:
+            validas[pergunta.codigo] = (indice, pergunta)
+    
+    if not validas or (atomico and erros):
+        return {"criadas": [], "erros": erros}
+    
+    # ON CONFLICT cobre códigos inseridos por outra transação após a verificação acima
+    stmt = (
+        pg_insert(Pergunta)
+        .on_conflict_do_nothing(index_elements=[Pergunta.codigo])
+        .returning(Pergunta.id, Pergunta.codigo)
+    )
+    linhas = [p.model_dump(exclude={"opcoes_respostas"}) for _, p in validas.values()]
+    ids_por_codigo = {codigo: pergunta_id for pergunta_id, codigo in db.execute(stmt, linhas)}
+    
+    for codigo, (indice, pergunta) in validas.items():
+        if codigo not in ids_por_codigo:
+            erro(indice, pergunta, "Código já cadastrado")
+    if atomico and erros:
+        db.rollback()
+        return {"criadas": [], "erros": sorted(erros, key=lambda e: e["indice"])}
+    
+    opcoes = [
+        {"id_pergunta": ids_por_codigo[codigo], **opcao.model_dump()}
+        for codigo, (_, pergunta) in validas.items() if codigo in ids_por_codigo
+        for opcao in pergunta.opcoes_respostas or []
+    ]
+    if opcoes:
+        db.execute(insert(OpcoesRespostas), opcoes)
+    
+    formularios_alterados = {
+        pergunta.id_formulario
+        for codigo, (_, pergunta) in validas.items() if codigo in ids_por_codigo
+    }
+    _incrementar_versao(db, *formularios_alterados)
+    db.commit()
+    for formulario_id in formularios_alterados:
+        invalidar_formulario(formulario_id)
+    
+    criadas = [
+        {"indice": indice, "id": ids_por_codigo[codigo], "codigo": codigo}
+        for codigo, (indice, _) in validas.items() if codigo in ids_por_codigo
+    ]
+    return {"criadas": criadas, "erros": sorted(erros, key=lambda e: e["indice"])}
+
+
+def update_pergunta(db: Session, pergunta_id: int, pergunta: PerguntaUpdate) -> Optional[dict]:
+    """Atualiza a pergunta (que não muda de formulário); None se não existir"""
+    stmt = _stmt_atualizar(Pergunta, pergunta_id, pergunta.model_dump(exclude_unset=True), _CAMPOS_PERGUNTA)
+    db_pergunta = db.execute(stmt).first()
+    if db_pergunta is None:
+        db.rollback()
+        return None
+    _incrementar_versao(db, db_pergunta.id_formulario)
+    opcoes_rows = db.execute(_stmt_opcoes_da_pergunta(pergunta_id)).all()
+    db.commit()
+    invalidar_pergunta(pergunta_id, db_pergunta.id_formulario)
+    return _perguntas_com_opcoes([db_pergunta], opcoes_rows)[0]
+
+
+def delete_pergunta(db: Session, pergunta_id: int) -> Optional[int]:
+    """Remove a pergunta com suas opções; retorna o id do formulário, ou None se não existir"""
+    formulario_id = db.execute(_stmt_delete_pergunta(pergunta_id)).scalar()
+    if formulario_id is None:
+        db.rollback()
+        return None
+    _incrementar_versao(db, formulario_id)
+    db.commit()
+    invalidar_pergunta(pergunta_id, formulario_id)
+    return formulario_id
+
+
+# Reordenação: a nova ordem chega como a lista completa de ids e é gravada com
+# um único UPDATE (ordem = posição, a partir de 1). O incremento da versão vem
+# antes, para travar a linha do formulário e serializar reordenações
+# concorrentes do mesmo formulário
+def _stmt_ids_perguntas(formulario_id: int):
+    return select(Pergunta.id).where(Pergunta.id_formulario == formulario_id)
+
 
+def _stmt_ids_opcoes(pergunta_id: int):
+    return select(OpcoesRespostas.id).where(OpcoesRespostas.id_pergunta == pergunta_id)
 
-def update_pergunta(db: Session, pergunta_id: int, pergunta: PerguntaUpdate):
-    db_pergunta = db.query(Pergunta).filter(Pergunta.id == pergunta_id).first()
-    if db_pergunta:
-        update_data = pergunta.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_pergunta, field, value)
-        db.commit()
-        db.refresh(db_pergunta)
-    return db_pergunta
 
+def _validar_nova_ordem(ids: List[int], atuais, itens: str):
+    """ValueError se `ids` não for uma permutação de `atuais`"""
+    repetidos = sorted(item_id for item_id, vezes in Counter(ids).items() if vezes > 1)
+    if repetidos:
+        raise ValueError(f"Ids repetidos na nova ordem: {repetidos}")
+    atuais = set(atuais)
+    faltando, desconhecidos = sorted(atuais - set(ids)), sorted(set(ids) - atuais)
+    if faltando or desconhecidos:
+        raise ValueError(
+            f"A nova ordem deve conter exatamente as {itens} "
+            f"(faltando: {faltando}, desconhecidos: {desconhecidos})"
+        )
 
-def delete_pergunta(db: Session, pergunta_id: int):
-    db_pergunta = db.query(Pergunta).filter(Pergunta.id == pergunta_id).first()
-    if db_pergunta:
-        db.delete(db_pergunta)
-        db.commit()
-    return db_pergunta
+
+def _stmt_reordenar(model, ids: List[int], dialeto: str, *criterios):
+    """
+    UPDATE único com a nova `ordem` de cada id, só nas linhas que mudam. No
+    Postgres os pares (id, ordem) vão como dois arrays (unnest), com dois
+    parâmetros qualquer que seja o tamanho da lista; nos demais bancos, CASE.
+    """
+    ordens = list(range(1, len(ids) + 1))
+    if dialeto == "postgresql":
+        nova = select(
+            func.unnest(literal(ids, ARRAY(Integer))).label("id"),
+            func.unnest(literal(ordens, ARRAY(Integer))).label("ordem"),
+        ).subquery("nova")
+        stmt = (
+            update(model)
+            .where(model.id == nova.c.id, model.ordem != nova.c.ordem, *criterios)
+            .values(ordem=nova.c.ordem)
+        )
+    else:
+        nova_ordem = case(dict(zip(ids, ordens)), value=model.id)
+        stmt = (
+            update(model)
+            .where(model.id.in_(ids), model.ordem != nova_ordem, *criterios)
+            .values(ordem=nova_ordem)
+        )
+    return stmt.execution_options(synchronize_session=False)
+
+
+def _itens_ordem(ids: List[int]) -> List[dict]:
+    return [{"id": item_id, "ordem": ordem} for ordem, item_id in enumerate(ids, 1)]
+
+
+def reordenar_perguntas(db: Session, formulario_id: int, perguntas_ids: List[int]) -> Optional[List[dict]]:
+    """
+    Grava a nova ordem das perguntas do formulário (`perguntas_ids`, com todas
+    elas) em uma transação: trava o formulário, confere os ids e faz um único
+    UPDATE. Retorna [{"id", "ordem"}], None se o formulário não existir ou
+    levanta ValueError se a lista não corresponder às perguntas.
+    """
+    if db.execute(_stmt_incrementar_versao(formulario_id)).rowcount == 0:
+        db.rollback()
+        return None
+    try:
+        atuais = db.scalars(_stmt_ids_perguntas(formulario_id)).all()
+        _validar_nova_ordem(perguntas_ids, atuais, "perguntas do formulário")
+    except ValueError:
+        db.rollback()
+        raise
+    stmt = _stmt_reordenar(Pergunta, perguntas_ids, db.get_bind().dialect.name, Pergunta.id_formulario == formulario_id)
+    db.execute(stmt)
+    db.commit()
+    invalidar_formulario(formulario_id, perguntas_ids)
+    return _itens_ordem(perguntas_ids)
 
 
 # CRUD para OpcoesRespostas
-def get_opcoes_resposta_by_pergunta(db: Session, pergunta_id: int):
-    return db.query(OpcoesRespostas).filter(OpcoesRespostas.id_pergunta == pergunta_id).all()
+def _formulario_da_pergunta(db: Session, pergunta_id: int) -> Optional[int]:
+    return db.query(Pergunta.id_formulario).filter(Pergunta.id == pergunta_id).scalar()
 
 
 def create_opcao_resposta(db: Session, pergunta_id: int, opcao: OpcoesRespostasCreate):
-    db_opcao = OpcoesRespostas(id_pergunta=pergunta_id, **opcao.dict())
-    db.add(db_opcao)
+    """Cria a opção de resposta; None se a pergunta não existir"""
+    try:
+        db_opcao = db.execute(_stmt_criar_opcao(pergunta_id, opcao)).one()
+    except IntegrityError as erro:
+        db.rollback()
+        if _violacao_chave_estrangeira(erro):
+            return None
+        raise
+    formulario_id = db.execute(_stmt_incrementar_versao_da_pergunta(pergunta_id)).scalar()
     db.commit()
-    db.refresh(db_opcao)
+    invalidar_pergunta(pergunta_id, formulario_id)
     return db_opcao
 
 
 def update_opcao_resposta(db: Session, opcao_id: int, opcao: OpcoesRespostasUpdate):
-    db_opcao = db.query(OpcoesRespostas).filter(OpcoesRespostas.id == opcao_id).first()
-    if db_opcao:
-        update_data = opcao.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_opcao, field, value)
-        db.commit()
-        db.refresh(db_opcao)
+    stmt = _stmt_atualizar(OpcoesRespostas, opcao_id, opcao.model_dump(exclude_unset=True), _CAMPOS_OPCAO)
+    db_opcao = db.execute(stmt).first()
+    if db_opcao is None:
+        db.rollback()
+        return None
+    formulario_id = db.execute(_stmt_incrementar_versao_da_pergunta(db_opcao.id_pergunta)).scalar()
+    db.commit()
+    invalidar_pergunta(db_opcao.id_pergunta, formulario_id)
     return db_opcao
 
 
-def delete_opcao_resposta(db: Session, opcao_id: int):
-    db_opcao = db.query(OpcoesRespostas).filter(OpcoesRespostas.id == opcao_id).first()
-    if db_opcao:
-        db.delete(db_opcao)
-        db.commit()
-    return db_opcao
+def delete_opcao_resposta(db: Session, opcao_id: int) -> Optional[int]:
+    """Remove a opção de resposta; retorna o id da pergunta, ou None se não existir"""
+    pergunta_id = db.execute(_stmt_delete_opcao(opcao_id)).scalar()
+    if pergunta_id is None:
+        db.rollback()
+        return None
+    formulario_id = db.execute(_stmt_incrementar_versao_da_pergunta(pergunta_id)).scalar()
+    db.commit()
+    invalidar_pergunta(pergunta_id, formulario_id)
+    return pergunta_id
+
+
+def reordenar_opcoes_resposta(db: Session, pergunta_id: int, opcoes_ids: List[int]) -> Optional[List[dict]]:
+    """Como `reordenar_perguntas`, para as opções de resposta de uma pergunta"""
+    formulario_id = _formulario_da_pergunta(db, pergunta_id)
+    if formulario_id is None:
+        return None
+    _incrementar_versao(db, formulario_id)
+    try:
+        atuais = db.scalars(_stmt_ids_opcoes(pergunta_id)).all()
+        _validar_nova_ordem(opcoes_ids, atuais, "opções da pergunta")
+    except ValueError:
+        db.rollback()
+        raise
+    stmt = _stmt_reordenar(OpcoesRespostas, opcoes_ids, db.get_bind().dialect.name, OpcoesRespostas.id_pergunta == pergunta_id)
+    db.execute(stmt)
+    db.commit()
+    invalidar_pergunta(pergunta_id, formulario_id)
+    return _itens_ordem(opcoes_ids)
+
+
+# Respostas dos formulários: a estrutura usada para validar cada submissão
+# (app/ingestao.py) fica em cache, então aceitar uma resposta normalmente não
+# consulta o banco; a gravação é feita em lote, fora da requisição
+def _stmt_estrutura_perguntas(formulario_id: int):
+    return (
+        select(Pergunta.id, Pergunta.tipo_pergunta, Pergunta.obrigatoria)
+        .where(Pergunta.id_formulario == formulario_id)
+    )
+
+
+def _stmt_estrutura_opcoes(formulario_id: int):
+    perguntas_ids = select(Pergunta.id).where(Pergunta.id_formulario == formulario_id)
+    return select(OpcoesRespostas.id, OpcoesRespostas.id_pergunta).where(OpcoesRespostas.id_pergunta.in_(perguntas_ids))
+
+
+def get_estrutura_formulario(db: Session, formulario_id: int) -> Optional[EstruturaFormulario]:
+    """Perguntas e opções do formulário para validar respostas; None se não existir"""
+    chave = chave_estrutura(formulario_id)
+    estrutura = cache.get(chave)
+    if estrutura is not None:
+        return estrutura
+    # Uma escrita no meio da leitura impede o `cache.set`: sem isso, a estrutura
+    # anterior validaria as respostas até o TTL
+    marca = cache.marca()
+    versao = get_versao_formulario(db, formulario_id)
+    if versao is None:
+        return None
+    perguntas_rows = db.execute(_stmt_estrutura_perguntas(formulario_id)).all()
+    opcoes_rows = db.execute(_stmt_estrutura_opcoes(formulario_id)).all()
+    estrutura = montar_estrutura(versao, perguntas_rows, opcoes_rows)
+    cache.set(chave, estrutura, marca)
+    return estrutura
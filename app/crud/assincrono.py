@@ -0,0 +1,571 @@
+"""
+Versões assíncronas das operações CRUD, usadas quando DB_ASYNC=True.
+
+Como os objetos são serializados depois que a sessão deixa de ser usada,
+todo relacionamento exposto pelos schemas de resposta é carregado aqui de
+forma explícita (selectinload), nunca por lazy load.
+"""
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional, Tuple
+from app import schemas
+from app.cache import (
+    cache, chave_formulario, chave_pergunta, chave_estrutura, invalidar_formulario, invalidar_pergunta
+)
+from app.ingestao import EstruturaFormulario, montar_estrutura
+from app.instrumentacao import medir_serializacao
+from app.models import Formulario, Pergunta, OpcoesRespostas
+from app.projecao import Projecao
+import app.crud as crud
+from app.crud import (
+    _stmt_contar_perguntas, _stmt_pagina_perguntas, _resultado_pagina_perguntas,
+    _stmt_incrementar_versao, _stmt_versao_formulario, _stmt_versao_pergunta,
+    _stmt_formularios_resumo, _stmt_perguntas_formulario, _stmt_opcoes_das_perguntas,
+    _stmt_opcoes_da_pergunta, _perguntas_com_opcoes, _json_pagina_perguntas, _serializar,
+    _linhas_json, _inclui_opcoes, _projecao_opcoes, _stmt_formulario_parcial, _stmt_perguntas_parcial,
+    _stmt_opcoes_do_formulario, _stmt_pergunta, _json_formulario_parcial,
+    _termos_busca, _filtros_busca, _stmt_busca, _json_busca, _modo_alternativo,
+    _stmt_extensoes_busca, _extensoes_busca, _stmt_busca_excede_candidatos, _stmt_timeout_busca, _consulta_cancelada,
+    _stmt_formularios_lote, _stmt_perguntas_dos_formularios, _stmt_opcoes_dos_formularios, _stmt_perguntas_lote,
+    _stmt_perguntas_existentes, _em_cache, _guardar, _formularios_lote_json, _perguntas_lote_json, _json_lote,
+    _json_opcoes_lote, _stmt_ids_perguntas, _stmt_ids_opcoes, _validar_nova_ordem, _stmt_reordenar, _itens_ordem,
+    _stmt_delete_formulario, _stmt_delete_pergunta, _stmt_delete_opcao, _stmt_incrementar_versao_da_pergunta,
+    _violacao_chave_estrangeira, _stmt_atualizar, _stmt_criar_formulario, _stmt_criar_pergunta, _stmt_criar_opcoes,
+    _stmt_criar_opcao, _valores_formulario, _json_formulario_atualizado,
+    _CAMPOS_FORMULARIO_RESUMO, _CAMPOS_PERGUNTA, _CAMPOS_OPCAO,
+    _stmt_estrutura_perguntas, _stmt_estrutura_opcoes,
+    _stmt_formulario_resumo, _stmt_perguntas_stream, _abertura_stream, _lote_stream, _isolamento_stream,
+    LOTE_STREAM, cursor_proxima_pagina
+)
+from app.schemas import (
+    FormularioCreate, FormularioUpdate,
+    PerguntaCreate, PerguntaUpdate, PerguntaFilter,
+    OpcoesRespostasCreate, OpcoesRespostasUpdate,
+    TipoPerguntaEnum, ModoBuscaEnum
+)
+
+
+# Versão dos formulários (ETag)
+async def _incrementar_versao(db: AsyncSession, *formularios_ids: Optional[int]):
+    stmt = _stmt_incrementar_versao(*formularios_ids)
+    if stmt is not None:
+        await db.execute(stmt)
+
+
+async def get_versao_formulario(db: AsyncSession, formulario_id: int) -> Optional[int]:
+    result = await db.execute(_stmt_versao_formulario(formulario_id))
+    return result.scalar()
+
+
+async def get_versao_pergunta(db: AsyncSession, pergunta_id: int) -> Optional[int]:
+    result = await db.execute(_stmt_versao_pergunta(pergunta_id))
+    return result.scalar()
+
+
+# CRUD para Formulario
+async def get_formulario_completo(db: AsyncSession, formulario_id: int):
+    result = await db.execute(
+        select(Formulario)
+        .options(
+            selectinload(Formulario.perguntas)
+            .selectinload(Pergunta.opcoes_respostas)
+        )
+        .where(Formulario.id == formulario_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+
+async def get_formulario_json(
+    db: AsyncSession,
+    formulario_id: int,
+    usar_cache: bool = True,
+    versao_cliente: Optional[int] = None
+) -> Optional[Tuple[int, Optional[bytes]]]:
+    chave = chave_formulario(formulario_id)
+    if usar_cache:
+        item = cache.get(chave)
+        if item is not None:
+            versao, conteudo = item
+            return versao, (None if versao == versao_cliente else conteudo)
+    # Antes de ir ao banco: uma escrita no meio da leitura impede o `cache.set`
+    marca = cache.marca()
+
+    if versao_cliente is not None:
+        versao = await get_versao_formulario(db, formulario_id)
+        if versao is None:
+            return None
+        if versao == versao_cliente:
+            return versao, None
+
+    db_formulario = await get_formulario_completo(db, formulario_id)
+    if db_formulario is None:
+        return None
+    with medir_serializacao():
+        conteudo = schemas.Formulario.model_validate(db_formulario).model_dump_json().encode()
+    if usar_cache:
+        cache.set(chave, (db_formulario.versao, conteudo), marca)
+    return db_formulario.versao, conteudo
+
+
+async def _gerar_formulario_stream(conn, formulario_row, lote: int):
+    try:
+        yield _abertura_stream(formulario_row)
+        resultado = await conn.stream(_stmt_perguntas_stream(formulario_row.id).execution_options(yield_per=lote))
+        primeiro = True
+        async for perguntas in resultado.partitions():
+            opcoes = (await conn.execute(_stmt_opcoes_das_perguntas([pergunta.id for pergunta in perguntas]))).all()
+            yield _lote_stream(perguntas, opcoes, primeiro)
+            primeiro = False
+        yield b"]}"
+    finally:
+        await conn.close()
+
+
+async def get_formulario_stream(
+    db: AsyncSession,
+    formulario_id: int,
+    usar_cache: bool = True,
+    versao_cliente: Optional[int] = None,
+    lote: int = LOTE_STREAM
+):
+    if usar_cache:
+        item = cache.get(chave_formulario(formulario_id))
+        if item is not None:
+            versao, conteudo = item
+            return versao, (None if versao == versao_cliente else iter([conteudo])), None
+
+    conn = await db.bind.connect()
+    try:
+        await conn.execution_options(**_isolamento_stream(conn))
+        await conn.begin()
+        formulario = (await conn.execute(_stmt_formulario_resumo(formulario_id))).first()
+    except Exception:
+        await conn.close()
+        raise
+    if formulario is None or formulario.versao == versao_cliente:
+        await conn.close()
+        return None if formulario is None else (formulario.versao, None, None)
+    return formulario.versao, _gerar_formulario_stream(conn, formulario, lote), conn.close
+
+
+async def create_formulario(db: AsyncSession, formulario: FormularioCreate):
+    db_formulario = (await db.execute(_stmt_criar_formulario(formulario))).one()
+    await db.commit()
+    return db_formulario
+
+
+async def update_formulario(db: AsyncSession, formulario_id: int, formulario: FormularioUpdate) -> Optional[bytes]:
+    stmt = _stmt_atualizar(Formulario, formulario_id, _valores_formulario(formulario), _CAMPOS_FORMULARIO_RESUMO)
+    db_formulario = (await db.execute(stmt)).first()
+    if db_formulario is None:
+        await db.rollback()
+        return None
+    perguntas_rows = (await db.execute(_stmt_perguntas_dos_formularios([formulario_id]))).all()
+    opcoes_rows = (await db.execute(_stmt_opcoes_dos_formularios([formulario_id]))).all()
+    await db.commit()
+    invalidar_formulario(formulario_id)
+    return _json_formulario_atualizado(db_formulario, perguntas_rows, opcoes_rows)
+
+
+async def delete_formulario(db: AsyncSession, formulario_id: int) -> Optional[int]:
+    perguntas_ids = (await db.scalars(_stmt_ids_perguntas(formulario_id))).all() if cache.habilitado else []
+    removido = (await db.execute(_stmt_delete_formulario(formulario_id))).scalar()
+    if removido is None:
+        await db.rollback()
+        return None
+    await db.commit()
+    invalidar_formulario(formulario_id, perguntas_ids)
+    return removido
+
+
+# CRUD para Pergunta
+async def get_pergunta_json(
+    db: AsyncSession,
+    pergunta_id: int,
+    usar_cache: bool = True,
+    versao_cliente: Optional[int] = None
+) -> Optional[Tuple[int, Optional[bytes]]]:
+    chave = chave_pergunta(pergunta_id)
+    if usar_cache:
+        item = cache.get(chave)
+        if item is not None:
+            versao, conteudo = item
+            return versao, (None if versao == versao_cliente else conteudo)
+    # Antes de ir ao banco: uma escrita no meio da leitura impede o `cache.set`
+    marca = cache.marca()
+
+    versao = await get_versao_pergunta(db, pergunta_id)
+    if versao is None:
+        return None
+    if versao == versao_cliente:
+        return versao, None
+
+    pergunta = (await db.execute(_stmt_pergunta(pergunta_id))).first()
+    if pergunta is None:
+        return None
+    opcoes = (await db.execute(_stmt_opcoes_da_pergunta(pergunta_id))).all()
+    conteudo = _serializar(_perguntas_com_opcoes([pergunta], opcoes)[0])
+    if usar_cache:
+        cache.set(chave, (versao, conteudo), marca)
+    return versao, conteudo
+
+
+async def count_perguntas_by_formulario(
+    db: AsyncSession,
+    formulario_id: int,
+    filters: Optional[PerguntaFilter] = None
+) -> int:
+    result = await db.execute(_stmt_contar_perguntas(formulario_id, filters))
+    return result.scalar_one()
+
+
+async def get_formularios_json(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    projecao: Optional[Projecao] = None
+) -> Tuple[bytes, Optional[str]]:
+    result = await db.execute(_stmt_formularios_resumo(skip, limit, cursor, projecao))
+    rows = result.all()
+    return _serializar(_linhas_json(rows, projecao)), cursor_proxima_pagina(Formulario, rows, limit)
+
+
+async def _opcoes_das_perguntas(db: AsyncSession, perguntas_rows, projecao: Optional[Projecao] = None):
+    if not perguntas_rows or not _inclui_opcoes(projecao):
+        return []
+    stmt = _stmt_opcoes_das_perguntas([row.id for row in perguntas_rows], _projecao_opcoes(projecao))
+    result = await db.execute(stmt)
+    return result.all()
+
+
+async def get_perguntas_by_formulario_json(
+    db: AsyncSession,
+    formulario_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    filters: Optional[PerguntaFilter] = None,
+    order_by: str = "ordem",
+    order_desc: bool = False,
+    cursor: Optional[str] = None,
+    projecao: Optional[Projecao] = None
+) -> Tuple[bytes, Optional[str]]:
+    result = await db.execute(
+        _stmt_perguntas_formulario(formulario_id, skip, limit, filters, order_by, order_desc, cursor, projecao)
+    )
+    rows = result.all()
+    opcoes = await _opcoes_das_perguntas(db, rows, projecao)
+    return (
+        _serializar(_perguntas_com_opcoes(rows, opcoes, projecao)),
+        cursor_proxima_pagina(Pergunta, rows, limit, order_by, order_desc),
+    )
+
+
+async def get_pagina_perguntas_json(
+    db: AsyncSession,
+    formulario_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    filters: Optional[PerguntaFilter] = None,
+    order_by: str = "ordem",
+    order_desc: bool = False,
+    cursor: Optional[str] = None,
+    projecao: Optional[Projecao] = None
+) -> Optional[bytes]:
+    stmt = _stmt_pagina_perguntas(formulario_id, skip, limit, filters, order_by, order_desc, cursor, projecao)
+    result = await db.execute(stmt)
+    resultado = _resultado_pagina_perguntas(result.all())
+    if resultado is None:
+        return None
+    perguntas, total = resultado
+    opcoes = await _opcoes_das_perguntas(db, perguntas, projecao)
+    return _json_pagina_perguntas(perguntas, opcoes, total, skip, limit, order_by, order_desc, projecao)
+
+
+async def get_formulario_parcial_json(
+    db: AsyncSession,
+    formulario_id: int,
+    projecao: Projecao,
+    versao_cliente: Optional[int] = None
+) -> Optional[Tuple[int, Optional[bytes]]]:
+    formulario = (await db.execute(_stmt_formulario_parcial(formulario_id, projecao))).first()
+    if formulario is None:
+        return None
+    if formulario.versao == versao_cliente:
+        return formulario.versao, None
+
+    perguntas, opcoes = [], []
+    if projecao.inclui("perguntas"):
+        projecao_perguntas = projecao.relacionamentos["perguntas"]
+        perguntas = (await db.execute(_stmt_perguntas_parcial(formulario_id, projecao_perguntas))).all()
+        if perguntas and _inclui_opcoes(projecao_perguntas):
+            stmt = _stmt_opcoes_do_formulario(formulario_id, _projecao_opcoes(projecao_perguntas))
+            opcoes = (await db.execute(stmt)).all()
+    return formulario.versao, _json_formulario_parcial(formulario, perguntas, opcoes, projecao)
+
+
+async def get_pergunta_parcial_json(
+    db: AsyncSession,
+    pergunta_id: int,
+    projecao: Projecao,
+    versao_cliente: Optional[int] = None
+) -> Optional[Tuple[int, Optional[bytes]]]:
+    versao = await get_versao_pergunta(db, pergunta_id)
+    if versao is None:
+        return None
+    if versao == versao_cliente:
+        return versao, None
+
+    pergunta = (await db.execute(_stmt_pergunta(pergunta_id, projecao))).first()
+    if pergunta is None:
+        return None
+    opcoes = []
+    if _inclui_opcoes(projecao):
+        opcoes = (await db.execute(_stmt_opcoes_da_pergunta(pergunta_id, _projecao_opcoes(projecao)))).all()
+    return versao, _serializar(_perguntas_com_opcoes([pergunta], opcoes, projecao)[0])
+
+
+async def get_formularios_lote_json(db: AsyncSession, formularios_ids: List[int], usar_cache: bool = True) -> bytes:
+    conteudos = _em_cache(chave_formulario, formularios_ids, usar_cache)
+    faltantes = [formulario_id for formulario_id in formularios_ids if formulario_id not in conteudos]
+    if faltantes:
+        marca = cache.marca()
+        formularios = (await db.execute(_stmt_formularios_lote(faltantes))).all()
+        perguntas, opcoes = [], []
+        if formularios:
+            encontrados = [formulario.id for formulario in formularios]
+            perguntas = (await db.execute(_stmt_perguntas_dos_formularios(encontrados))).all()
+            if perguntas:
+                opcoes = (await db.execute(_stmt_opcoes_dos_formularios(encontrados))).all()
+        lidos = _formularios_lote_json(formularios, perguntas, opcoes)
+        conteudos.update(_guardar(chave_formulario, lidos, usar_cache, marca))
+    return _json_lote(conteudos, formularios_ids)
+
+
+async def get_perguntas_lote_json(db: AsyncSession, perguntas_ids: List[int], usar_cache: bool = True) -> bytes:
+    conteudos = _em_cache(chave_pergunta, perguntas_ids, usar_cache)
+    faltantes = [pergunta_id for pergunta_id in perguntas_ids if pergunta_id not in conteudos]
+    if faltantes:
+        marca = cache.marca()
+        perguntas = (await db.execute(_stmt_perguntas_lote(faltantes))).all()
+        opcoes = []
+        if perguntas:
+            stmt = _stmt_opcoes_das_perguntas([pergunta.id for pergunta in perguntas])
+            opcoes = (await db.execute(stmt)).all()
+        lidos = _perguntas_lote_json(perguntas, opcoes)
+        conteudos.update(_guardar(chave_pergunta, lidos, usar_cache, marca))
+    return _json_lote(conteudos, perguntas_ids)
+
+
+async def get_opcoes_resposta_lote_json(db: AsyncSession, perguntas_ids: List[int]) -> bytes:
+    existentes = (await db.execute(_stmt_perguntas_existentes(perguntas_ids))).scalars().all()
+    opcoes = (await db.execute(_stmt_opcoes_das_perguntas(existentes))).all() if existentes else []
+    return _json_opcoes_lote(perguntas_ids, existentes, opcoes)
+
+
+async def _extensoes(db: AsyncSession) -> set:
+    if db.bind.dialect.name != "postgresql":
+        return set()
+    chave = str(db.bind.url)
+    if chave not in _extensoes_busca:
+        _extensoes_busca[chave] = set((await db.execute(_stmt_extensoes_busca())).scalars())
+    return _extensoes_busca[chave]
+
+
+async def _buscar_ranqueada(db: AsyncSession, modo: ModoBuscaEnum, texto: str, termos: List[str], criterios: list,
+                            skip: int, limit: int) -> Tuple[list, bool]:
+    if crud.BUSCA_TIMEOUT_MS > 0:
+        savepoint = await db.begin_nested()
+        try:
+            await db.execute(_stmt_timeout_busca())
+            return (await db.execute(_stmt_busca(modo, texto, termos, criterios, skip, limit))).all(), False
+        except DBAPIError as erro:
+            if not _consulta_cancelada(erro):
+                raise
+        finally:
+            await savepoint.rollback()
+    stmt = _stmt_busca(modo, texto, termos, criterios, skip, limit, crud.BUSCA_MAX_CANDIDATOS)
+    rows = (await db.execute(stmt)).all()
+    truncado = (await db.execute(_stmt_busca_excede_candidatos(modo, texto, termos, criterios))).first() is not None
+    return rows, truncado
+
+
+async def buscar_perguntas_json(
+    db: AsyncSession,
+    texto: str,
+    skip: int = 0,
+    limit: int = 10,
+    id_formulario: Optional[int] = None,
+    tipo_pergunta: Optional[TipoPerguntaEnum] = None
+) -> bytes:
+    termos = _termos_busca(texto)
+    criterios = _filtros_busca(id_formulario, tipo_pergunta)
+    extensoes = await _extensoes(db)
+
+    if db.bind.dialect.name == "postgresql":
+        modo = ModoBuscaEnum.TEXTO_COMPLETO
+        rows, truncado = await _buscar_ranqueada(db, modo, texto, termos, criterios, skip, limit)
+        if rows or (skip and (await db.execute(_stmt_busca(modo, texto, termos, criterios, 0, 1, 1))).first()):
+            return _json_busca(rows, modo, skip, limit, truncado)
+
+    modo = _modo_alternativo(db.bind, extensoes, id_formulario)
+    if modo is None:
+        return _json_busca([], ModoBuscaEnum.TEXTO_COMPLETO, skip, limit)
+    if modo == ModoBuscaEnum.SUBSTRING:
+        rows = (await db.execute(_stmt_busca(modo, texto, termos, criterios, skip, limit))).all()
+        return _json_busca(rows, modo, skip, limit)
+    rows, truncado = await _buscar_ranqueada(db, modo, texto, termos, criterios, skip, limit)
+    return _json_busca(rows, modo, skip, limit, truncado)
+
+
+async def create_pergunta(db: AsyncSession, pergunta: PerguntaCreate) -> Optional[dict]:
+    try:
+        db_pergunta = (await db.execute(_stmt_criar_pergunta(pergunta))).one()
+    except IntegrityError as erro:
+        await db.rollback()
+        if _violacao_chave_estrangeira(erro):
+            return None
+        raise
+    # Pergunta e opções de resposta gravadas na mesma transação
+    opcoes_rows = []
+    if pergunta.opcoes_respostas:
+        opcoes = [{"id_pergunta": db_pergunta.id, **opcao.model_dump()} for opcao in pergunta.opcoes_respostas]
+        opcoes_rows = (await db.execute(_stmt_criar_opcoes(), opcoes)).all()
+    await _incrementar_versao(db, db_pergunta.id_formulario)
+    await db.commit()
+    invalidar_pergunta(db_pergunta.id, db_pergunta.id_formulario)
+    return _perguntas_com_opcoes([db_pergunta], opcoes_rows)[0]
+
+
+async def create_perguntas_bulk(db: AsyncSession, perguntas: List[PerguntaCreate], atomico: bool = False):
+    # Lógica em várias etapas: reaproveita a versão síncrona sobre a conexão assíncrona
+    return await db.run_sync(crud.create_perguntas_bulk, perguntas, atomico)
+
+
+async def update_pergunta(db: AsyncSession, pergunta_id: int, pergunta: PerguntaUpdate) -> Optional[dict]:
+    stmt = _stmt_atualizar(Pergunta, pergunta_id, pergunta.model_dump(exclude_unset=True), _CAMPOS_PERGUNTA)
+    db_pergunta = (await db.execute(stmt)).first()
+    if db_pergunta is None:
+        await db.rollback()
+        return None
+    await _incrementar_versao(db, db_pergunta.id_formulario)
+    opcoes_rows = (await db.execute(_stmt_opcoes_da_pergunta(pergunta_id))).all()
+    await db.commit()
+    invalidar_pergunta(pergunta_id, db_pergunta.id_formulario)
+    return _perguntas_com_opcoes([db_pergunta], opcoes_rows)[0]
+
+
+async def delete_pergunta(db: AsyncSession, pergunta_id: int) -> Optional[int]:
+    formulario_id = (await db.execute(_stmt_delete_pergunta(pergunta_id))).scalar()
+    if formulario_id is None:
+        await db.rollback()
+        return None
+    await _incrementar_versao(db, formulario_id)
+    await db.commit()
+    invalidar_pergunta(pergunta_id, formulario_id)
+    return formulario_id
+
+
+async def reordenar_perguntas(db: AsyncSession, formulario_id: int, perguntas_ids: List[int]) -> Optional[List[dict]]:
+    if (await db.execute(_stmt_incrementar_versao(formulario_id))).rowcount == 0:
+        await db.rollback()
+        return None
+    try:
+        atuais = (await db.scalars(_stmt_ids_perguntas(formulario_id))).all()
+        _validar_nova_ordem(perguntas_ids, atuais, "perguntas do formulário")
+    except ValueError:
+        await db.rollback()
+        raise
+    stmt = _stmt_reordenar(Pergunta, perguntas_ids, db.bind.dialect.name, Pergunta.id_formulario == formulario_id)
+    await db.execute(stmt)
+    await db.commit()
+    invalidar_formulario(formulario_id, perguntas_ids)
+    return _itens_ordem(perguntas_ids)
+
+
+# CRUD para OpcoesRespostas
+async def _formulario_da_pergunta(db: AsyncSession, pergunta_id: int) -> Optional[int]:
+    result = await db.execute(select(Pergunta.id_formulario).where(Pergunta.id == pergunta_id))
+    return result.scalar()
+
+
+async def get_opcoes_resposta_json(db: AsyncSession, pergunta_id: int) -> bytes:
+    result = await db.execute(_stmt_opcoes_da_pergunta(pergunta_id))
+    return _serializar([row._asdict() for row in result.all()])
+
+
+async def create_opcao_resposta(db: AsyncSession, pergunta_id: int, opcao: OpcoesRespostasCreate):
+    try:
+        db_opcao = (await db.execute(_stmt_criar_opcao(pergunta_id, opcao))).one()
+    except IntegrityError as erro:
+        await db.rollback()
+        if _violacao_chave_estrangeira(erro):
+            return None
+        raise
+    formulario_id = (await db.execute(_stmt_incrementar_versao_da_pergunta(pergunta_id))).scalar()
+    await db.commit()
+    invalidar_pergunta(pergunta_id, formulario_id)
+    return db_opcao
+
+
+async def update_opcao_resposta(db: AsyncSession, opcao_id: int, opcao: OpcoesRespostasUpdate):
+    stmt = _stmt_atualizar(OpcoesRespostas, opcao_id, opcao.model_dump(exclude_unset=True), _CAMPOS_OPCAO)
+    db_opcao = (await db.execute(stmt)).first()
+    if db_opcao is None:
+        await db.rollback()
+        return None
+    formulario_id = (await db.execute(_stmt_incrementar_versao_da_pergunta(db_opcao.id_pergunta))).scalar()
+    await db.commit()
+    invalidar_pergunta(db_opcao.id_pergunta, formulario_id)
+    return db_opcao
+
+
+async def delete_opcao_resposta(db: AsyncSession, opcao_id: int) -> Optional[int]:
+    pergunta_id = (await db.execute(_stmt_delete_opcao(opcao_id))).scalar()
+    if pergunta_id is None:
+        await db.rollback()
+        return None
+    formulario_id = (await db.execute(_stmt_incrementar_versao_da_pergunta(pergunta_id))).scalar()
+    await db.commit()
+    invalidar_pergunta(pergunta_id, formulario_id)
+    return pergunta_id
+
+
+async def reordenar_opcoes_resposta(db: AsyncSession, pergunta_id: int, opcoes_ids: List[int]) -> Optional[List[dict]]:
+    formulario_id = await _formulario_da_pergunta(db, pergunta_id)
+    if formulario_id is None:
+        return None
+    await _incrementar_versao(db, formulario_id)
+    try:
+        atuais = (await db.scalars(_stmt_ids_opcoes(pergunta_id))).all()
+        _validar_nova_ordem(opcoes_ids, atuais, "opções da pergunta")
+    except ValueError:
+        await db.rollback()
+        raise
+    stmt = _stmt_reordenar(OpcoesRespostas, opcoes_ids, db.bind.dialect.name, OpcoesRespostas.id_pergunta == pergunta_id)
+    await db.execute(stmt)
+    await db.commit()
+    invalidar_pergunta(pergunta_id, formulario_id)
+    return _itens_ordem(opcoes_ids)
+
+
+# Respostas dos formulários
+async def get_estrutura_formulario(db: AsyncSession, formulario_id: int) -> Optional[EstruturaFormulario]:
+    chave = chave_estrutura(formulario_id)
+    estrutura = cache.get(chave)
+    if estrutura is not None:
+        return estrutura
+    # Uma escrita no meio da leitura impede o `cache.set`: sem isso, a estrutura
+    # anterior validaria as respostas até o TTL
+    marca = cache.marca()
+    versao = await get_versao_formulario(db, formulario_id)
+    if versao is None:
+        return None
+    perguntas_rows = (await db.execute(_stmt_estrutura_perguntas(formulario_id))).all()
+    opcoes_rows = (await db.execute(_stmt_estrutura_opcoes(formulario_id))).all()
+    estrutura = montar_estrutura(versao, perguntas_rows, opcoes_rows)
+    cache.set(chave, estrutura, marca)
+    return estrutura
@@ -1,8 +1,15 @@
 import os
-from sqlalchemy import create_engine
+from typing import List
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from fastapi import Request
+
+from app.instrumentacao import instrumentar_engine
+from app.metricas import PoolMedido, PoolAssincronoMedido
+from app.replicas import Replicas, ler_do_primario
 
 load_dotenv()
 
@@ -13,13 +20,158 @@ DB_NAME = os.getenv("DB_NAME", "postgres")
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "12345")
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# DATABASE_URL / ASYNC_DATABASE_URL, se definidas, substituem as variáveis acima
+# (ex.: sqlite:///bench.db para benchmarks locais)
+DATABASE_URL = os.getenv(
+    "DATABASE_URL", f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL", f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+
+# Réplicas de leitura (opcional), separadas por vírgula. Sem ASYNC_DATABASE_REPLICA_URLS,
+# as URLs assíncronas são derivadas das síncronas com o driver asyncpg
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+ASYNC_DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("ASYNC_DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+] or [str(make_url(url).set(drivername="postgresql+asyncpg")) for url in DATABASE_REPLICA_URLS]
+DB_REPLICA_RETRY = float(os.getenv("DB_REPLICA_RETRY", 30))  # segundos fora do rodízio após uma falha
+DB_REPLICA_STICKY = float(os.getenv("DB_REPLICA_STICKY", 5))  # leituras no primário após uma escrita
+DB_REPLICA_CONNECT_TIMEOUT = int(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", 2))
+
+# Modo assíncrono (AsyncEngine/AsyncSession com asyncpg) para os routers
+DB_ASYNC = os.getenv("DB_ASYNC", "False").lower() == "true"
+
+# Pool de conexões (por engine e por processo)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # -1 desabilita
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+
+# Conexões abertas em segundo plano ao subir cada worker (0 desabilita)
+DB_POOL_WARMUP = min(int(os.getenv("DB_POOL_WARMUP", 1)), DB_POOL_SIZE)
+
+POOL_KWARGS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    # pre-ping descarta conexões mortas (ex.: após failover) antes de usá-las
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
 
-engine = create_engine(DATABASE_URL)
+def _chaves_estrangeiras_sqlite(engine):
+    """
+    O SQLite só aplica chaves estrangeiras, e com elas o ON DELETE CASCADE das
+    exclusões, com `PRAGMA foreign_keys` ligado em cada conexão
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    def ligar(conexao, registro):
+        cursor = conexao.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    event.listen(engine, "connect", ligar)
+
+
+engine = create_engine(DATABASE_URL, poolclass=PoolMedido, **POOL_KWARGS)
+instrumentar_engine(engine)
+_chaves_estrangeiras_sqlite(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Gravação das respostas (app.ingestao): uma thread por worker, síncrona nos
+# dois modos, com um engine próprio de uma única conexão. Não disputa o pool
+# das requisições, e run.py a desconta de DB_MAX_CONNECTIONS
+DB_CONEXOES_INGESTAO = 1
+engine_ingestao = create_engine(
+    DATABASE_URL, **{**POOL_KWARGS, "pool_size": DB_CONEXOES_INGESTAO, "max_overflow": 0}
+)
+_chaves_estrangeiras_sqlite(engine_ingestao)
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, poolclass=PoolAssincronoMedido, **POOL_KWARGS
+    )
+    instrumentar_engine(async_engine.sync_engine)
+    _chaves_estrangeiras_sqlite(async_engine.sync_engine)
+    # expire_on_commit=False: os objetos retornados são serializados fora da
+    # sessão, onde não é possível fazer lazy load de forma assíncrona
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+def _criar_replicas(urls: List[str]) -> Replicas:
+    """Engines das réplicas do modo ativo; uma réplica inacessível falha rápido no connect"""
+    engines = []
+    for url in urls:
+        # Limite de conexão do driver do Postgres (asyncpg / psycopg2); o SQLite não tem
+        connect_args = {}
+        if make_url(url).get_backend_name() == "postgresql":
+            connect_args = {"timeout" if DB_ASYNC else "connect_timeout": DB_REPLICA_CONNECT_TIMEOUT}
+        if DB_ASYNC:
+            replica = create_async_engine(url, poolclass=PoolAssincronoMedido, connect_args=connect_args, **POOL_KWARGS)
+            instrumentar_engine(replica.sync_engine)
+        else:
+            replica = create_engine(url, poolclass=PoolMedido, connect_args=connect_args, **POOL_KWARGS)
+            instrumentar_engine(replica)
+        engines.append(replica)
+    return Replicas(engines, DB_REPLICA_RETRY)
+
+
+replicas = _criar_replicas(ASYNC_DATABASE_REPLICA_URLS if DB_ASYNC else DATABASE_REPLICA_URLS)
+
 Base = declarative_base()
 
+
+# Aquecimento do pool (lifespan). create_engine não conecta: sem aquecimento, a
+# primeira requisição de cada worker pagaria o handshake com o banco.
+
+def aquecer_pool(conexoes: int = DB_POOL_WARMUP) -> int:
+    """Abre `conexoes` conexões e as devolve ao pool; retorna quantas abriu"""
+    abertas = []
+    try:
+        for _ in range(conexoes):
+            abertas.append(engine.connect())
+    finally:
+        for conn in abertas:
+            conn.close()
+    return len(abertas)
+
+
+async def aquecer_pool_assincrono(conexoes: int = DB_POOL_WARMUP) -> int:
+    """Versão de `aquecer_pool` para o `async_engine`"""
+    abertas = []
+    try:
+        for _ in range(conexoes):
+            abertas.append(await async_engine.connect())
+    finally:
+        for conn in abertas:
+            await conn.close()
+    return len(abertas)
+
+
+async def encerrar_engines():
+    """Fecha as conexões do pool ao desligar o worker"""
+    engine.dispose()
+    engine_ingestao.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+    for replica in replicas.engines:
+        if DB_ASYNC:
+            await replica.dispose()
+        else:
+            replica.dispose()
+
+
 def get_db():
     """Dependency para obter sessão do banco de dados"""
     db = SessionLocal()
@@ -27,3 +179,69 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency para obter sessão assíncrona do banco de dados"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Sessões de leitura (réplicas)
+
+def _sessao_leitura(request):
+    if ler_do_primario(request):
+        replicas.contar("primario")
+        return SessionLocal()
+    for indice in replicas.candidatas():
+        db = SessionLocal(bind=replicas.engines[indice])
+        try:
+            # Conecta já aqui para trocar de réplica se esta estiver fora do ar
+            db.connection()
+        except DBAPIError:
+            db.close()
+            replicas.marcar_falha(indice)
+            continue
+        replicas.contar("replica")
+        return db
+    replicas.contar("sem_replica_disponivel")
+    return SessionLocal()
+
+
+def get_db_leitura(request: Request):
+    """
+    Dependency das rotas somente leitura: sessão em uma réplica (rodízio, com
+    failover para o primário) ou no primário se não houver réplicas configuradas
+    """
+    db = _sessao_leitura(request) if replicas else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def _sessao_leitura_assincrona(request):
+    if ler_do_primario(request):
+        replicas.contar("primario")
+        return AsyncSessionLocal()
+    for indice in replicas.candidatas():
+        db = AsyncSessionLocal(bind=replicas.engines[indice])
+        try:
+            await db.connection()
+        except (DBAPIError, OSError):
+            await db.close()
+            replicas.marcar_falha(indice)
+            continue
+        replicas.contar("replica")
+        return db
+    replicas.contar("sem_replica_disponivel")
+    return AsyncSessionLocal()
+
+
+async def get_async_db_leitura(request: Request):
+    """Versão assíncrona de `get_db_leitura`"""
+    db = await _sessao_leitura_assincrona(request) if replicas else AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -0,0 +1,58 @@
+"""
+GETs condicionais (ETag / If-None-Match) baseados na versão do formulário.
+
+`Formulario.versao` é incrementada por qualquer escrita no formulário, em suas
+perguntas ou em suas opções de resposta, então o par (recurso, id, versão)
+identifica univocamente o conteúdo retornado. O ETag é sempre fraco, W/"...":
+a mesma versão pode sair comprimida ou não (`app.compressao`), e o 304 precisa
+trazer o mesmo ETag do 200 que ele substitui, sem saber se este seria
+comprimido. If-None-Match usa comparação fraca e aceita as duas formas.
+"""
+import re
+from typing import Callable, Iterable, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+_ETAG = re.compile(r'^(?:W/)?"(?P<recurso>[a-z]+)-(?P<id>\d+)-v(?P<versao>\d+)"$')
+
+
+def gerar_etag(recurso: str, recurso_id: int, versao: int) -> str:
+    return f'W/"{recurso}-{recurso_id}-v{versao}"'
+
+
+def versao_if_none_match(request: Request, recurso: str, recurso_id: int) -> Optional[int]:
+    """Versão informada pelo cliente em If-None-Match para este recurso, se houver"""
+    for valor in request.headers.get("if-none-match", "").split(","):
+        match = _ETAG.match(valor.strip())
+        if match and match["recurso"] == recurso and int(match["id"]) == recurso_id:
+            return int(match["versao"])
+    return None
+
+
+def resposta_condicional(recurso: str, recurso_id: int, versao: int, conteudo: Optional[bytes]) -> Response:
+    """200 com o JSON, ou 304 Not Modified quando `conteudo` é None"""
+    headers = {"ETag": gerar_etag(recurso, recurso_id, versao)}
+    if conteudo is None:
+        return Response(status_code=304, headers=headers)
+    return Response(content=conteudo, media_type="application/json", headers=headers)
+
+
+def resposta_condicional_stream(
+    recurso: str,
+    recurso_id: int,
+    versao: int,
+    partes: Optional[Iterable[bytes]],
+    fechar: Optional[Callable] = None
+) -> Response:
+    """
+    Como `resposta_condicional`, com o JSON enviado em partes à medida que é
+    gerado. `fechar` roda ao fim da resposta, inclusive quando o cliente
+    desconecta antes de receber todas as partes (ou nenhuma)
+    """
+    headers = {"ETag": gerar_etag(recurso, recurso_id, versao)}
+    if partes is None:
+        return Response(status_code=304, headers=headers)
+    background = BackgroundTask(fechar) if fechar is not None else None
+    return StreamingResponse(partes, media_type="application/json", headers=headers, background=background)
@@ -0,0 +1,409 @@
+"""
+Ingestão das respostas enviadas aos formulários, com gravação em lote (write-behind).
+
+`POST /formularios/{id}/respostas` valida a submissão contra a estrutura do
+formulário (perguntas e opções, em cache), gera o id e a coloca em uma fila em
+memória limitada a RESPOSTAS_FILA_MAX submissões; com a fila cheia, a API
+responde 503 em vez de acumular requisições. Uma thread por processo, com uma
+conexão própria (`engine_ingestao`, também no modo assíncrono), esvazia a
+fila e grava as submissões em lotes, ao juntar RESPOSTAS_LOTE submissões ou
+RESPOSTAS_INTERVALO_MS depois da primeira: uma transação por lote, com COPY no
+Postgres (psycopg2) ou INSERT de várias linhas nos demais bancos.
+
+Uma submissão aceita (202) fica apenas em memória até seu lote ser gravado: se
+o processo morrer antes disso, ela se perde. Ao desligar o worker, a fila é
+esvaziada antes de as conexões serem fechadas. Falhas de conexão são repetidas
+com o mesmo lote, com espera crescente (enquanto isso a fila enche e a API
+responde 503); valores de formulários, perguntas ou opções removidos depois da
+aceitação são descartados, como o ON DELETE CASCADE teria feito.
+"""
+import io
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError, InterfaceError, OperationalError
+
+from app.database import engine_ingestao
+from app.models import Formulario, Pergunta, OpcoesRespostas, Resposta, RespostaValor
+from app.schemas import RespostaCreate, TipoPerguntaEnum
+
+load_dotenv()
+
+RESPOSTAS_FILA_MAX = int(os.getenv("RESPOSTAS_FILA_MAX", 50000))
+RESPOSTAS_LOTE = int(os.getenv("RESPOSTAS_LOTE", 2000))
+RESPOSTAS_INTERVALO_MS = float(os.getenv("RESPOSTAS_INTERVALO_MS", 200))
+# "copy" (padrão, apenas Postgres com psycopg2) ou "insert"
+RESPOSTAS_METODO = os.getenv("RESPOSTAS_METODO", "copy")
+# Segundos para gravar o que está na fila ao desligar o worker
+RESPOSTAS_ENCERRAMENTO = float(os.getenv("RESPOSTAS_ENCERRAMENTO", 25))
+ESPERA_MAX = 30  # segundos entre tentativas, com o banco fora do ar
+TENTATIVAS_ENCERRAMENTO = 3
+
+COLUNAS_RESPOSTA = ("id", "id_formulario", "versao_formulario", "recebida_em")
+COLUNAS_VALOR = ("id_resposta", "posicao", "id_pergunta", "id_opcao_resposta", "valor")
+
+logger = logging.getLogger(__name__)
+
+
+# Estrutura do formulário e validação das submissões
+
+class PerguntaEstrutura(NamedTuple):
+    tipo: str
+    obrigatoria: bool
+    opcoes: FrozenSet[int]
+
+
+class EstruturaFormulario(NamedTuple):
+    versao: int
+    perguntas: Dict[int, PerguntaEstrutura]
+    obrigatorias: FrozenSet[int]
+
+
+def montar_estrutura(versao: int, perguntas_rows, opcoes_rows) -> EstruturaFormulario:
+    """A partir das tuplas (id, tipo_pergunta, obrigatoria) e (id, id_pergunta)"""
+    opcoes = {}
+    for opcao in opcoes_rows:
+        opcoes.setdefault(opcao.id_pergunta, set()).add(opcao.id)
+    perguntas = {
+        pergunta.id: PerguntaEstrutura(
+            pergunta.tipo_pergunta, bool(pergunta.obrigatoria), frozenset(opcoes.get(pergunta.id, ()))
+        )
+        for pergunta in perguntas_rows
+    }
+    obrigatorias = frozenset(pergunta_id for pergunta_id, pergunta in perguntas.items() if pergunta.obrigatoria)
+    return EstruturaFormulario(versao, perguntas, obrigatorias)
+
+
+class Submissao(NamedTuple):
+    id: uuid.UUID
+    id_formulario: int
+    versao_formulario: int
+    recebida_em: datetime
+    valores: List[Tuple[int, Optional[int], Optional[str]]]  # (id_pergunta, id_opcao_resposta, valor)
+
+
+def _uuid_temporal() -> uuid.UUID:
+    """
+    UUID no formato da versão 7: milissegundos desde a época nos 48 bits
+    iniciais, o resto aleatório. Ids em ordem de chegada mantêm as inserções na
+    ponta das chaves primárias de resposta e resposta_valor, em vez de espalhadas
+    pelo índice inteiro como com uuid4
+    """
+    aleatorio = int.from_bytes(os.urandom(10), "big")
+    return uuid.UUID(int=(
+        (time.time_ns() // 1_000_000) << 80
+        | 0x7 << 76
+        | (aleatorio >> 62 & 0xFFF) << 64
+        | 0b10 << 62
+        | aleatorio & (1 << 62) - 1
+    ))
+
+
+_FORMATOS = {
+    TipoPerguntaEnum.INTEIRO.value: (re.compile(r"-?\d+"), "um número inteiro"),
+    TipoPerguntaEnum.NUMERO_DECIMAL.value: (re.compile(r"-?\d+([.,]\d{1,2})?"), "um número com até duas casas decimais"),
+}
+_VARIOS_VALORES = {TipoPerguntaEnum.MULTIPLA_ESCOLHA.value}
+# Respondidas escolhendo uma opção; `valor` só como complemento da opção
+_COM_OPCOES = {
+    TipoPerguntaEnum.SIM_NAO.value, TipoPerguntaEnum.UNICA_ESCOLHA.value, TipoPerguntaEnum.MULTIPLA_ESCOLHA.value,
+}
+MAX_IDS_ERRO = 20
+
+
+def preparar_submissao(formulario_id: int, estrutura: EstruturaFormulario, resposta: RespostaCreate) -> Submissao:
+    """
+    Valida a submissão contra a estrutura do formulário e a converte nas linhas
+    a gravar. ValueError descreve o primeiro problema encontrado
+    """
+    valores = []
+    respondidas = set()
+    opcoes_marcadas = set()
+    for item in resposta.valores:
+        pergunta = estrutura.perguntas.get(item.id_pergunta)
+        if pergunta is None:
+            raise ValueError(f"Pergunta {item.id_pergunta} não pertence ao formulário")
+        if item.id_pergunta in respondidas and pergunta.tipo not in _VARIOS_VALORES:
+            raise ValueError(f"Pergunta {item.id_pergunta} aceita um único valor")
+        if item.id_opcao_resposta is None and item.valor is None:
+            raise ValueError(f"Informe valor ou id_opcao_resposta para a pergunta {item.id_pergunta}")
+        if item.id_opcao_resposta is None and pergunta.tipo in _COM_OPCOES:
+            raise ValueError(f"Pergunta {item.id_pergunta}: escolha uma das opções (id_opcao_resposta)")
+        if item.id_opcao_resposta is not None:
+            if item.id_opcao_resposta not in pergunta.opcoes:
+                raise ValueError(f"Opção {item.id_opcao_resposta} não pertence à pergunta {item.id_pergunta}")
+            if item.id_opcao_resposta in opcoes_marcadas:
+                raise ValueError(f"Opção {item.id_opcao_resposta} repetida")
+            opcoes_marcadas.add(item.id_opcao_resposta)
+        if item.valor is not None:
+            if "\x00" in item.valor:
+                raise ValueError("valor não pode conter o caractere NUL")
+            formato = _FORMATOS.get(pergunta.tipo)
+            if formato is not None and not formato[0].fullmatch(item.valor.strip()):
+                raise ValueError(f"Pergunta {item.id_pergunta}: informe {formato[1]}")
+        respondidas.add(item.id_pergunta)
+        valores.append((item.id_pergunta, item.id_opcao_resposta, item.valor))
+
+    faltando = estrutura.obrigatorias - respondidas
+    if faltando:
+        raise ValueError(f"Perguntas obrigatórias sem resposta: {sorted(faltando)[:MAX_IDS_ERRO]}")
+    return Submissao(_uuid_temporal(), formulario_id, estrutura.versao, datetime.now(timezone.utc), valores)
+
+
+# Gravação em lote
+
+_ESCAPES_COPY = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+_NULO_COPY = "\\N"
+
+
+def _texto_copy(lote: List[Submissao]) -> Tuple[str, str]:
+    """
+    Linhas de resposta e de resposta_valor no formato texto do COPY (campos
+    separados por tabulação, \\N para NULL), na ordem de COLUNAS_RESPOSTA e
+    COLUNAS_VALOR
+    """
+    respostas = []
+    valores = []
+    for submissao in lote:
+        resposta_id = str(submissao.id)
+        respostas.append(
+            f"{resposta_id}\t{submissao.id_formulario}\t{submissao.versao_formulario}\t{submissao.recebida_em}\n"
+        )
+        for posicao, (pergunta_id, opcao_id, valor) in enumerate(submissao.valores):
+            opcao = _NULO_COPY if opcao_id is None else opcao_id
+            texto = _NULO_COPY if valor is None else valor.translate(_ESCAPES_COPY)
+            valores.append(f"{resposta_id}\t{posicao}\t{pergunta_id}\t{opcao}\t{texto}\n")
+    return "".join(respostas), "".join(valores)
+
+
+def _copiar(cursor, tabela: str, colunas: Tuple[str, ...], texto: str):
+    cursor.copy_expert(f"COPY {tabela} ({', '.join(colunas)}) FROM STDIN", io.StringIO(texto))
+
+
+class IngestaoRespostas:
+    """
+    Fila limitada de submissões e a thread que as grava em lotes. Uso:
+
+        ingestao.iniciar()                  # ao subir o worker
+        ingestao.enfileirar(submissao)      # False com a fila cheia (503)
+        ingestao.encerrar()                 # ao desligar: grava o que restou na fila
+    """
+
+    def __init__(
+        self,
+        engine,
+        fila_max: int = RESPOSTAS_FILA_MAX,
+        lote: int = RESPOSTAS_LOTE,
+        intervalo_ms: float = RESPOSTAS_INTERVALO_MS,
+        metodo: str = RESPOSTAS_METODO,
+    ):
+        self.engine = engine
+        self.lote = lote
+        self.intervalo = intervalo_ms / 1000
+        # COPY exige o psycopg2 (copy_expert); nos demais drivers, INSERT de várias linhas
+        self.metodo = "copy" if metodo == "copy" and engine.dialect.driver == "psycopg2" else "insert"
+        self._fila = queue.Queue(maxsize=fila_max)
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._contadores = {
+            "aceitas": 0,
+            "recusadas_fila_cheia": 0,
+            "gravadas": 0,
+            "valores_gravados": 0,
+            "descartadas": 0,
+            "valores_descartados": 0,
+            "lotes": 0,
+            "falhas": 0,
+        }
+        self._ultimo_lote = None
+        self._ultimo_erro = None
+
+    # API usada pelas rotas e pelo lifespan
+
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name="ingestao-respostas", daemon=True)
+            self._thread.start()
+
+    def encerrar(self, timeout: float = RESPOSTAS_ENCERRAMENTO):
+        """Grava as submissões que estão na fila e para a thread"""
+        if self._thread is None:
+            return
+        self._parar.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error("Ingestão de respostas encerrada com %d submissões na fila", self._fila.qsize())
+        self._thread = None
+
+    def enfileirar(self, submissao: Submissao) -> bool:
+        try:
+            self._fila.put_nowait(submissao)
+        except queue.Full:
+            self._contar(recusadas_fila_cheia=1)
+            return False
+        self._contar(aceitas=1)
+        return True
+
+    def pendentes(self) -> int:
+        """Submissões aceitas ainda não gravadas (nem descartadas)"""
+        with self._lock:
+            contadores = self._contadores
+            return contadores["aceitas"] - contadores["gravadas"] - contadores["descartadas"]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "metodo": self.metodo,
+                "ativa": self._thread is not None and self._thread.is_alive(),
+                "fila": self._fila.qsize(),
+                "fila_max": self._fila.maxsize,
+                "lote_max": self.lote,
+                "intervalo_ms": self.intervalo * 1000,
+                **self._contadores,
+                "ultimo_lote": self._ultimo_lote,
+                "ultimo_erro": self._ultimo_erro,
+            }
+
+    def _contar(self, **incrementos):
+        with self._lock:
+            for nome, valor in incrementos.items():
+                self._contadores[nome] += valor
+
+    # Thread de gravação
+
+    def _executar(self):
+        while True:
+            lote = self._coletar()
+            if lote:
+                self._gravar_lote(lote)
+            elif self._parar.is_set() and self._fila.empty():
+                return
+
+    def _coletar(self) -> List[Submissao]:
+        """Até `lote` submissões, esperando no máximo `intervalo` a partir da primeira"""
+        try:
+            lote = [self._fila.get(timeout=self.intervalo)]
+        except queue.Empty:
+            return []
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.lote:
+            try:
+                lote.append(self._fila.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            restante = limite - time.monotonic()
+            if restante <= 0 or self._parar.is_set():
+                break
+            try:
+                lote.append(self._fila.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _gravar_lote(self, lote: List[Submissao]):
+        filtrar = False
+        tentativa = 0
+        while True:
+            inicio = time.perf_counter()
+            try:
+                if filtrar:
+                    lote = self._sem_removidos(lote)
+                valores = self._gravar(lote)
+            except Exception as erro:
+                with self._lock:
+                    self._contadores["falhas"] += 1
+                    self._ultimo_erro = f"{erro.__class__.__name__}: {erro}"[:500]
+                if self._violacao_integridade(erro) and not filtrar:
+                    # Formulário, pergunta ou opção removidos depois da aceitação
+                    filtrar = True
+                    continue
+                tentativa += 1
+                if not self._transitoria(erro) or (self._parar.is_set() and tentativa >= TENTATIVAS_ENCERRAMENTO):
+                    logger.exception("Lote de %d respostas descartado", len(lote))
+                    self._contar(descartadas=len(lote), valores_descartados=sum(len(s.valores) for s in lote))
+                    return
+                self._parar.wait(min(2 ** tentativa, ESPERA_MAX))
+                continue
+            ms = round((time.perf_counter() - inicio) * 1000, 2)
+            with self._lock:
+                self._contadores["gravadas"] += len(lote)
+                self._contadores["valores_gravados"] += valores
+                self._contadores["lotes"] += 1
+                self._ultimo_lote = {"submissoes": len(lote), "valores": valores, "ms": ms}
+            return
+
+    def _gravar(self, lote: List[Submissao]) -> int:
+        """Grava o lote em uma transação; retorna o número de valores gravados"""
+        if not lote:
+            return 0
+        with self.engine.begin() as conn:
+            if self.metodo == "copy":
+                respostas, valores = _texto_copy(lote)
+                cursor = conn.connection.cursor()
+                try:
+                    _copiar(cursor, Resposta.__tablename__, COLUNAS_RESPOSTA, respostas)
+                    _copiar(cursor, RespostaValor.__tablename__, COLUNAS_VALOR, valores)
+                finally:
+                    cursor.close()
+            else:
+                conn.execute(insert(Resposta), [
+                    dict(zip(COLUNAS_RESPOSTA, (s.id, s.id_formulario, s.versao_formulario, s.recebida_em)))
+                    for s in lote
+                ])
+                valores = [
+                    dict(zip(COLUNAS_VALOR, (s.id, posicao, *valor)))
+                    for s in lote for posicao, valor in enumerate(s.valores)
+                ]
+                if valores:
+                    conn.execute(insert(RespostaValor), valores)
+        return sum(len(s.valores) for s in lote)
+
+    def _sem_removidos(self, lote: List[Submissao]) -> List[Submissao]:
+        """
+        Tira do lote as submissões de formulários removidos e os valores de
+        perguntas ou opções removidas depois da aceitação
+        """
+        formularios_ids = {s.id_formulario for s in lote}
+        perguntas_ids = {valor[0] for s in lote for valor in s.valores}
+        opcoes_ids = {valor[1] for s in lote for valor in s.valores if valor[1] is not None}
+        with self.engine.connect() as conn:
+            formularios = set(conn.scalars(select(Formulario.id).where(Formulario.id.in_(formularios_ids))))
+            perguntas = set(conn.scalars(select(Pergunta.id).where(Pergunta.id.in_(perguntas_ids))))
+            opcoes = set(conn.scalars(select(OpcoesRespostas.id).where(OpcoesRespostas.id.in_(opcoes_ids))))
+
+        restantes = []
+        for submissao in lote:
+            if submissao.id_formulario not in formularios:
+                self._contar(descartadas=1, valores_descartados=len(submissao.valores))
+                continue
+            valores = [
+                valor for valor in submissao.valores
+                if valor[0] in perguntas and (valor[1] is None or valor[1] in opcoes)
+            ]
+            self._contar(valores_descartados=len(submissao.valores) - len(valores))
+            restantes.append(submissao._replace(valores=valores))
+        return restantes
+
+    def _violacao_integridade(self, erro: Exception) -> bool:
+        # O COPY usa o cursor do driver, cujas exceções não passam pelo SQLAlchemy
+        return isinstance(erro, (IntegrityError, self.engine.dialect.dbapi.IntegrityError))
+
+    def _transitoria(self, erro: Exception) -> bool:
+        """Falha de conexão (banco fora do ar, failover): vale tentar de novo o mesmo lote"""
+        dbapi = self.engine.dialect.dbapi
+        return isinstance(erro, (OperationalError, InterfaceError, dbapi.OperationalError, dbapi.InterfaceError))
+
+
+ingestao = IngestaoRespostas(engine_ingestao)
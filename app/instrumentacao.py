@@ -0,0 +1,232 @@
+"""
+Instrumentação por requisição: tempo de banco, de serialização e total.
+
+- `instrumentar_engine` registra eventos do SQLAlchemy que contam as queries e
+  somam o tempo gasto no banco pela requisição corrente (via `ContextVar`).
+- `RotaMedida` (route_class dos routers) marca o fim da execução do endpoint;
+  o que acontece depois disso até o início da resposta é a serialização feita
+  pelo FastAPI (validação do response_model e geração do JSON). Trechos que
+  serializam dentro do próprio endpoint usam `medir_serializacao()`.
+- `MiddlewareServerTiming` abre a medição, devolve o cabeçalho `Server-Timing`
+  (db, serialize, total) e acumula os agregados por rota de `/metrics/rotas`.
+"""
+import asyncio
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from app.metricas import Histograma
+
+BUCKETS_REQUISICAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Medicao:
+    """Tempos acumulados de uma requisição (em segundos)"""
+
+    __slots__ = ("inicio", "rota", "db", "queries", "serializacao", "fim_endpoint", "db_fim_endpoint")
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.rota: Optional[str] = None
+        self.db = 0.0
+        self.queries = 0
+        self.serializacao = 0.0
+        self.fim_endpoint: Optional[float] = None
+        self.db_fim_endpoint = 0.0
+
+    def encerrar(self) -> dict:
+        agora = time.perf_counter()
+        serializacao = self.serializacao
+        if self.fim_endpoint is not None:
+            # Queries disparadas durante a serialização (lazy loads) contam como banco
+            serializacao += (agora - self.fim_endpoint) - (self.db - self.db_fim_endpoint)
+        return {
+            "db": self.db,
+            "queries": self.queries,
+            "serialize": max(serializacao, 0.0),
+            "total": agora - self.inicio,
+        }
+
+
+medicao_atual: ContextVar[Optional[Medicao]] = ContextVar("medicao_atual", default=None)
+
+
+# Eventos do engine
+
+def _antes_da_query(conn, cursor, statement, parameters, context, executemany):
+    if medicao_atual.get() is not None:
+        conn.info.setdefault("inicio_query", []).append(time.perf_counter())
+
+
+def _depois_da_query(conn, cursor, statement, parameters, context, executemany):
+    medicao = medicao_atual.get()
+    if medicao is not None and conn.info.get("inicio_query"):
+        medicao.db += time.perf_counter() - conn.info["inicio_query"].pop()
+        medicao.queries += 1
+
+
+def _erro_na_query(exception_context):
+    # Sem isso, uma query com erro deixaria o início empilhado na conexão
+    inicios = exception_context.connection.info.get("inicio_query") if exception_context.connection else None
+    if inicios:
+        inicios.pop()
+
+
+def instrumentar_engine(engine):
+    """Registra os eventos de medição no engine (síncrono ou `AsyncEngine.sync_engine`)"""
+    event.listen(engine, "before_cursor_execute", _antes_da_query)
+    event.listen(engine, "after_cursor_execute", _depois_da_query)
+    event.listen(engine, "handle_error", _erro_na_query)
+
+
+@contextmanager
+def medir_serializacao():
+    """Soma ao tempo de serialização da requisição corrente (se houver)"""
+    medicao = medicao_atual.get()
+    if medicao is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicao.serializacao += time.perf_counter() - inicio
+
+
+def _marcar_fim_endpoint(rota: str):
+    medicao = medicao_atual.get()
+    if medicao is not None:
+        medicao.rota = rota
+        medicao.fim_endpoint = time.perf_counter()
+        medicao.db_fim_endpoint = medicao.db
+
+
+class RotaMedida(APIRoute):
+    """APIRoute que registra a rota e o momento em que o endpoint retorna"""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        rota = f"{','.join(sorted(kwargs.get('methods') or ['GET']))} {path}"
+
+        if asyncio.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def medido(*args, **kw):
+                try:
+                    return await endpoint(*args, **kw)
+                finally:
+                    _marcar_fim_endpoint(rota)
+        else:
+            @functools.wraps(endpoint)
+            def medido(*args, **kw):
+                try:
+                    return endpoint(*args, **kw)
+                finally:
+                    _marcar_fim_endpoint(rota)
+
+        super().__init__(path, medido, **kwargs)
+
+
+# Agregados por rota
+
+class AgregadoRota:
+    def __init__(self):
+        self.requisicoes = 0
+        self.erros = 0
+        self.db = 0.0
+        self.queries = 0
+        self.serializacao = 0.0
+        self.total = 0.0
+        self.total_max = 0.0
+        self.tempo_total = Histograma(BUCKETS_REQUISICAO)
+
+    def stats(self) -> dict:
+        n = self.requisicoes or 1
+        return {
+            "requests": self.requisicoes,
+            "errors": self.erros,
+            "avg_queries": round(self.queries / n, 2),
+            "avg_db_ms": round(self.db / n * 1000, 3),
+            "avg_serialize_ms": round(self.serializacao / n * 1000, 3),
+            "avg_total_ms": round(self.total / n * 1000, 3),
+            "max_total_ms": round(self.total_max * 1000, 3),
+            "total_seconds": self.tempo_total.stats(),
+        }
+
+
+class AgregadosPorRota:
+    def __init__(self):
+        self._rotas = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, rota: str, tempos: dict, status: int):
+        with self._lock:
+            agregado = self._rotas.get(rota)
+            if agregado is None:
+                agregado = self._rotas[rota] = AgregadoRota()
+            agregado.requisicoes += 1
+            agregado.erros += status >= 500
+            agregado.db += tempos["db"]
+            agregado.queries += tempos["queries"]
+            agregado.serializacao += tempos["serialize"]
+            agregado.total += tempos["total"]
+            agregado.total_max = max(agregado.total_max, tempos["total"])
+        agregado.tempo_total.observar(tempos["total"])
+
+    def stats(self) -> dict:
+        with self._lock:
+            rotas = dict(self._rotas)
+        return {rota: agregado.stats() for rota, agregado in sorted(rotas.items())}
+
+    def clear(self):
+        with self._lock:
+            self._rotas.clear()
+
+
+agregados = AgregadosPorRota()
+
+
+def _server_timing(tempos: dict) -> str:
+    return (
+        f'db;dur={tempos["db"] * 1000:.2f};desc="{tempos["queries"]} queries", '
+        f'serialize;dur={tempos["serialize"] * 1000:.2f}, '
+        f'total;dur={tempos["total"] * 1000:.2f}'
+    )
+
+
+class MiddlewareServerTiming:
+    """
+    Middleware ASGI: mede cada requisição HTTP e adiciona `Server-Timing` à
+    resposta. O total vai até o início do envio da resposta, então não inclui o
+    envio do corpo de respostas em streaming.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicao = Medicao()
+        token = medicao_atual.set(medicao)
+
+        async def send_medido(message):
+            if message["type"] == "http.response.start":
+                tempos = medicao.encerrar()
+                message["headers"] = [
+                    *message.get("headers", []), (b"server-timing", _server_timing(tempos).encode())
+                ]
+                if medicao.rota is not None:
+                    agregados.registrar(medicao.rota, tempos, message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_medido)
+        finally:
+            medicao_atual.reset(token)
@@ -0,0 +1,40 @@
+"""
+Leituras em lote (multi-get) de formulários, perguntas e opções de resposta.
+
+Os ids chegam pela query (`?ids=1,2,3`) ou pelo corpo (`{"ids": [1, 2, 3]}`);
+as dependências abaixo os validam, descartam repetições (mantendo a ordem) e
+limitam o lote a `LIMITE_LOTE`. O crud resolve cada lote em um número fixo de
+consultas com IN, e a resposta traz os itens por id e os ids não encontrados.
+"""
+from typing import List
+
+from fastapi import HTTPException, Query
+
+from app.schemas import IdsLote
+
+LIMITE_LOTE = 100
+
+
+def _validar(ids: List[int]) -> List[int]:
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > LIMITE_LOTE:
+        raise HTTPException(status_code=413, detail=f"Máximo de {LIMITE_LOTE} ids por lote")
+    return ids
+
+
+def ids_da_query(
+    ids: str = Query(..., description=f"IDs separados por vírgula (ex.: 1,2,3), até {LIMITE_LOTE}")
+) -> List[int]:
+    """Dependency: `?ids=1,2,3` como lista de inteiros; formato inválido responde 400"""
+    try:
+        valores = [int(item) for item in ids.split(",") if item.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids deve ser uma lista de inteiros separados por vírgula")
+    if not valores:
+        raise HTTPException(status_code=400, detail="Informe ao menos um id")
+    return _validar(valores)
+
+
+def ids_do_corpo(lote: IdsLote) -> List[int]:
+    """Dependency: `{"ids": [...]}` do corpo da requisição"""
+    return _validar(lote.ids)
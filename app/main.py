@@ -1,21 +1,68 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager, suppress
+
+import anyio
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.routers import formularios, perguntas, opcoes_respostas
+from app.database import (
+    engine, async_engine, replicas, DB_ASYNC, DB_POOL_WARMUP, DB_REPLICA_STICKY,
+    aquecer_pool, aquecer_pool_assincrono, encerrar_engines,
+)
+from app.cache import cache
+from app.ingestao import ingestao
+from app.metricas import metricas_pool
+from app.instrumentacao import MiddlewareServerTiming, agregados
+from app.replicas import MiddlewareLeituraAposEscrita
+from app.compressao import MiddlewareCompressao
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Criar tabelas no banco de dados
-Base.metadata.create_all(bind=engine)
+# O esquema é aplicado fora da aplicação (alembic upgrade head / init_db.py):
+# importar este módulo não conecta ao banco.
+
+aquecimento = {"status": "desabilitado" if not DB_POOL_WARMUP else "pendente", "conexoes": 0, "ms": None}
+
+
+async def _aquecer_pool():
+    inicio = time.perf_counter()
+    try:
+        if DB_ASYNC:
+            aquecimento["conexoes"] = await aquecer_pool_assincrono()
+        else:
+            aquecimento["conexoes"] = await anyio.to_thread.run_sync(aquecer_pool, cancellable=True)
+        aquecimento["status"] = "ok"
+    except Exception as e:
+        # Banco indisponível não impede o worker de subir; as requisições
+        # tentam conectar normalmente
+        aquecimento["status"] = f"falhou: {e.__class__.__name__}"
+    aquecimento["ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Em segundo plano: o worker aceita requisições sem esperar pelo banco
+    tarefa = asyncio.create_task(_aquecer_pool()) if DB_POOL_WARMUP else None
+    ingestao.iniciar()
+    yield
+    if tarefa is not None:
+        tarefa.cancel()
+        with suppress(asyncio.CancelledError):
+            await tarefa
+    # Grava as respostas ainda na fila antes de fechar as conexões
+    await anyio.to_thread.run_sync(ingestao.encerrar)
+    await encerrar_engines()
+
 
 app = FastAPI(
     title="Sistema de Formulários Dinâmicos",
     description="API para gerenciamento de formulários dinâmicos com perguntas cadastradas pelos usuários",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # Configurar CORS
@@ -25,9 +72,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
 
-# Incluir routers
+# Compressão brotli/gzip conforme o Accept-Encoding (dentro do Server-Timing,
+# para que o total inclua o tempo de compressão)
+app.add_middleware(MiddlewareCompressao)
+
+# Server-Timing (db, serialize, total) em cada resposta e agregados por rota
+app.add_middleware(MiddlewareServerTiming)
+
+# Com réplicas, leituras logo após uma escrita do mesmo cliente vão para o primário
+if replicas:
+    app.add_middleware(MiddlewareLeituraAposEscrita, segundos=DB_REPLICA_STICKY)
+
+# Incluir routers (versões assíncronas quando DB_ASYNC=True)
+if DB_ASYNC:
+    from app.routers.assincrono import formularios, perguntas, opcoes_respostas
+else:
+    from app.routers import formularios, perguntas, opcoes_respostas
+
 app.include_router(formularios.router, prefix="/api/v1")
 app.include_router(perguntas.router, prefix="/api/v1")
 app.include_router(opcoes_respostas.router, prefix="/api/v1")
@@ -50,6 +114,32 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/cache/stats")
+def cache_stats():
+    """Contadores do cache de leitura (hits, misses, evictions) e ocupação atual"""
+    return cache.stats()
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Ocupação do pool de conexões (em uso, ociosas, overflow), histograma de
+    tempo de checkout, aquecimento do pool, fila de gravação das respostas e,
+    se configuradas, réplicas de leitura
+    """
+    pool = async_engine.pool if DB_ASYNC else engine.pool
+    metricas = {"pool": metricas_pool(pool), "aquecimento": aquecimento, "respostas": ingestao.stats()}
+    if replicas:
+        metricas["replicas"] = replicas.stats()
+    return metricas
+
+
+@app.get("/metrics/rotas")
+def metrics_rotas():
+    """Agregados por rota: requisições, erros, queries e tempos médios de banco, serialização e total"""
+    return agregados.stats()
+
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -0,0 +1,95 @@
+"""
+Métricas do pool de conexões do banco de dados.
+
+Os pools usados pelos engines (`PoolMedido` e `PoolAssincronoMedido`) medem o
+tempo que cada checkout leva até obter uma conexão, ou seja, a espera na fila
+do pool mais o tempo de abrir a conexão quando necessário. Os tempos são
+acumulados em histogramas com buckets fixos, expostos em `/metrics` junto com
+a ocupação atual do pool.
+"""
+import bisect
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Limites superiores dos buckets, em segundos (o último bucket é "+Inf")
+BUCKETS_CHECKOUT = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histograma:
+    """Histograma cumulativo de durações, no formato dos histogramas do Prometheus"""
+
+    def __init__(self, buckets=BUCKETS_CHECKOUT):
+        self.buckets = tuple(buckets)
+        self._contagens = [0] * (len(self.buckets) + 1)
+        self._soma = 0.0
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float):
+        with self._lock:
+            self._contagens[bisect.bisect_left(self.buckets, valor)] += 1
+            self._soma += valor
+
+    def stats(self) -> dict:
+        with self._lock:
+            contagens = list(self._contagens)
+            soma = self._soma
+        acumulado = 0
+        buckets = {}
+        for limite, contagem in zip([*map(str, self.buckets), "+Inf"], contagens):
+            acumulado += contagem
+            buckets[limite] = acumulado
+        return {"count": acumulado, "sum": round(soma, 6), "buckets": buckets}
+
+
+class _MedicaoCheckout:
+    """Mixin para pools: mede a duração de cada checkout e conta os timeouts"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tempo_checkout = Histograma()
+        self.timeouts = 0
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.tempo_checkout.observar(time.perf_counter() - inicio)
+
+    def recreate(self):
+        # Mantém as métricas quando o engine recria o pool (ex.: engine.dispose())
+        novo = super().recreate()
+        novo.tempo_checkout = self.tempo_checkout
+        novo.timeouts = self.timeouts
+        return novo
+
+
+class PoolMedido(_MedicaoCheckout, QueuePool):
+    pass
+
+
+class PoolAssincronoMedido(_MedicaoCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def metricas_pool(pool) -> dict:
+    """Ocupação atual e histograma de tempo de checkout de um pool"""
+    metricas = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        # overflow() é negativo enquanto o pool ainda não abriu `size` conexões
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "timeout": pool.timeout(),
+    }
+    if isinstance(pool, _MedicaoCheckout):
+        metricas["checkout_timeouts"] = pool.timeouts
+        metricas["checkout_seconds"] = pool.tempo_checkout.stats()
+    return metricas
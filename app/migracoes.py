@@ -0,0 +1,60 @@
+"""
+Migrações do esquema (Alembic) para uso em scripts.
+
+A aplicação não cria nem altera tabelas ao subir: o esquema é aplicado fora
+dela, com `alembic upgrade head` ou `python init_db.py`, que chamam `migrar`.
+Bancos criados antes das migrações (com `create_all`) não têm a tabela
+`alembic_version`; `migrar` identifica até onde o esquema deles chega e os
+marca com a revisão correspondente antes de aplicar as pendentes.
+"""
+import os
+from typing import Optional
+
+from sqlalchemy import create_engine, inspect
+
+from app.database import DATABASE_URL
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configuracao(url: str = DATABASE_URL):
+    from alembic.config import Config
+
+    config = Config(os.path.join(RAIZ, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(RAIZ, "migrations"))
+    # "%" é especial para o ConfigParser do alembic.ini
+    config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    # Não reconfigura o logging de quem chamou (ex.: testes de carga)
+    config.attributes["configurar_logging"] = False
+    return config
+
+
+def revisao_legada(conn) -> Optional[str]:
+    """Revisão equivalente a um banco criado por `create_all`, ou None se não for o caso"""
+    inspetor = inspect(conn)
+    tabelas = inspetor.get_table_names()
+    if "formulario" not in tabelas or "alembic_version" in tabelas:
+        return None
+    if "ix_formulario_ordem_id" in {indice["name"] for indice in inspetor.get_indexes("formulario")}:
+        return "0003"
+    if "versao" in {coluna["name"] for coluna in inspetor.get_columns("formulario")}:
+        return "0002"
+    return "0001"
+
+
+def migrar(url: str = DATABASE_URL, revisao: str = "head") -> Optional[str]:
+    """Aplica as migrações até `revisao`; retorna a revisão legada adotada, se houver"""
+    from alembic import command
+
+    config = configuracao(url)
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            legada = revisao_legada(conn)
+    finally:
+        engine.dispose()
+
+    if legada is not None:
+        command.stamp(config, legada)
+    command.upgrade(config, revisao)
+    return legada
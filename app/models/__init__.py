@@ -1,25 +1,70 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Computed, Integer, String, Text, Boolean, DateTime, ForeignKey, Index, Uuid, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 
 class Formulario(Base):
     __tablename__ = "formulario"
+    __table_args__ = (
+        # Listagem de formulários (ORDER BY ordem, id)
+        Index("ix_formulario_ordem_id", "ordem", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     titulo = Column(String(255), nullable=False)
     descricao = Column("descrição", Text)  # Mapear para coluna com ç no banco
     ordem = Column(Integer, nullable=False)
+    # Incrementada a cada escrita no formulário, em suas perguntas ou opções (ETag)
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
     
-    # Relacionamento com perguntas
-    perguntas = relationship("Pergunta", back_populates="formulario", cascade="all, delete-orphan")
+    # Relacionamento com perguntas. passive_deletes: ao remover o formulário, as
+    # perguntas, opções e vínculos saem pelo ON DELETE CASCADE do banco, sem
+    # serem carregados na sessão
+    perguntas = relationship(
+        "Pergunta",
+        back_populates="formulario",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="Pergunta.ordem"
+    )
+
+
+# Busca textual de perguntas (migração 0004, apenas no Postgres). A configuração
+# `pt_busca` é a `portuguese` mais unaccent, quando a extensão está disponível
+CONFIG_BUSCA = "pt_busca"
+DOCUMENTO_BUSCA = (
+    f"setweight(to_tsvector('{CONFIG_BUSCA}', regexp_replace(codigo, '[^[:alnum:]]+', ' ', 'g')), 'A') || "
+    f"setweight(to_tsvector('{CONFIG_BUSCA}', coalesce(titulo, '')), 'A') || "
+    f"setweight(to_tsvector('{CONFIG_BUSCA}', coalesce(orientacao_resposta, '')), 'C')"
+)
+TEXTO_TRIGRAMA = "(titulo || ' ' || codigo)"
 
 
 class Pergunta(Base):
     __tablename__ = "pergunta"
+    __table_args__ = (
+        # Listagens por formulário: um índice para cada campo aceito em order_by,
+        # sempre com id no final (desempate e paginação por cursor)
+        Index("ix_pergunta_formulario_ordem", "id_formulario", "ordem", "id"),
+        Index("ix_pergunta_formulario_titulo", "id_formulario", "titulo", "id"),
+        Index("ix_pergunta_formulario_id", "id_formulario", "id"),
+        # Filtros mais comuns
+        Index("ix_pergunta_formulario_tipo", "id_formulario", "tipo_pergunta", "ordem", "id"),
+        Index(
+            "ix_pergunta_formulario_obrigatoria", "id_formulario", "ordem", "id",
+            postgresql_where=text("obrigatoria")
+        ),
+        # Busca textual (tsvector) e, com pg_trgm, busca aproximada por trigramas
+        Index("ix_pergunta_busca", "busca", postgresql_using="gin"),
+        Index("ix_pergunta_busca_trgm", text(f"{TEXTO_TRIGRAMA} gin_trgm_ops"), postgresql_using="gin"),
+    )
+    # `busca` é calculada pelo banco e só usada nos filtros da busca: fica fora do
+    # mapeamento para não ser lida nem escrita pelo ORM (nem exigida no SQLite)
+    __mapper_args__ = {"exclude_properties": ["busca"]}
     
     id = Column(Integer, primary_key=True, index=True)
-    id_formulario = Column(Integer, ForeignKey("formulario.id"), nullable=False)
+    id_formulario = Column(Integer, ForeignKey("formulario.id", ondelete="CASCADE"), nullable=False)
     titulo = Column(String(255), nullable=False)
     codigo = Column(String(100), nullable=False, unique=True)
     orientacao_resposta = Column(Text)
@@ -27,19 +72,28 @@ class Pergunta(Base):
     obrigatoria = Column(Boolean, default=False)
     sub_pergunta = Column(Boolean, default=False)
     tipo_pergunta = Column(String(50), nullable=False)  # Sim_Nao, multipla_escolha, unica_escolha, texto_livre, Inteiro, Numero com duas casa decimais
+    busca = Column(TSVECTOR, Computed(DOCUMENTO_BUSCA, persisted=True))
     
     # Relacionamentos
     formulario = relationship("Formulario", back_populates="perguntas")
-    opcoes_resposta_pergunta = relationship("OpcoesRespostaPergunta", back_populates="pergunta", cascade="all, delete-orphan")
-    opcoes_respostas = relationship("OpcoesRespostas", back_populates="pergunta", cascade="all, delete-orphan")
+    opcoes_resposta_pergunta = relationship(
+        "OpcoesRespostaPergunta", back_populates="pergunta", cascade="all, delete-orphan", passive_deletes=True
+    )
+    opcoes_respostas = relationship(
+        "OpcoesRespostas",
+        back_populates="pergunta",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="OpcoesRespostas.ordem"
+    )
 
 
 class OpcoesRespostaPergunta(Base):
     __tablename__ = "opcoes_resposta_pergunta"
     
     id = Column(Integer, primary_key=True, index=True)
-    id_opcao_resposta = Column(Integer, ForeignKey("opcoes_respostas.id"), nullable=False)
-    id_pergunta = Column(Integer, ForeignKey("pergunta.id"), nullable=False)
+    id_opcao_resposta = Column(Integer, ForeignKey("opcoes_respostas.id", ondelete="CASCADE"), nullable=False, index=True)
+    id_pergunta = Column(Integer, ForeignKey("pergunta.id", ondelete="CASCADE"), nullable=False, index=True)
     
     # Relacionamentos
     pergunta = relationship("Pergunta", back_populates="opcoes_resposta_pergunta")
@@ -48,13 +102,54 @@ class OpcoesRespostaPergunta(Base):
 
 class OpcoesRespostas(Base):
     __tablename__ = "opcoes_respostas"
+    __table_args__ = (
+        Index("ix_opcoes_respostas_pergunta_ordem", "id_pergunta", "ordem", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    id_pergunta = Column(Integer, ForeignKey("pergunta.id"), nullable=False)
+    id_pergunta = Column(Integer, ForeignKey("pergunta.id", ondelete="CASCADE"), nullable=False)
     resposta = Column(Text, nullable=False)
     ordem = Column(Integer, nullable=False)
     resposta_aberta = Column(Boolean, default=False)
     
     # Relacionamentos
     pergunta = relationship("Pergunta", back_populates="opcoes_respostas")
-    opcoes_resposta_pergunta = relationship("OpcoesRespostaPergunta", back_populates="opcao_resposta", cascade="all, delete-orphan")
+    opcoes_resposta_pergunta = relationship(
+        "OpcoesRespostaPergunta", back_populates="opcao_resposta", cascade="all, delete-orphan", passive_deletes=True
+    )
+
+
+# Respostas dos formulários (migração 0006), gravadas em lote por app/ingestao.py
+class Resposta(Base):
+    """Cabeçalho de uma submissão do formulário"""
+    __tablename__ = "resposta"
+    __table_args__ = (
+        # Respostas de um formulário por data, e o ON DELETE CASCADE do formulário
+        Index("ix_resposta_formulario_recebida", "id_formulario", "recebida_em"),
+    )
+    
+    id = Column(Uuid, primary_key=True)  # gerado ao aceitar a submissão, antes da gravação
+    id_formulario = Column(Integer, ForeignKey("formulario.id", ondelete="CASCADE"), nullable=False)
+    versao_formulario = Column(Integer, nullable=False)  # versão respondida (ETag do formulário)
+    recebida_em = Column(DateTime(timezone=True), nullable=False)
+
+
+class RespostaValor(Base):
+    """Valor dado a uma pergunta: texto/número em `valor` e/ou a opção escolhida"""
+    __tablename__ = "resposta_valor"
+    __table_args__ = (
+        # Chaves estrangeiras com CASCADE: remover uma pergunta ou opção não percorre a tabela
+        Index("ix_resposta_valor_pergunta", "id_pergunta"),
+        Index(
+            "ix_resposta_valor_opcao", "id_opcao_resposta",
+            postgresql_where=text("id_opcao_resposta IS NOT NULL"),
+            sqlite_where=text("id_opcao_resposta IS NOT NULL"),
+        ),
+    )
+    
+    # Chave (id_resposta, posicao): cobre também o CASCADE a partir de `resposta`
+    id_resposta = Column(Uuid, ForeignKey("resposta.id", ondelete="CASCADE"), primary_key=True)
+    posicao = Column(Integer, primary_key=True, autoincrement=False)  # índice do valor na submissão
+    id_pergunta = Column(Integer, ForeignKey("pergunta.id", ondelete="CASCADE"), nullable=False)
+    id_opcao_resposta = Column(Integer, ForeignKey("opcoes_respostas.id", ondelete="CASCADE"))
+    valor = Column(Text)
@@ -0,0 +1,127 @@
+"""
+Projeções parciais das leituras (parâmetros `fields` e `include`).
+
+- `fields`: lista separada por vírgulas dos campos desejados. Campos dos níveis
+  aninhados usam o caminho com pontos (`perguntas.titulo`,
+  `perguntas.opcoes_respostas.resposta`); um nível sem campos listados vem
+  completo. Citar um relacionamento (`perguntas`) ou um campo dele o inclui.
+- `include`: relacionamentos a expandir (`perguntas`,
+  `perguntas.opcoes_respostas`); `include=` (vazio) não expande nenhum.
+
+Sem nenhum dos dois parâmetros a resposta é a representação completa de
+sempre. As rotas recebem a projeção pela dependência `parametros_projecao` e
+o crud a traduz em consultas só com as colunas necessárias; os
+relacionamentos não pedidos nem chegam a ser consultados.
+"""
+from typing import Dict, Optional, Set, Tuple, get_args
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+
+
+class Projecao:
+    """Campos de um nível da resposta e as projeções dos relacionamentos incluídos"""
+
+    def __init__(self, campos: Tuple[str, ...], relacionamentos: Dict[str, "Projecao"]):
+        self.campos = campos
+        self.relacionamentos = relacionamentos
+
+    def inclui(self, relacionamento: str) -> bool:
+        return relacionamento in self.relacionamentos
+
+    def __repr__(self) -> str:
+        return f"Projecao({self.campos!r}, {self.relacionamentos!r})"
+
+
+def _relacionamentos(schema) -> Dict[str, type]:
+    """Campos do schema que são listas de outro schema (perguntas, opcoes_respostas)"""
+    relacionamentos = {}
+    for nome, info in schema.model_fields.items():
+        argumentos = get_args(info.annotation)
+        if argumentos and isinstance(argumentos[0], type) and issubclass(argumentos[0], BaseModel):
+            relacionamentos[nome] = argumentos[0]
+    return relacionamentos
+
+
+def _itens(valor: str):
+    return [item.strip() for item in valor.split(",") if item.strip()]
+
+
+def _schema_do_caminho(schema, caminho: Tuple[str, ...], parametro: str, item: str):
+    for nome in caminho:
+        relacionamentos = _relacionamentos(schema)
+        if nome not in relacionamentos:
+            raise ValueError(f"Relacionamento desconhecido em {parametro}: '{item}'")
+        schema = relacionamentos[nome]
+    return schema
+
+
+def _incluir(incluidos: Set[Tuple[str, ...]], caminho: Tuple[str, ...]):
+    for tamanho in range(1, len(caminho) + 1):
+        incluidos.add(caminho[:tamanho])
+
+
+def _montar(schema, caminho, campos, incluidos) -> Projecao:
+    relacionamentos = _relacionamentos(schema)
+    escalares = tuple(campo for campo in schema.model_fields if campo not in relacionamentos)
+    pedidos = campos.get(caminho)
+    return Projecao(
+        tuple(campo for campo in escalares if campo in pedidos) if pedidos else escalares,
+        {
+            nome: _montar(sub_schema, caminho + (nome,), campos, incluidos)
+            for nome, sub_schema in relacionamentos.items()
+            if caminho + (nome,) in incluidos
+        },
+    )
+
+
+def projecao(schema, fields: Optional[str] = None, include: Optional[str] = None) -> Optional[Projecao]:
+    """
+    Projeção de `schema` pedida por `fields`/`include`, ou None para a
+    representação completa. Levanta ValueError para nomes desconhecidos.
+    """
+    if fields is None and include is None:
+        return None
+
+    campos: Dict[Tuple[str, ...], Set[str]] = {}
+    incluidos: Set[Tuple[str, ...]] = set()
+
+    for item in _itens(include or ""):
+        caminho = tuple(item.split("."))
+        _schema_do_caminho(schema, caminho, "include", item)
+        _incluir(incluidos, caminho)
+
+    for item in _itens(fields or ""):
+        *caminho, campo = item.split(".")
+        caminho = tuple(caminho)
+        nivel = _schema_do_caminho(schema, caminho, "fields", item)
+        if campo in _relacionamentos(nivel):
+            _incluir(incluidos, caminho + (campo,))
+        elif campo in nivel.model_fields:
+            _incluir(incluidos, caminho)
+            campos.setdefault(caminho, set()).add(campo)
+        else:
+            raise ValueError(f"Campo desconhecido em fields: '{item}'")
+
+    return _montar(schema, (), campos, incluidos)
+
+
+def parametros_projecao(schema):
+    """
+    Dependency: lê `fields` e `include` e devolve a projeção de `schema` (None
+    sem os parâmetros); nomes desconhecidos respondem 400
+    """
+    def dependencia(
+        fields: Optional[str] = Query(
+            None, description="Campos da resposta, separados por vírgula (ex.: id,titulo,perguntas.codigo)"
+        ),
+        include: Optional[str] = Query(
+            None, description="Relacionamentos a expandir (ex.: perguntas); vazio para nenhum"
+        ),
+    ) -> Optional[Projecao]:
+        try:
+            return projecao(schema, fields, include)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    return dependencia
@@ -0,0 +1,114 @@
+"""
+Roteamento de leituras para réplicas do banco.
+
+As rotas de leitura recebem sessões ligadas a uma das réplicas configuradas
+(`DATABASE_REPLICA_URLS`), escolhidas em rodízio. Uma réplica que falha ao
+conectar fica fora do rodízio por `DB_REPLICA_RETRY` segundos; sem réplicas
+disponíveis, a leitura vai para o primário. Escritas sempre usam o primário.
+
+Leitura após escrita: como as réplicas podem estar atrasadas, as rotas que
+alteram formulários, perguntas ou opções (marcadas com `@escrita`) devolvem,
+quando bem-sucedidas, o cookie `ler_primario`, válido por `DB_REPLICA_STICKY`
+segundos, e as leituras que o trazem (ou o cabeçalho `X-Read-Primary: 1`)
+vão para o primário. POSTs que só leem (leituras em lote) ou que não alteram o
+que as réplicas servem (envio de respostas) não são marcados.
+"""
+import itertools
+import threading
+import time
+from typing import List
+
+from fastapi import Request
+
+from app.metricas import metricas_pool
+
+COOKIE_PRIMARIO = "ler_primario"
+CABECALHO_PRIMARIO = "x-read-primary"
+_METODOS_LEITURA = {"GET", "HEAD", "OPTIONS"}
+
+
+def escrita(endpoint):
+    """Marca a rota como escrita: a resposta bem-sucedida leva o cookie `ler_primario`"""
+    endpoint.escrita = True
+    return endpoint
+
+
+class Replicas:
+    """Réplicas em rodízio, com afastamento temporário das que falham"""
+
+    def __init__(self, engines: list, retry: float):
+        self.engines = engines
+        self.retry = retry
+        self._rodizio = itertools.count()
+        self._fora_ate = [0.0] * len(engines)
+        self._falhas = [0] * len(engines)
+        self._lock = threading.Lock()
+        self.leituras = {"replica": 0, "primario": 0, "sem_replica_disponivel": 0}
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def candidatas(self) -> List[int]:
+        """Índices das réplicas disponíveis, a partir da próxima do rodízio"""
+        agora = time.monotonic()
+        inicio = next(self._rodizio)
+        total = len(self.engines)
+        ordem = ((inicio + deslocamento) % total for deslocamento in range(total))
+        return [indice for indice in ordem if self._fora_ate[indice] <= agora]
+
+    def marcar_falha(self, indice: int):
+        with self._lock:
+            self._falhas[indice] += 1
+            self._fora_ate[indice] = time.monotonic() + self.retry
+
+    def contar(self, destino: str):
+        with self._lock:
+            self.leituras[destino] += 1
+
+    def stats(self) -> dict:
+        agora = time.monotonic()
+        return {
+            "leituras": dict(self.leituras),
+            "replicas": [
+                {
+                    "url": engine.url.render_as_string(hide_password=True),
+                    "disponivel": self._fora_ate[indice] <= agora,
+                    "falhas": self._falhas[indice],
+                    "pool": metricas_pool(engine.pool),
+                }
+                for indice, engine in enumerate(self.engines)
+            ],
+        }
+
+
+def ler_do_primario(request: Request) -> bool:
+    """Leitura logo após uma escrita do mesmo cliente, ou pedida explicitamente"""
+    return COOKIE_PRIMARIO in request.cookies or request.headers.get(CABECALHO_PRIMARIO) == "1"
+
+
+class MiddlewareLeituraAposEscrita:
+    """
+    Middleware ASGI: marca com o cookie `ler_primario` o cliente que acabou de
+    escrever. A rota é conhecida só depois do roteamento, então a marcação é
+    decidida no início da resposta, pelo `endpoint` que o roteador deixa no scope
+    """
+
+    def __init__(self, app, segundos: float):
+        self.app = app
+        self.cookie = f"{COOKIE_PRIMARIO}=1; Max-Age={int(segundos)}; Path=/; HttpOnly; SameSite=Lax".encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in _METODOS_LEITURA:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marcado(message):
+            if (
+                message["type"] == "http.response.start"
+                and message["status"] < 400
+                and getattr(scope.get("endpoint"), "escrita", False)
+            ):
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", self.cookie)]
+            await send(message)
+
+        await self.app(scope, receive, send_marcado)
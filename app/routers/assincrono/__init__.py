@@ -0,0 +1 @@
+# Versões assíncronas dos routers da API (DB_ASYNC=True)
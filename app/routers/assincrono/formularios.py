@@ -0,0 +1,175 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_async_db, get_async_db_leitura
+from app.schemas import (
+    Formulario, FormularioCreate, FormularioUpdate, FormularioSummary, FormularioLote, ImportacaoResult,
+    RespostaCreate, RespostaAceita
+)
+from app.cache import cache_habilitado
+from app.etag import versao_if_none_match, resposta_condicional, resposta_condicional_stream
+from app.transferencia import ImportadorNDJSON, lotes_de_linhas
+from app.ingestao import ingestao, preparar_submissao
+from app.instrumentacao import RotaMedida
+from app.replicas import escrita
+from app.lote import ids_da_query
+from app.projecao import Projecao, parametros_projecao
+import app.crud.assincrono as crud
+
+router = APIRouter(prefix="/formularios", tags=["formularios"], route_class=RotaMedida)
+
+
+@router.get("/", response_model=List[FormularioSummary])
+async def listar_formularios(
+    skip: int = Query(0, ge=0, description="Número de registros para pular"),
+    limit: int = Query(10, ge=1, le=100, description="Limite de registros por página"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco retornado em X-Next-Cursor (substitui skip)"),
+    projecao: Optional[Projecao] = Depends(parametros_projecao(FormularioSummary)),
+    db: AsyncSession = Depends(get_async_db_leitura)
+):
+    """
+    Lista todos os formulários com paginação.
+    O cabeçalho X-Next-Cursor traz o cursor da próxima página, quando houver.
+    Com `fields`, apenas os campos pedidos são consultados e retornados.
+    """
+    try:
+        conteudo, next_cursor = await crud.get_formularios_json(
+            db, skip=skip, limit=limit, cursor=cursor, projecao=projecao
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return Response(content=conteudo, media_type="application/json", headers=headers)
+
+
+@router.get("/batch", response_model=FormularioLote)
+async def obter_formularios_lote(
+    ids: List[int] = Depends(ids_da_query),
+    usar_cache: bool = Depends(cache_habilitado),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Obtém vários formulários completos de uma vez (`?ids=1,2,3`), por id.
+    Ids inexistentes vêm em `nao_encontrados`. Os formulários fora do cache são
+    lidos em até três consultas, qualquer que seja a quantidade de ids.
+    """
+    conteudo = await crud.get_formularios_lote_json(db, formularios_ids=ids, usar_cache=usar_cache)
+    return Response(content=conteudo, media_type="application/json")
+
+
+@router.get("/{formulario_id}", response_model=Formulario)
+async def obter_formulario(
+    formulario_id: int,
+    request: Request,
+    stream: bool = Query(False, description="Envia o JSON em partes, lendo as perguntas em lotes (formulários grandes)"),
+    usar_cache: bool = Depends(cache_habilitado),
+    projecao: Optional[Projecao] = Depends(parametros_projecao(Formulario)),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Obtém um formulário específico por ID, com perguntas e opções de resposta.
+    Envie `Cache-Control: no-cache` para ignorar o cache.
+    Responde 304 quando If-None-Match traz o ETag da versão atual.
+    Com `stream=true`, o JSON (idêntico) é enviado à medida que as perguntas são
+    lidas, sem montar a árvore inteira em memória; nesse modo o cache só é lido.
+    `fields`/`include` restringem a resposta (ex.: `include=perguntas` sem as
+    opções, ou `fields=id,titulo`); respostas parciais não usam o cache.
+    """
+    versao_cliente = versao_if_none_match(request, "formulario", formulario_id)
+    if stream and projecao is not None:
+        raise HTTPException(status_code=400, detail="stream não pode ser combinado com fields/include")
+    if stream:
+        resultado = await crud.get_formulario_stream(
+            db, formulario_id=formulario_id, usar_cache=usar_cache, versao_cliente=versao_cliente
+        )
+        if resultado is None:
+            raise HTTPException(status_code=404, detail="Formulário não encontrado")
+        versao, partes, fechar = resultado
+        return resposta_condicional_stream("formulario", formulario_id, versao, partes, fechar)
+
+    if projecao is not None:
+        resultado = await crud.get_formulario_parcial_json(
+            db, formulario_id=formulario_id, projecao=projecao, versao_cliente=versao_cliente
+        )
+    else:
+        resultado = await crud.get_formulario_json(
+            db,
+            formulario_id=formulario_id,
+            usar_cache=usar_cache,
+            versao_cliente=versao_cliente
+        )
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Formulário não encontrado")
+    versao, conteudo = resultado
+    return resposta_condicional("formulario", formulario_id, versao, conteudo)
+
+
+@router.post("/", response_model=Formulario)
+@escrita
+async def criar_formulario(formulario: FormularioCreate, db: AsyncSession = Depends(get_async_db)):
+    """Cria um novo formulário"""
+    return await crud.create_formulario(db=db, formulario=formulario)
+
+
+@router.post(
+    "/importar",
+    response_model=ImportacaoResult,
+    openapi_extra={"requestBody": {"required": True, "content": {"application/x-ndjson": {"schema": {"type": "string"}}}}}
+)
+@escrita
+async def importar_formularios(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Importa formulários, perguntas e opções de resposta a partir de um corpo
+    NDJSON (ver app/transferencia.py), lido em streaming e gravado em lotes.
+    Perguntas são atualizadas ou inseridas pelo `codigo`.
+    """
+    importador = ImportadorNDJSON()
+    async for lote in lotes_de_linhas(request.stream()):
+        await db.run_sync(importador.processar_linhas, lote)
+    return await db.run_sync(importador.finalizar)
+
+
+@router.post("/{formulario_id}/respostas", response_model=RespostaAceita, status_code=202)
+async def enviar_resposta(formulario_id: int, resposta: RespostaCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Recebe uma submissão do formulário (`valores` com a resposta de cada
+    pergunta). Validada contra as perguntas e opções do formulário, ela entra
+    na fila de gravação em lote e é gravada em instantes (ver app/ingestao.py);
+    a resposta (202) traz o id gerado. Com a fila cheia, responde 503.
+    """
+    estrutura = await crud.get_estrutura_formulario(db, formulario_id=formulario_id)
+    if estrutura is None:
+        raise HTTPException(status_code=404, detail="Formulário não encontrado")
+    try:
+        submissao = preparar_submissao(formulario_id, estrutura, resposta)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not ingestao.enfileirar(submissao):
+        raise HTTPException(
+            status_code=503, detail="Fila de respostas cheia, tente novamente", headers={"Retry-After": "1"}
+        )
+    return {"id": submissao.id, "id_formulario": formulario_id, "versao_formulario": submissao.versao_formulario}
+
+
+@router.put("/{formulario_id}", response_model=Formulario)
+@escrita
+async def atualizar_formulario(
+    formulario_id: int,
+    formulario: FormularioUpdate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Atualiza um formulário existente; a resposta traz a árvore completa"""
+    conteudo = await crud.update_formulario(db, formulario_id=formulario_id, formulario=formulario)
+    if conteudo is None:
+        raise HTTPException(status_code=404, detail="Formulário não encontrado")
+    return Response(content=conteudo, media_type="application/json")
+
+
+@router.delete("/{formulario_id}")
+@escrita
+async def deletar_formulario(formulario_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Deleta um formulário"""
+    if await crud.delete_formulario(db, formulario_id=formulario_id) is None:
+        raise HTTPException(status_code=404, detail="Formulário não encontrado")
+    return {"message": "Formulário deletado com sucesso"}
@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from app.database import get_async_db, get_async_db_leitura
+from app.schemas import (
+    OpcoesRespostas, OpcoesRespostasCreate, OpcoesRespostasUpdate, OpcoesRespostasLote,
+    NovaOrdem, ItemOrdem
+)
+from app.instrumentacao import RotaMedida
+from app.replicas import escrita
+from app.lote import ids_do_corpo
+import app.crud.assincrono as crud
+
+router = APIRouter(prefix="/opcoes-respostas", tags=["opcoes-respostas"], route_class=RotaMedida)
+
+
+@router.get("/pergunta/{pergunta_id}", response_model=List[OpcoesRespostas])
+async def listar_opcoes_resposta(pergunta_id: int, db: AsyncSession = Depends(get_async_db_leitura)):
+    """Lista todas as opções de resposta de uma pergunta"""
+    # Verificar se a pergunta existe
+    if await crud.get_versao_pergunta(db, pergunta_id) is None:
+        raise HTTPException(status_code=404, detail="Pergunta não encontrada")
+    
+    conteudo = await crud.get_opcoes_resposta_json(db, pergunta_id=pergunta_id)
+    return Response(content=conteudo, media_type="application/json")
+
+
+@router.post("/batch", response_model=OpcoesRespostasLote)
+async def listar_opcoes_resposta_lote(
+    ids: List[int] = Depends(ids_do_corpo),
+    db: AsyncSession = Depends(get_async_db_leitura)
+):
+    """
+    Lista as opções de resposta de várias perguntas (`{"ids": [...]}` com os
+    ids das perguntas), por pergunta, em duas consultas. Perguntas inexistentes
+    vêm em `nao_encontrados`.
+    """
+    conteudo = await crud.get_opcoes_resposta_lote_json(db, perguntas_ids=ids)
+    return Response(content=conteudo, media_type="application/json")
+
+
+@router.post("/pergunta/{pergunta_id}", response_model=OpcoesRespostas)
+@escrita
+async def criar_opcao_resposta(
+    pergunta_id: int,
+    opcao: OpcoesRespostasCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Cria uma nova opção de resposta para uma pergunta"""
+    db_opcao = await crud.create_opcao_resposta(db=db, pergunta_id=pergunta_id, opcao=opcao)
+    if db_opcao is None:
+        raise HTTPException(status_code=404, detail="Pergunta não encontrada")
+    return db_opcao
+
+
+@router.put("/pergunta/{pergunta_id}/ordem", response_model=List[ItemOrdem])
+@escrita
+async def reordenar_opcoes_resposta(pergunta_id: int, nova_ordem: NovaOrdem, db: AsyncSession = Depends(get_async_db)):
+    """
+    Reordena as opções de resposta de uma pergunta (`ids` com todas elas, na
+    nova ordem), com um único UPDATE
+    """
+    try:
+        resultado = await crud.reordenar_opcoes_resposta(db, pergunta_id=pergunta_id, opcoes_ids=nova_ordem.ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Pergunta não encontrada")
+    return resultado
+
+
+@router.put("/{opcao_id}", response_model=OpcoesRespostas)
+@escrita
+async def atualizar_opcao_resposta(
+    opcao_id: int,
+    opcao: OpcoesRespostasUpdate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Atualiza uma opção de resposta existente"""
+    db_opcao = await crud.update_opcao_resposta(db, opcao_id=opcao_id, opcao=opcao)
+    if db_opcao is None:
+        raise HTTPException(status_code=404, detail="Opção de resposta não encontrada")
+    return db_opcao
+
+
+@router.delete("/{opcao_id}")
+@escrita
+async def deletar_opcao_resposta(opcao_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Deleta uma opção de resposta"""
+    if await crud.delete_opcao_resposta(db, opcao_id=opcao_id) is None:
+        raise HTTPException(status_code=404, detail="Opção de resposta não encontrada")
+    return {"message": "Opção de resposta deletada com sucesso"}
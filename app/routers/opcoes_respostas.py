@@ -1,40 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List
-from app.database import get_db
-from app.schemas import OpcoesRespostas, OpcoesRespostasCreate, OpcoesRespostasUpdate
+from app.database import get_db, get_db_leitura
+from app.schemas import (
+    OpcoesRespostas, OpcoesRespostasCreate, OpcoesRespostasUpdate, OpcoesRespostasLote,
+    NovaOrdem, ItemOrdem
+)
+from app.instrumentacao import RotaMedida
+from app.replicas import escrita
+from app.lote import ids_do_corpo
 import app.crud as crud
 
-router = APIRouter(prefix="/opcoes-respostas", tags=["opcoes-respostas"])
+router = APIRouter(prefix="/opcoes-respostas", tags=["opcoes-respostas"], route_class=RotaMedida)
 
 
 @router.get("/pergunta/{pergunta_id}", response_model=List[OpcoesRespostas])
-def listar_opcoes_resposta(pergunta_id: int, db: Session = Depends(get_db)):
+def listar_opcoes_resposta(pergunta_id: int, db: Session = Depends(get_db_leitura)):
     """Lista todas as opções de resposta de uma pergunta"""
     # Verificar se a pergunta existe
-    pergunta = crud.get_pergunta(db, pergunta_id=pergunta_id)
-    if pergunta is None:
+    if crud.get_versao_pergunta(db, pergunta_id) is None:
         raise HTTPException(status_code=404, detail="Pergunta não encontrada")
     
-    return crud.get_opcoes_resposta_by_pergunta(db, pergunta_id=pergunta_id)
+    conteudo = crud.get_opcoes_resposta_json(db, pergunta_id=pergunta_id)
+    return Response(content=conteudo, media_type="application/json")
+
+
+@router.post("/batch", response_model=OpcoesRespostasLote)
+def listar_opcoes_resposta_lote(
+    ids: List[int] = Depends(ids_do_corpo),
+    db: Session = Depends(get_db_leitura)
+):
+    """
+    Lista as opções de resposta de várias perguntas (`{"ids": [...]}` com os
+    ids das perguntas), por pergunta, em duas consultas. Perguntas inexistentes
+    vêm em `nao_encontrados`.
+    """
+    conteudo = crud.get_opcoes_resposta_lote_json(db, perguntas_ids=ids)
+    return Response(content=conteudo, media_type="application/json")
 
 
 @router.post("/pergunta/{pergunta_id}", response_model=OpcoesRespostas)
+@escrita
 def criar_opcao_resposta(
     pergunta_id: int,
     opcao: OpcoesRespostasCreate,
     db: Session = Depends(get_db)
 ):
     """Cria uma nova opção de resposta para uma pergunta"""
-    # Verificar se a pergunta existe
-    pergunta = crud.get_pergunta(db, pergunta_id=pergunta_id)
-    if pergunta is None:
+    db_opcao = crud.create_opcao_resposta(db=db, pergunta_id=pergunta_id, opcao=opcao)
+    if db_opcao is None:
         raise HTTPException(status_code=404, detail="Pergunta não encontrada")
-    
-    return crud.create_opcao_resposta(db=db, pergunta_id=pergunta_id, opcao=opcao)
+    return db_opcao
+
+
+@router.put("/pergunta/{pergunta_id}/ordem", response_model=List[ItemOrdem])
+@escrita
+def reordenar_opcoes_resposta(pergunta_id: int, nova_ordem: NovaOrdem, db: Session = Depends(get_db)):
+    """
+    Reordena as opções de resposta de uma pergunta (`ids` com todas elas, na
+    nova ordem), com um único UPDATE
+    """
+    try:
+        resultado = crud.reordenar_opcoes_resposta(db, pergunta_id=pergunta_id, opcoes_ids=nova_ordem.ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Pergunta não encontrada")
+    return resultado
 
 
 @router.put("/{opcao_id}", response_model=OpcoesRespostas)
+@escrita
 def atualizar_opcao_resposta(
     opcao_id: int,
     opcao: OpcoesRespostasUpdate,
@@ -48,9 +84,9 @@ def atualizar_opcao_resposta(
 
 
 @router.delete("/{opcao_id}")
+@escrita
 def deletar_opcao_resposta(opcao_id: int, db: Session = Depends(get_db)):
     """Deleta uma opção de resposta"""
-    db_opcao = crud.delete_opcao_resposta(db, opcao_id=opcao_id)
-    if db_opcao is None:
+    if crud.delete_opcao_resposta(db, opcao_id=opcao_id) is None:
         raise HTTPException(status_code=404, detail="Opção de resposta não encontrada")
     return {"message": "Opção de resposta deletada com sucesso"}
@@ -1,13 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.database import get_db
+from app.database import get_db, get_db_leitura
 from app.schemas import (
-    Pergunta, PerguntaCreate, PerguntaUpdate, PerguntaFilter, TipoPerguntaEnum
+    Pergunta, PerguntaCreate, PerguntaUpdate, PerguntaFilter, PerguntaPage, PerguntaBulkResult, PerguntaBuscaPage, PerguntaLote,
+    NovaOrdem, ItemOrdem,
+    TipoPerguntaEnum, OrdenacaoPerguntaEnum
 )
+from app.cache import cache_habilitado
+from app.etag import versao_if_none_match, resposta_condicional
+from app.instrumentacao import RotaMedida
+from app.replicas import escrita
+from app.lote import ids_do_corpo
+from app.projecao import Projecao, parametros_projecao
 import app.crud as crud
 
-router = APIRouter(prefix="/perguntas", tags=["perguntas"])
+router = APIRouter(prefix="/perguntas", tags=["perguntas"], route_class=RotaMedida)
+
+LIMITE_BULK = 1000
 
 
 @router.get("/formulario/{formulario_id}", response_model=List[Pergunta])
@@ -15,22 +25,24 @@ def listar_perguntas_formulario(
     formulario_id: int,
     skip: int = Query(0, ge=0, description="Número de registros para pular"),
     limit: int = Query(10, ge=1, le=100, description="Limite de registros por página"),
-    order_by: str = Query("ordem", description="Campo para ordenação"),
+    order_by: OrdenacaoPerguntaEnum = Query(OrdenacaoPerguntaEnum.ORDEM, description="Campo para ordenação"),
     order_desc: bool = Query(False, description="Ordenação decrescente"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco retornado em X-Next-Cursor (substitui skip)"),
     tipo_pergunta: Optional[TipoPerguntaEnum] = Query(None, description="Filtrar por tipo de pergunta"),
     obrigatoria: Optional[bool] = Query(None, description="Filtrar por obrigatoriedade"),
     sub_pergunta: Optional[bool] = Query(None, description="Filtrar por sub-pergunta"),
-    db: Session = Depends(get_db)
+    projecao: Optional[Projecao] = Depends(parametros_projecao(Pergunta)),
+    db: Session = Depends(get_db_leitura)
 ):
     """
     Lista perguntas de um formulário específico com suporte a:
     - Filtros por tipo, obrigatoriedade, etc.
     - Ordenação
-    - Paginação
+    - Paginação por offset (skip) ou por cursor (X-Next-Cursor)
+    - Campos e expansão seletivos (`fields`, `include=` sem as opções)
     """
     # Verificar se o formulário existe
-    formulario = crud.get_formulario(db, formulario_id=formulario_id)
-    if formulario is None:
+    if crud.get_versao_formulario(db, formulario_id) is None:
         raise HTTPException(status_code=404, detail="Formulário não encontrado")
     
     # Criar filtros
@@ -40,17 +52,68 @@ def listar_perguntas_formulario(
         sub_pergunta=sub_pergunta
     )
     
-    perguntas = crud.get_perguntas_by_formulario(
-        db,
-        formulario_id=formulario_id,
-        skip=skip,
-        limit=limit,
-        filters=filters,
-        order_by=order_by,
-        order_desc=order_desc
+    try:
+        conteudo, next_cursor = crud.get_perguntas_by_formulario_json(
+            db,
+            formulario_id=formulario_id,
+            skip=skip,
+            limit=limit,
+            filters=filters,
+            order_by=order_by.value,
+            order_desc=order_desc,
+            cursor=cursor,
+            projecao=projecao
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return Response(content=conteudo, media_type="application/json", headers=headers)
+
+
+@router.get("/formulario/{formulario_id}/pagina", response_model=PerguntaPage)
+def listar_pagina_perguntas_formulario(
+    formulario_id: int,
+    skip: int = Query(0, ge=0, description="Número de registros para pular"),
+    limit: int = Query(10, ge=1, le=100, description="Limite de registros por página"),
+    order_by: OrdenacaoPerguntaEnum = Query(OrdenacaoPerguntaEnum.ORDEM, description="Campo para ordenação"),
+    order_desc: bool = Query(False, description="Ordenação decrescente"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco retornado em next_cursor (substitui skip)"),
+    tipo_pergunta: Optional[TipoPerguntaEnum] = Query(None, description="Filtrar por tipo de pergunta"),
+    obrigatoria: Optional[bool] = Query(None, description="Filtrar por obrigatoriedade"),
+    sub_pergunta: Optional[bool] = Query(None, description="Filtrar por sub-pergunta"),
+    projecao: Optional[Projecao] = Depends(parametros_projecao(Pergunta)),
+    db: Session = Depends(get_db_leitura)
+):
+    """
+    Lista perguntas de um formulário junto com o total filtrado e os dados da
+    página, em uma única consulta (dispensa a chamada separada a /count).
+    `fields`/`include` valem para cada item da página.
+    """
+    filters = PerguntaFilter(
+        tipo_pergunta=tipo_pergunta,
+        obrigatoria=obrigatoria,
+        sub_pergunta=sub_pergunta
     )
     
-    return perguntas
+    try:
+        conteudo = crud.get_pagina_perguntas_json(
+            db,
+            formulario_id=formulario_id,
+            skip=skip,
+            limit=limit,
+            filters=filters,
+            order_by=order_by.value,
+            order_desc=order_desc,
+            cursor=cursor,
+            projecao=projecao
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if conteudo is None:
+        raise HTTPException(status_code=404, detail="Formulário não encontrado")
+    return Response(content=conteudo, media_type="application/json")
 
 
 @router.get("/formulario/{formulario_id}/count")
@@ -59,12 +122,11 @@ def contar_perguntas_formulario(
     tipo_pergunta: Optional[TipoPerguntaEnum] = Query(None, description="Filtrar por tipo de pergunta"),
     obrigatoria: Optional[bool] = Query(None, description="Filtrar por obrigatoriedade"),
     sub_pergunta: Optional[bool] = Query(None, description="Filtrar por sub-pergunta"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_leitura)
 ):
     """Conta o número total de perguntas de um formulário com os filtros aplicados"""
     # Verificar se o formulário existe
-    formulario = crud.get_formulario(db, formulario_id=formulario_id)
-    if formulario is None:
+    if crud.get_versao_formulario(db, formulario_id) is None:
         raise HTTPException(status_code=404, detail="Formulário não encontrado")
     
     # Criar filtros
@@ -79,27 +141,131 @@ def contar_perguntas_formulario(
     return {"total": count}
 
 
+@router.get("/search", response_model=PerguntaBuscaPage)
+def buscar_perguntas(
+    q: str = Query(..., min_length=1, max_length=200, description="Palavras ou código (título, código e orientação)"),
+    skip: int = Query(0, ge=0, description="Número de registros para pular"),
+    limit: int = Query(10, ge=1, le=100, description="Limite de registros por página"),
+    id_formulario: Optional[int] = Query(None, description="Restringe a busca a um formulário"),
+    tipo_pergunta: Optional[TipoPerguntaEnum] = Query(None, description="Filtrar por tipo de pergunta"),
+    db: Session = Depends(get_db_leitura)
+):
+    """
+    Busca perguntas em todos os formulários, por ordem de relevância.
+    A última palavra vale como prefixo; sem resultados, a busca é refeita por
+    similaridade (tolerando erros de digitação). `modo` informa qual foi usada.
+    """
+    try:
+        conteudo = crud.buscar_perguntas_json(
+            db,
+            texto=q,
+            skip=skip,
+            limit=limit,
+            id_formulario=id_formulario,
+            tipo_pergunta=tipo_pergunta
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=conteudo, media_type="application/json")
+
+
 @router.get("/{pergunta_id}", response_model=Pergunta)
-def obter_pergunta(pergunta_id: int, db: Session = Depends(get_db)):
-    """Obtém uma pergunta específica por ID"""
-    pergunta = crud.get_pergunta(db, pergunta_id=pergunta_id)
-    if pergunta is None:
+def obter_pergunta(
+    pergunta_id: int,
+    request: Request,
+    usar_cache: bool = Depends(cache_habilitado),
+    projecao: Optional[Projecao] = Depends(parametros_projecao(Pergunta)),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtém uma pergunta específica por ID.
+    Envie `Cache-Control: no-cache` para ignorar o cache.
+    Responde 304 quando If-None-Match traz o ETag da versão atual.
+    `fields`/`include` restringem a resposta; respostas parciais não usam o cache.
+    """
+    versao_cliente = versao_if_none_match(request, "pergunta", pergunta_id)
+    if projecao is not None:
+        resultado = crud.get_pergunta_parcial_json(
+            db, pergunta_id=pergunta_id, projecao=projecao, versao_cliente=versao_cliente
+        )
+    else:
+        resultado = crud.get_pergunta_json(
+            db,
+            pergunta_id=pergunta_id,
+            usar_cache=usar_cache,
+            versao_cliente=versao_cliente
+        )
+    if resultado is None:
         raise HTTPException(status_code=404, detail="Pergunta não encontrada")
-    return pergunta
+    versao, conteudo = resultado
+    return resposta_condicional("pergunta", pergunta_id, versao, conteudo)
 
 
 @router.post("/", response_model=Pergunta)
+@escrita
 def criar_pergunta(pergunta: PerguntaCreate, db: Session = Depends(get_db)):
     """Cria uma nova pergunta"""
-    # Verificar se o formulário existe
-    formulario = crud.get_formulario(db, formulario_id=pergunta.id_formulario)
-    if formulario is None:
+    db_pergunta = crud.create_pergunta(db=db, pergunta=pergunta)
+    if db_pergunta is None:
         raise HTTPException(status_code=404, detail="Formulário não encontrado")
+    return db_pergunta
+
+
+@router.post("/bulk", response_model=PerguntaBulkResult)
+@escrita
+def criar_perguntas_bulk(
+    perguntas: List[PerguntaCreate],
+    atomico: bool = Query(False, description="Não gravar nada se algum item for inválido"),
+    db: Session = Depends(get_db)
+):
+    """
+    Cria várias perguntas, com suas opções de resposta, em uma única transação.
+    Itens inválidos (formulário inexistente, código duplicado) são reportados em
+    `erros`; com `atomico=true`, qualquer erro cancela o lote inteiro (409).
+    """
+    if len(perguntas) > LIMITE_BULK:
+        raise HTTPException(status_code=413, detail=f"Máximo de {LIMITE_BULK} perguntas por lote")
     
-    return crud.create_pergunta(db=db, pergunta=pergunta)
+    resultado = crud.create_perguntas_bulk(db, perguntas=perguntas, atomico=atomico)
+    if atomico and resultado["erros"]:
+        raise HTTPException(status_code=409, detail=resultado["erros"])
+    return resultado
+
+
+@router.post("/batch", response_model=PerguntaLote)
+def obter_perguntas_lote(
+    ids: List[int] = Depends(ids_do_corpo),
+    usar_cache: bool = Depends(cache_habilitado),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtém várias perguntas, com opções de resposta, a partir de `{"ids": [...]}`.
+    Ids inexistentes vêm em `nao_encontrados`. As perguntas fora do cache são
+    lidas em até duas consultas, qualquer que seja a quantidade de ids.
+    """
+    conteudo = crud.get_perguntas_lote_json(db, perguntas_ids=ids, usar_cache=usar_cache)
+    return Response(content=conteudo, media_type="application/json")
+
+
+@router.put("/formulario/{formulario_id}/ordem", response_model=List[ItemOrdem])
+@escrita
+def reordenar_perguntas(formulario_id: int, nova_ordem: NovaOrdem, db: Session = Depends(get_db)):
+    """
+    Reordena as perguntas de um formulário: `ids` traz todas elas na nova ordem
+    e a `ordem` de cada uma passa a ser sua posição (a partir de 1). Gravado em
+    uma transação, com um único UPDATE.
+    """
+    try:
+        resultado = crud.reordenar_perguntas(db, formulario_id=formulario_id, perguntas_ids=nova_ordem.ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Formulário não encontrado")
+    return resultado
 
 
 @router.put("/{pergunta_id}", response_model=Pergunta)
+@escrita
 def atualizar_pergunta(
     pergunta_id: int,
     pergunta: PerguntaUpdate,
@@ -113,9 +279,9 @@ def atualizar_pergunta(
 
 
 @router.delete("/{pergunta_id}")
+@escrita
 def deletar_pergunta(pergunta_id: int, db: Session = Depends(get_db)):
     """Deleta uma pergunta"""
-    db_pergunta = crud.delete_pergunta(db, pergunta_id=pergunta_id)
-    if db_pergunta is None:
+    if crud.delete_pergunta(db, pergunta_id=pergunta_id) is None:
         raise HTTPException(status_code=404, detail="Pergunta não encontrada")
     return {"message": "Pergunta deletada com sucesso"}
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from uuid import UUID
 from enum import Enum
 
 
@@ -12,6 +13,13 @@ class TipoPerguntaEnum(str, Enum):
     NUMERO_DECIMAL = "Numero com duas casa decimais"
 
 
+class OrdenacaoPerguntaEnum(str, Enum):
+    # Apenas campos cobertos por índice (id_formulario, <campo>, id)
+    ORDEM = "ordem"
+    TITULO = "titulo"
+    ID = "id"
+
+
 # Schemas para OpcoesRespostas
 class OpcoesRespostasBase(BaseModel):
     resposta: str
@@ -53,6 +61,28 @@ class PerguntaCreate(PerguntaBase):
     opcoes_respostas: Optional[List[OpcoesRespostasCreate]] = []
 
 
+class PerguntaImport(PerguntaBase):
+    # None mantém as opções já cadastradas; lista (mesmo vazia) as substitui
+    opcoes_respostas: Optional[List[OpcoesRespostasCreate]] = None
+
+
+class PerguntaBulkCriada(BaseModel):
+    indice: int
+    id: int
+    codigo: str
+
+
+class PerguntaBulkErro(BaseModel):
+    indice: int
+    codigo: str
+    detail: str
+
+
+class PerguntaBulkResult(BaseModel):
+    criadas: List[PerguntaBulkCriada]
+    erros: List[PerguntaBulkErro]
+
+
 class PerguntaUpdate(BaseModel):
     titulo: Optional[str] = None
     codigo: Optional[str] = None
@@ -91,6 +121,7 @@ class FormularioUpdate(BaseModel):
 
 class Formulario(FormularioBase):
     id: int
+    versao: int = 1
     perguntas: List[Pergunta] = []
 
     class Config:
@@ -99,6 +130,7 @@ class Formulario(FormularioBase):
 
 class FormularioSummary(FormularioBase):
     id: int
+    versao: int = 1
 
     class Config:
         from_attributes = True
@@ -111,8 +143,101 @@ class PerguntaFilter(BaseModel):
     sub_pergunta: Optional[bool] = None
 
 
+class PerguntaPage(BaseModel):
+    items: List[Pergunta]
+    total: int
+    skip: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+
+# Schemas da busca de perguntas
+class ModoBuscaEnum(str, Enum):
+    TEXTO_COMPLETO = "fts"      # tsvector com ranking (ts_rank)
+    TRIGRAMA = "trigrama"       # aproximada (pg_trgm), quando o tsvector não encontra nada
+    SUBSTRING = "substring"     # ILIKE, sem pg_trgm ou fora do Postgres
+
+
+class PerguntaBuscaItem(PerguntaBase):
+    id: int
+    id_formulario: int
+    relevancia: Optional[float] = None
+
+
+class PerguntaBuscaPage(BaseModel):
+    items: List[PerguntaBuscaItem]
+    modo: ModoBuscaEnum
+    skip: int
+    limit: int
+    truncado: bool = False      # ranking só entre as primeiras perguntas encontradas (BUSCA_MAX_CANDIDATOS)
+
+
+# Schemas das leituras em lote (as chaves de `items` são os ids)
+class IdsLote(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+
+class FormularioLote(BaseModel):
+    items: Dict[int, Formulario]
+    nao_encontrados: List[int]
+
+
+class PerguntaLote(BaseModel):
+    items: Dict[int, Pergunta]
+    nao_encontrados: List[int]
+
+
+class OpcoesRespostasLote(BaseModel):
+    items: Dict[int, List[OpcoesRespostas]]     # por id da pergunta
+    nao_encontrados: List[int]                  # perguntas inexistentes
+
+
+# Schemas da reordenação (todos os ids, na nova ordem; `ordem` = posição, a partir de 1)
+class NovaOrdem(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+
+class ItemOrdem(BaseModel):
+    id: int
+    ordem: int
+
+
+class ImportacaoErro(BaseModel):
+    linha: int
+    detail: str
+
+
+class ImportacaoResult(BaseModel):
+    linhas: int
+    formularios_criados: int
+    formularios_atualizados: int
+    perguntas_criadas: int
+    perguntas_atualizadas: int
+    opcoes_respostas: int
+    erros: int
+    primeiros_erros: List[ImportacaoErro]
+
+
 class PaginationParams(BaseModel):
     skip: int = 0
     limit: int = 10
     order_by: str = "ordem"
     order_desc: bool = False
+
+
+# Schemas das respostas enviadas aos formulários (gravadas em lote, ver app/ingestao.py)
+class ValorRespostaCreate(BaseModel):
+    id_pergunta: int
+    id_opcao_resposta: Optional[int] = None     # opção escolhida (uma por valor)
+    valor: Optional[str] = Field(None, max_length=10000)
+
+
+class RespostaCreate(BaseModel):
+    # Perguntas de múltipla escolha recebem um valor por opção marcada
+    valores: List[ValorRespostaCreate] = Field(..., min_length=1, max_length=1000)
+
+
+class RespostaAceita(BaseModel):
+    id: UUID
+    id_formulario: int
+    versao_formulario: int
@@ -0,0 +1,235 @@
+"""
+Carga em massa de formulários, perguntas e opções para popular ambientes.
+
+Recebe um iterável de formulários no formato
+
+    (formulario, [(pergunta, [opcao, ...]), ...])
+
+com dicionários indexados pelos nomes dos atributos dos models e sem ids, e
+grava em lotes de aproximadamente `linhas_por_lote` linhas, uma transação por
+lote. No Postgres os ids são reservados nas sequences e as linhas são enviadas
+com COPY; nos demais bancos, com INSERTs de várias linhas.
+
+Formulários cujo título já existe e perguntas cujo código já existe são
+pulados, então uma carga interrompida pode ser repetida com a mesma entrada
+para completar o que falta. Ao contrário da importação NDJSON, nada que já
+existe é atualizado.
+"""
+import io
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, inspect, select, text
+
+from app.models import Formulario, Pergunta, OpcoesRespostas
+
+LINHAS_POR_LOTE = 50000
+
+FormularioSemente = Tuple[dict, List[Tuple[dict, List[dict]]]]
+
+
+def _valor(linha: dict, atributo: str, coluna):
+    if atributo in linha:
+        return linha[atributo]
+    # Defaults do model (ex.: obrigatoria=False) não são aplicados pelo COPY
+    if coluna.default is not None and coluna.default.is_scalar:
+        return coluna.default.arg
+    return None
+
+
+def _linhas_banco(model, linhas: List[dict]) -> List[dict]:
+    """
+    Converte atributos em nomes de coluna (ex.: descricao -> "descrição").
+    Colunas ausentes com default no banco (id, versao) ficam de fora do INSERT/COPY.
+    """
+    if not linhas:
+        return []
+    colunas = [
+        (atributo.key, atributo.columns[0])
+        for atributo in inspect(model).column_attrs
+        if atributo.key in linhas[0]
+        or not (atributo.columns[0].primary_key or atributo.columns[0].server_default is not None)
+    ]
+    return [{coluna.key: _valor(linha, atributo, coluna) for atributo, coluna in colunas} for linha in linhas]
+
+
+# COPY (Postgres)
+
+def _texto_copy(valor) -> str:
+    if valor is None:
+        return "\\N"
+    if isinstance(valor, bool):
+        return "t" if valor else "f"
+    return (
+        str(valor).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+def _copy(conn, model, linhas: List[dict]):
+    """COPY ... FROM STDIN (formato texto) das linhas já com nomes de coluna"""
+    if not linhas:
+        return
+    colunas = list(linhas[0])
+    preparer = conn.dialect.identifier_preparer
+    buffer = io.StringIO()
+    for linha in linhas:
+        buffer.write("\t".join(_texto_copy(linha[coluna]) for coluna in colunas))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    sql = (
+        f"COPY {preparer.format_table(model.__table__)} "
+        f"({', '.join(preparer.quote(coluna) for coluna in colunas)}) FROM STDIN"
+    )
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(sql, buffer)
+    finally:
+        cursor.close()
+
+
+def _reservar_ids(conn, model, quantidade: int) -> List[int]:
+    """Reserva `quantidade` ids na sequence da tabela (seguro com escritas concorrentes)"""
+    if not quantidade:
+        return []
+    return conn.scalars(
+        text("SELECT nextval(pg_get_serial_sequence(:tabela, 'id')) FROM generate_series(1, :quantidade)"),
+        {"tabela": model.__tablename__, "quantidade": quantidade},
+    ).all()
+
+
+def _gravar_copy(conn, formularios: List[dict], perguntas: List[List[dict]], opcoes: List[List[List[dict]]]):
+    ids_formularios = _reservar_ids(conn, Formulario, len(formularios))
+    ids_perguntas = iter(_reservar_ids(conn, Pergunta, sum(map(len, perguntas))))
+
+    linhas_perguntas, linhas_opcoes = [], []
+    for formulario_id, perguntas_formulario, opcoes_formulario in zip(ids_formularios, perguntas, opcoes):
+        for pergunta, opcoes_pergunta in zip(perguntas_formulario, opcoes_formulario):
+            pergunta_id = next(ids_perguntas)
+            linhas_perguntas.append({**pergunta, "id": pergunta_id, "id_formulario": formulario_id})
+            linhas_opcoes.extend({**opcao, "id_pergunta": pergunta_id} for opcao in opcoes_pergunta)
+
+    _copy(conn, Formulario, _linhas_banco(Formulario, [
+        {**formulario, "id": formulario_id} for formulario_id, formulario in zip(ids_formularios, formularios)
+    ]))
+    _copy(conn, Pergunta, _linhas_banco(Pergunta, linhas_perguntas))
+    _copy(conn, OpcoesRespostas, _linhas_banco(OpcoesRespostas, linhas_opcoes))
+
+
+# INSERTs de várias linhas (demais bancos)
+
+def _gravar_insert(conn, formularios: List[dict], perguntas: List[List[dict]], opcoes: List[List[List[dict]]]):
+    ids_formularios = conn.scalars(
+        insert(Formulario).returning(Formulario.id, sort_by_parameter_order=True),
+        _linhas_banco(Formulario, formularios),
+    ).all()
+
+    linhas_perguntas = [
+        {**pergunta, "id_formulario": formulario_id}
+        for formulario_id, perguntas_formulario in zip(ids_formularios, perguntas)
+        for pergunta in perguntas_formulario
+    ]
+    if not linhas_perguntas:
+        return
+    ids_perguntas = conn.scalars(
+        insert(Pergunta).returning(Pergunta.id, sort_by_parameter_order=True),
+        _linhas_banco(Pergunta, linhas_perguntas),
+    ).all()
+
+    opcoes_por_pergunta = (opcoes_pergunta for opcoes_formulario in opcoes for opcoes_pergunta in opcoes_formulario)
+    linhas_opcoes = [
+        {**opcao, "id_pergunta": pergunta_id}
+        for pergunta_id, opcoes_pergunta in zip(ids_perguntas, opcoes_por_pergunta)
+        for opcao in opcoes_pergunta
+    ]
+    if linhas_opcoes:
+        conn.execute(insert(OpcoesRespostas), _linhas_banco(OpcoesRespostas, linhas_opcoes))
+
+
+def _gravar_lote(conn, lote: List[FormularioSemente], resultado: dict):
+    titulos = {formulario["titulo"] for formulario, _ in lote}
+    titulos_usados = set(conn.scalars(select(Formulario.titulo).where(Formulario.titulo.in_(titulos))))
+    novos = []
+    for formulario, linhas in lote:
+        if formulario["titulo"] in titulos_usados:
+            resultado["formularios_existentes"] += 1
+            continue
+        titulos_usados.add(formulario["titulo"])
+        novos.append((formulario, linhas))
+
+    codigos = [pergunta["codigo"] for _, linhas in novos for pergunta, _ in linhas]
+    codigos_usados = set(conn.scalars(select(Pergunta.codigo).where(Pergunta.codigo.in_(codigos)))) if codigos else set()
+
+    formularios, perguntas, opcoes = [], [], []
+    for formulario, linhas in novos:
+        perguntas_formulario, opcoes_formulario = [], []
+        for pergunta, opcoes_pergunta in linhas:
+            if pergunta["codigo"] in codigos_usados:
+                resultado["perguntas_existentes"] += 1
+                continue
+            codigos_usados.add(pergunta["codigo"])
+            perguntas_formulario.append(pergunta)
+            opcoes_formulario.append(opcoes_pergunta)
+        formularios.append(formulario)
+        perguntas.append(perguntas_formulario)
+        opcoes.append(opcoes_formulario)
+    if not formularios:
+        return
+
+    if conn.dialect.name == "postgresql":
+        _gravar_copy(conn, formularios, perguntas, opcoes)
+    else:
+        _gravar_insert(conn, formularios, perguntas, opcoes)
+
+    resultado["formularios"] += len(formularios)
+    resultado["perguntas"] += sum(map(len, perguntas))
+    resultado["opcoes_respostas"] += sum(len(o) for opcoes_formulario in opcoes for o in opcoes_formulario)
+
+
+def semear(
+    engine,
+    formularios: Iterable[FormularioSemente],
+    linhas_por_lote: int = LINHAS_POR_LOTE,
+    progresso: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Grava os formulários em lotes e retorna as contagens e a vazão (linhas/s).
+    `progresso`, se informado, é chamado com o resultado parcial após cada lote.
+    """
+    resultado = {
+        "formularios": 0,
+        "perguntas": 0,
+        "opcoes_respostas": 0,
+        "formularios_existentes": 0,
+        "perguntas_existentes": 0,
+    }
+    inicio = time.perf_counter()
+
+    def gravar(lote):
+        with engine.begin() as conn:
+            _gravar_lote(conn, lote, resultado)
+        linhas = resultado["formularios"] + resultado["perguntas"] + resultado["opcoes_respostas"]
+        resultado["segundos"] = round(time.perf_counter() - inicio, 2)
+        resultado["linhas_s"] = round(linhas / max(time.perf_counter() - inicio, 1e-9))
+        if progresso is not None:
+            progresso(resultado)
+
+    lote, linhas_lote = [], 0
+    for formulario in formularios:
+        lote.append(formulario)
+        linhas_lote += 1 + sum(1 + len(opcoes) for _, opcoes in formulario[1])
+        if linhas_lote >= linhas_por_lote:
+            gravar(lote)
+            lote, linhas_lote = [], 0
+    if lote:
+        gravar(lote)
+
+    if engine.dialect.name == "postgresql" and resultado["formularios"]:
+        # Estatísticas atualizadas para o planner após a carga
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for model in (Formulario, Pergunta, OpcoesRespostas):
+                conn.execute(text(f"ANALYZE {model.__tablename__}"))
+
+    resultado.setdefault("segundos", 0.0)
+    resultado.setdefault("linhas_s", 0)
+    return resultado
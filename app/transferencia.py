@@ -0,0 +1,268 @@
+"""
+Exportação e importação de formulários em NDJSON (um objeto JSON por linha).
+
+Formato: cada linha tem um campo "tipo". Uma linha "formulario" abre um
+formulário e as linhas "pergunta" seguintes pertencem a ele:
+
+    {"tipo": "formulario", "titulo": "Cadastro", "descricao": "...", "ordem": 1}
+    {"tipo": "pergunta", "codigo": "nome", "titulo": "Nome", "ordem": 1,
+     "tipo_pergunta": "texto_livre", "opcoes_respostas": [{"resposta": "...", "ordem": 1}]}
+
+Na importação, formulários são localizados pelo título (criados se não
+existirem) e perguntas são atualizadas ou inseridas pelo `codigo`. Quando a
+linha traz `opcoes_respostas`, elas substituem as opções da pergunta.
+
+As linhas são lidas de forma incremental e gravadas em lotes de tamanho fixo,
+um commit por lote, então o uso de memória não depende do tamanho do arquivo
+e uma importação interrompida pode ser simplesmente executada de novo.
+"""
+import json
+from typing import AsyncIterable, Iterable, Iterator, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, selectinload
+
+from app.cache import invalidar_formulario, invalidar_pergunta
+from app.crud import _incrementar_versao
+from app.models import Formulario, Pergunta, OpcoesRespostas, OpcoesRespostaPergunta
+from app.schemas import FormularioCreate, PerguntaImport
+
+TAMANHO_LOTE = 1000
+MAX_ERROS_REPORTADOS = 100
+
+
+class ImportadorNDJSON:
+    """
+    Importa linhas NDJSON em lotes. Uso:
+
+        importador = ImportadorNDJSON()
+        importador.processar_linhas(db, linhas)   # quantas vezes for preciso
+        resultado = importador.finalizar(db)
+    """
+
+    def __init__(self, tamanho_lote: int = TAMANHO_LOTE):
+        self.tamanho_lote = tamanho_lote
+        self._numero_linha = 0
+        self._formulario_id: Optional[int] = None
+        # codigo -> (numero da linha, id do formulário, pergunta); o último vence
+        self._lote = {}
+        self.resultado = {
+            "linhas": 0,
+            "formularios_criados": 0,
+            "formularios_atualizados": 0,
+            "perguntas_criadas": 0,
+            "perguntas_atualizadas": 0,
+            "opcoes_respostas": 0,
+            "erros": 0,
+            "primeiros_erros": [],
+        }
+
+    def _erro(self, detail: str):
+        self.resultado["erros"] += 1
+        if len(self.resultado["primeiros_erros"]) < MAX_ERROS_REPORTADOS:
+            self.resultado["primeiros_erros"].append({"linha": self._numero_linha, "detail": detail})
+
+    def processar_linhas(self, db: Session, linhas: Iterable):
+        for linha in linhas:
+            self._numero_linha += 1
+            if not linha.strip():
+                continue
+            self.resultado["linhas"] += 1
+            try:
+                registro = json.loads(linha)
+                tipo = registro.get("tipo") if isinstance(registro, dict) else None
+                if tipo == "formulario":
+                    self._processar_formulario(db, FormularioCreate(**registro))
+                elif tipo == "pergunta":
+                    self._processar_pergunta(db, PerguntaImport(**registro))
+                else:
+                    self._erro('Campo "tipo" deve ser "formulario" ou "pergunta"')
+            except ValidationError as e:
+                self._erro("; ".join(
+                    f"{'.'.join(str(loc) for loc in erro['loc'])}: {erro['msg']}" for erro in e.errors()
+                ))
+            except ValueError as e:
+                self._erro(str(e))
+
+    def finalizar(self, db: Session) -> dict:
+        self._gravar_lote(db)
+        return self.resultado
+
+    def _processar_formulario(self, db: Session, formulario: FormularioCreate):
+        # Perguntas pendentes pertencem ao formulário anterior
+        self._gravar_lote(db)
+
+        db_formulario = (
+            db.query(Formulario)
+            .filter(Formulario.titulo == formulario.titulo)
+            .order_by(Formulario.ordem, Formulario.id)
+            .first()
+        )
+        if db_formulario is None:
+            db_formulario = Formulario(**formulario.model_dump())
+            db.add(db_formulario)
+            self.resultado["formularios_criados"] += 1
+        else:
+            for field, value in formulario.model_dump(exclude_unset=True).items():
+                setattr(db_formulario, field, value)
+            db_formulario.versao = Formulario.versao + 1
+            self.resultado["formularios_atualizados"] += 1
+        db.commit()
+        self._formulario_id = db_formulario.id
+        invalidar_formulario(self._formulario_id)
+
+    def _processar_pergunta(self, db: Session, pergunta: PerguntaImport):
+        if self._formulario_id is None:
+            raise ValueError('Pergunta antes de qualquer linha "formulario"')
+        self._lote[pergunta.codigo] = (self._numero_linha, self._formulario_id, pergunta)
+        if len(self._lote) >= self.tamanho_lote:
+            self._gravar_lote(db)
+
+    def _gravar_lote(self, db: Session):
+        if not self._lote:
+            return
+        lote, self._lote = self._lote, {}
+
+        # Formulário atual das perguntas já cadastradas (para versão e cache)
+        anteriores = dict(
+            db.execute(
+                select(Pergunta.codigo, Pergunta.id_formulario).where(Pergunta.codigo.in_(lote))
+            ).all()
+        )
+
+        colunas = ["titulo", "orientacao_resposta", "ordem", "obrigatoria", "sub_pergunta", "tipo_pergunta"]
+        stmt = pg_insert(Pergunta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Pergunta.codigo],
+            set_={coluna: stmt.excluded[coluna] for coluna in colunas + ["id_formulario"]},
+        ).returning(Pergunta.id, Pergunta.codigo)
+        linhas = [
+            {"id_formulario": formulario_id, **pergunta.model_dump(exclude={"opcoes_respostas"})}
+            for _, formulario_id, pergunta in lote.values()
+        ]
+        ids_por_codigo = {codigo: pergunta_id for pergunta_id, codigo in db.execute(stmt, linhas)}
+
+        # Opções informadas substituem as existentes
+        com_opcoes = [
+            (ids_por_codigo[codigo], pergunta.opcoes_respostas)
+            for codigo, (_, _, pergunta) in lote.items() if pergunta.opcoes_respostas is not None
+        ]
+        if com_opcoes:
+            ids = [pergunta_id for pergunta_id, _ in com_opcoes]
+            opcoes_existentes = select(OpcoesRespostas.id).where(OpcoesRespostas.id_pergunta.in_(ids))
+            db.execute(
+                delete(OpcoesRespostaPergunta).where(OpcoesRespostaPergunta.id_opcao_resposta.in_(opcoes_existentes))
+            )
+            db.execute(delete(OpcoesRespostas).where(OpcoesRespostas.id_pergunta.in_(ids)))
+            novas = [
+                {"id_pergunta": pergunta_id, **opcao.model_dump()}
+                for pergunta_id, opcoes in com_opcoes
+                for opcao in opcoes
+            ]
+            if novas:
+                db.execute(insert(OpcoesRespostas), novas)
+            self.resultado["opcoes_respostas"] += len(novas)
+
+        formularios = {formulario_id for _, formulario_id, _ in lote.values()} | set(anteriores.values())
+        _incrementar_versao(db, *formularios)
+        db.commit()
+
+        for formulario_id in formularios:
+            invalidar_formulario(formulario_id)
+        for pergunta_id in ids_por_codigo.values():
+            invalidar_pergunta(pergunta_id)
+        self.resultado["perguntas_atualizadas"] += len(anteriores)
+        self.resultado["perguntas_criadas"] += len(lote) - len(anteriores)
+
+
+def importar_ndjson(db: Session, linhas: Iterable, tamanho_lote: int = TAMANHO_LOTE) -> dict:
+    """Importa um iterável de linhas (por exemplo, um arquivo aberto) de uma vez"""
+    importador = ImportadorNDJSON(tamanho_lote)
+    importador.processar_linhas(db, linhas)
+    return importador.finalizar(db)
+
+
+def ler_formularios_ndjson(linhas: Iterable) -> Iterator[tuple]:
+    """
+    Lê o NDJSON como (formulario, [(pergunta, [opcoes]), ...]), o formato de
+    `app.semeadura.semear`. Diferente da importação, qualquer linha inválida
+    interrompe a leitura com ValueError indicando o número da linha.
+    """
+    formulario = None
+    perguntas = []
+    for numero_linha, linha in enumerate(linhas, start=1):
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+            tipo = registro.get("tipo") if isinstance(registro, dict) else None
+            if tipo == "formulario":
+                if formulario is not None:
+                    yield formulario, perguntas
+                formulario, perguntas = FormularioCreate(**registro).model_dump(mode="json"), []
+            elif tipo == "pergunta":
+                if formulario is None:
+                    raise ValueError('Pergunta antes de qualquer linha "formulario"')
+                pergunta = PerguntaImport(**registro).model_dump(mode="json")
+                opcoes = pergunta.pop("opcoes_respostas") or []
+                perguntas.append((pergunta, opcoes))
+            else:
+                raise ValueError('Campo "tipo" deve ser "formulario" ou "pergunta"')
+        except ValueError as e:  # inclui ValidationError e JSONDecodeError
+            raise ValueError(f"linha {numero_linha}: {e}") from e
+    if formulario is not None:
+        yield formulario, perguntas
+
+
+async def lotes_de_linhas(stream: AsyncIterable[bytes], tamanho_lote: int = TAMANHO_LOTE):
+    """Agrupa um stream de bytes (ex.: corpo da requisição) em listas de linhas"""
+    resto = b""
+    lote: List[bytes] = []
+    async for chunk in stream:
+        resto += chunk
+        *linhas, resto = resto.split(b"\n")
+        lote.extend(linhas)
+        if len(lote) >= tamanho_lote:
+            yield lote
+            lote = []
+    if resto:
+        lote.append(resto)
+    if lote:
+        yield lote
+
+
+def exportar_ndjson(db: Session, tamanho_lote: int = TAMANHO_LOTE) -> Iterator[str]:
+    """Gera as linhas NDJSON de todos os formulários, lendo as perguntas em lotes"""
+    formularios = db.query(Formulario).order_by(Formulario.ordem, Formulario.id).all()
+    for formulario in formularios:
+        yield json.dumps({
+            "tipo": "formulario",
+            "titulo": formulario.titulo,
+            "descricao": formulario.descricao,
+            "ordem": formulario.ordem,
+        }, ensure_ascii=False)
+
+        perguntas = db.scalars(
+            select(Pergunta)
+            .where(Pergunta.id_formulario == formulario.id)
+            .order_by(Pergunta.ordem, Pergunta.id)
+            .options(selectinload(Pergunta.opcoes_respostas))
+            .execution_options(yield_per=tamanho_lote)
+        )
+        for pergunta in perguntas:
+            yield json.dumps({
+                "tipo": "pergunta",
+                "codigo": pergunta.codigo,
+                "titulo": pergunta.titulo,
+                "orientacao_resposta": pergunta.orientacao_resposta,
+                "ordem": pergunta.ordem,
+                "obrigatoria": pergunta.obrigatoria,
+                "sub_pergunta": pergunta.sub_pergunta,
+                "tipo_pergunta": pergunta.tipo_pergunta,
+                "opcoes_respostas": [
+                    {"resposta": opcao.resposta, "ordem": opcao.ordem, "resposta_aberta": opcao.resposta_aberta}
+                    for opcao in pergunta.opcoes_respostas
+                ],
+            }, ensure_ascii=False)
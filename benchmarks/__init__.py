@@ -0,0 +1,12 @@
+"""
+Benchmarks da API.
+
+- `python -m benchmarks.dados`: gera um dataset sintético e reprodutível
+  (ex.: 10k formulários x 200 perguntas x 5 opções)
+- `python -m benchmarks.carga`: dispara clientes concorrentes contra todas as
+  rotas e grava latências (p50/p95/p99), vazão e queries por rota em JSON
+- `python -m benchmarks.comparar`: compara dois resultados de `carga` (ex.: entre commits)
+- `python -m benchmarks.arranque`: tempo de arranque a frio de um worker
+- `benchmarks/concorrencia.py`: vazão do modo síncrono vs. assíncrono em um endpoint
+- `benchmarks/explain_listagens.py`: confere que as listagens usam índices
+"""
@@ -0,0 +1,130 @@
+"""
+Latência da busca de perguntas (GET /perguntas/search) no banco configurado
+
+Executa `crud.buscar_perguntas_json` para consultas típicas (código exato,
+prefixo de código, palavras comuns e raras, prefixo, termo sem resultado, com
+filtro por formulário) e informa, por consulta, o modo usado, o número de
+itens, se o ranking foi truncado (BUSCA_TIMEOUT_MS) e as latências
+p50/p95/máx. Também confere com EXPLAIN que a busca por tsvector usa o índice
+GIN `ix_pergunta_busca`.
+
+Para medir na escala de produção, gere antes o dataset sintético, por exemplo
+5.000 formulários x 200 perguntas (1 milhão de perguntas):
+
+    python -m benchmarks.dados --formularios 5000 --perguntas 200 --opcoes 5
+
+Uso:
+    python -m benchmarks.busca
+    python -m benchmarks.busca --repeticoes 50 --max-ms 50
+
+Sai com código 1 se a busca por tsvector não usar o índice ou se o p95 de
+alguma consulta passar de `--max-ms`.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from sqlalchemy import event, func, select
+
+import app.crud as crud
+from app.database import SessionLocal, engine
+from app.models import Pergunta
+
+INDICE_BUSCA = "ix_pergunta_busca"
+
+
+def consultas(db) -> dict:
+    """Consultas do benchmark, a partir de códigos e formulários existentes"""
+    codigo = db.execute(select(Pergunta.codigo).order_by(Pergunta.id.desc()).limit(1)).scalar()
+    formulario_id = db.execute(select(func.max(Pergunta.id_formulario))).scalar()
+    return {
+        "codigo exato": {"texto": codigo},
+        "prefixo de codigo": {"texto": codigo[:-1]},
+        "palavra comum": {"texto": "renda"},
+        "duas palavras": {"texto": "informe endereço atual"},
+        "prefixo (digitando)": {"texto": "escol"},
+        "pagina profunda": {"texto": "renda", "skip": 500},
+        "termo muito comum": {"texto": "bench"},
+        "termo muito comum, pagina profunda": {"texto": "bench", "skip": 2000},
+        "sem acento": {"texto": "saude familia"},
+        "filtro por formulario": {"texto": "renda", "id_formulario": formulario_id},
+        "sem resultado": {"texto": "zzqxw"},
+        "sem resultado no formulario": {"texto": "zzqxw", "id_formulario": formulario_id},
+    }
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def medir(db, parametros: dict, repeticoes: int) -> dict:
+    conteudo = crud.buscar_perguntas_json(db, **parametros)  # aquecimento
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        conteudo = crud.buscar_perguntas_json(db, **parametros)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    resultado = json.loads(conteudo)
+    return {
+        "modo": resultado["modo"],
+        "itens": len(resultado["items"]),
+        "truncado": resultado["truncado"],
+        "p50_ms": round(statistics.median(tempos), 2),
+        "p95_ms": round(_percentil(tempos, 0.95), 2),
+        "max_ms": round(max(tempos), 2),
+    }
+
+
+def usa_indice(db) -> bool:
+    """A busca por tsvector de um termo seletivo (um código) passa pelo índice GIN?"""
+    capturados = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        capturados.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        crud.buscar_perguntas_json(db, consultas(db)["codigo exato"]["texto"])
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    statement, parameters = next(item for item in capturados if "@@" in item[0])
+    with engine.connect() as conn:
+        plano = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    return INDICE_BUSCA in json.dumps(plano)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--max-ms", type=float, help="Falha se o p95 de alguma consulta passar deste valor")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if db.get_bind().dialect.name != "postgresql":
+            print("A busca por tsvector requer Postgres", file=sys.stderr)
+            sys.exit(1)
+        resultado = {
+            "perguntas": db.execute(select(func.count()).select_from(Pergunta)).scalar(),
+            "usa_indice_gin": usa_indice(db),
+            "consultas": {nome: medir(db, parametros, args.repeticoes) for nome, parametros in consultas(db).items()},
+        }
+    finally:
+        db.close()
+
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    falhou = not resultado["usa_indice_gin"]
+    if args.max_ms is not None:
+        for nome, medida in resultado["consultas"].items():
+            if medida["p95_ms"] > args.max_ms:
+                print(f"[{nome}] p95 acima de {args.max_ms} ms", file=sys.stderr)
+                falhou = True
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+Teste de carga de todas as rotas da API, com resultado em JSON
+
+Sobe a API com uvicorn (modo síncrono, assíncrono ou ambos) e dispara clientes
+concorrentes. Cada cliente alterna entre leituras aleatórias sobre o dataset
+sintético (`python -m benchmarks.dados`) e, com probabilidade `--escritas`, um
+ciclo de escrita que cria, altera e remove um formulário próprio, passando por
+todas as rotas de escrita. O dataset em si nunca é alterado, então rodadas
+com a mesma semente são comparáveis.
+
+Para cada rota são reportados requisições, erros, vazão, latências p50/p95/p99
+e a média de queries e de tempo de banco (lidos do cabeçalho Server-Timing).
+O JSON gerado pode ser comparado entre commits com `python -m benchmarks.comparar`.
+
+Uso:
+    python -m benchmarks.dados --formularios 1000 --perguntas 200 --opcoes 5
+    python -m benchmarks.carga --modo ambos --clientes 50 --duracao 30 --saida resultado.json
+    python -m benchmarks.carga --base-url http://127.0.0.1:8000   # servidor já em execução
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import select
+
+from app.database import engine
+from app.models import Formulario, Pergunta
+from benchmarks.dados import PREFIXO_CODIGO, PREFIXO_TITULO, SEMENTE
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API = "/api/v1"
+# Formulários de onde saem os ids das leituras de perguntas e opções
+FORMULARIOS_AMOSTRA_PERGUNTAS = 50
+
+_SERVER_TIMING_DB = re.compile(r'db;dur=(?P<dur>[\d.]+);desc="(?P<queries>\d+) queries"')
+
+
+# Amostra do dataset
+
+def carregar_ids(rng: random.Random) -> dict:
+    """
+    Ids de formulários do dataset sintético e das perguntas de uma amostra
+    deles, escolhida pela semente para que rodadas sejam comparáveis
+    """
+    with engine.connect() as conn:
+        formularios = conn.scalars(
+            select(Formulario.id).where(Formulario.titulo.startswith(PREFIXO_TITULO)).order_by(Formulario.id)
+        ).all()
+        amostra = rng.sample(formularios, min(len(formularios), FORMULARIOS_AMOSTRA_PERGUNTAS))
+        perguntas = conn.scalars(
+            select(Pergunta.id).where(Pergunta.id_formulario.in_(amostra)).order_by(Pergunta.id)
+        ).all()
+    if not formularios or not perguntas:
+        raise SystemExit("Dataset sintético vazio: rode antes `python -m benchmarks.dados`")
+    return {"formularios": formularios, "perguntas": perguntas}
+
+
+# Cenários
+
+class Coletor:
+    """Amostras por rota: latência, status e métricas do Server-Timing"""
+
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.erros = defaultdict(int)
+        self.queries = defaultdict(int)
+        self.db_ms = defaultdict(float)
+        self.ativo = True
+
+    async def requisitar(self, client: httpx.AsyncClient, rota: str, metodo: str, url: str, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            response = await client.request(metodo, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        latencia = time.perf_counter() - inicio
+
+        if self.ativo:
+            self.latencias[rota].append(latencia)
+            if response is None or response.status_code >= 400:
+                self.erros[rota] += 1
+            elif match := _SERVER_TIMING_DB.search(response.headers.get("server-timing", "")):
+                self.queries[rota] += int(match["queries"])
+                self.db_ms[rota] += float(match["dur"])
+        return response
+
+
+# Formulários por requisição em GET /formularios/batch (o renderizador pede de 5 a 20)
+LOTE_LEITURA = 10
+
+# Termos da busca: palavras do vocabulário de benchmarks.dados, inteiras e como prefixo
+_BUSCAS = ("renda", "endereço atual", "escol", "informe saúde", "transporte principal")
+
+
+def _leituras(ids: dict):
+    """(rota, método, url) de uma leitura aleatória, com a rota no formato do FastAPI"""
+    def escolher(rng: random.Random):
+        formulario_id = rng.choice(ids["formularios"])
+        pergunta_id = rng.choice(ids["perguntas"])
+        lote = ",".join(map(str, rng.sample(ids["formularios"], min(len(ids["formularios"]), LOTE_LEITURA))))
+        return rng.choice([
+            ("GET /formularios/", f"{API}/formularios/?skip={rng.randrange(0, 200)}&limit=20"),
+            ("GET /formularios/{formulario_id}", f"{API}/formularios/{formulario_id}"),
+            ("GET /formularios/batch", f"{API}/formularios/batch?ids={lote}"),
+            ("GET /perguntas/formulario/{formulario_id}", f"{API}/perguntas/formulario/{formulario_id}?limit=20"),
+            ("GET /perguntas/formulario/{formulario_id}/pagina", f"{API}/perguntas/formulario/{formulario_id}/pagina?limit=20"),
+            ("GET /perguntas/formulario/{formulario_id}/count", f"{API}/perguntas/formulario/{formulario_id}/count"),
+            ("GET /perguntas/{pergunta_id}", f"{API}/perguntas/{pergunta_id}"),
+            ("GET /opcoes-respostas/pergunta/{pergunta_id}", f"{API}/opcoes-respostas/pergunta/{pergunta_id}"),
+            ("GET /perguntas/search", f"{API}/perguntas/search?q={rng.choice(_BUSCAS)}&limit=20"),
+        ])
+    return escolher
+
+
+async def _ciclo_escrita(client: httpx.AsyncClient, coletor: Coletor, postgres: bool):
+    """Cria, altera e remove um formulário próprio passando por todas as rotas de escrita"""
+    sufixo = uuid.uuid4().hex[:12]
+    titulo = f"{PREFIXO_TITULO}escrita-{sufixo}"
+    codigo = f"{PREFIXO_CODIGO}w-{sufixo}"
+
+    response = await coletor.requisitar(
+        client, "POST /formularios/", "POST", f"{API}/formularios/",
+        json={"titulo": titulo, "descricao": "Escrita do benchmark", "ordem": 0},
+    )
+    if response is None or response.status_code != 200:
+        return
+    formulario_id = response.json()["id"]
+
+    try:
+        await coletor.requisitar(
+            client, "PUT /formularios/{formulario_id}", "PUT", f"{API}/formularios/{formulario_id}",
+            json={"descricao": "Escrita do benchmark (alterada)"},
+        )
+        response = await coletor.requisitar(
+            client, "POST /perguntas/", "POST", f"{API}/perguntas/",
+            json={"id_formulario": formulario_id, "titulo": "Pergunta", "codigo": codigo,
+                  "ordem": 1, "tipo_pergunta": "unica_escolha",
+                  "opcoes_respostas": [{"resposta": "Sim", "ordem": 1}, {"resposta": "Não", "ordem": 2}]},
+        )
+        if response is None or response.status_code != 200:
+            return
+        pergunta_id = response.json()["id"]
+
+        response = await coletor.requisitar(
+            client, "POST /opcoes-respostas/pergunta/{pergunta_id}", "POST",
+            f"{API}/opcoes-respostas/pergunta/{pergunta_id}", json={"resposta": "Talvez", "ordem": 3},
+        )
+        opcao_id = response.json()["id"] if response is not None and response.status_code == 200 else None
+        if opcao_id is not None:
+            await coletor.requisitar(
+                client, "PUT /opcoes-respostas/{opcao_id}", "PUT", f"{API}/opcoes-respostas/{opcao_id}",
+                json={"resposta": "Não sei"},
+            )
+        await coletor.requisitar(
+            client, "PUT /perguntas/{pergunta_id}", "PUT", f"{API}/perguntas/{pergunta_id}",
+            json={"titulo": "Pergunta (alterada)"},
+        )
+
+        if postgres:
+            await coletor.requisitar(
+                client, "POST /perguntas/bulk", "POST", f"{API}/perguntas/bulk",
+                json=[
+                    {"id_formulario": formulario_id, "titulo": f"Lote {n}", "codigo": f"{codigo}-b{n}",
+                     "ordem": n + 1, "tipo_pergunta": "texto_livre"}
+                    for n in range(1, 11)
+                ],
+            )
+            linhas = [{"tipo": "formulario", "titulo": titulo, "ordem": 0}] + [
+                {"tipo": "pergunta", "codigo": f"{codigo}-i{n}", "titulo": f"Importada {n}",
+                 "ordem": n + 20, "tipo_pergunta": "Sim_Nao",
+                 "opcoes_respostas": [{"resposta": "Sim", "ordem": 1}, {"resposta": "Não", "ordem": 2}]}
+                for n in range(1, 6)
+            ]
+            await coletor.requisitar(
+                client, "POST /formularios/importar", "POST", f"{API}/formularios/importar",
+                content="\n".join(json.dumps(linha) for linha in linhas),
+                headers={"content-type": "application/x-ndjson"},
+            )
+
+        if opcao_id is not None:
+            await coletor.requisitar(
+                client, "DELETE /opcoes-respostas/{opcao_id}", "DELETE", f"{API}/opcoes-respostas/{opcao_id}"
+            )
+        await coletor.requisitar(
+            client, "DELETE /perguntas/{pergunta_id}", "DELETE", f"{API}/perguntas/{pergunta_id}"
+        )
+    finally:
+        await coletor.requisitar(
+            client, "DELETE /formularios/{formulario_id}", "DELETE", f"{API}/formularios/{formulario_id}"
+        )
+
+
+async def disparar(base_url: str, ids: dict, args, postgres: bool) -> dict:
+    coletor = Coletor()
+    headers = {"cache-control": "no-cache"} if args.sem_cache else {}
+    leitura = _leituras(ids)
+    limites = httpx.Limits(max_connections=args.clientes, max_keepalive_connections=args.clientes)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limites, timeout=60, headers=headers) as client:
+        async def cliente(indice: int, fim: float):
+            rng = random.Random(f"{args.semente}-{indice}")
+            while time.perf_counter() < fim:
+                if rng.random() < args.escritas:
+                    await _ciclo_escrita(client, coletor, postgres)
+                else:
+                    rota, url = leitura(rng)
+                    await coletor.requisitar(client, rota, "GET", url)
+
+        if args.aquecimento > 0:
+            coletor.ativo = False
+            fim = time.perf_counter() + args.aquecimento
+            await asyncio.gather(*(cliente(-1 - i, fim) for i in range(args.clientes)))
+            coletor.ativo = True
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(i, inicio + args.duracao) for i in range(args.clientes)))
+        duracao = time.perf_counter() - inicio
+
+        pool = (await client.get("/metrics")).json().get("pool")
+
+    return {**resumir(coletor, duracao), "pool": pool}
+
+
+# Estatísticas
+
+def percentil(ordenados: list, p: float) -> float:
+    """Percentil pelo método nearest-rank"""
+    if not ordenados:
+        return 0.0
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)) - 1, 0)]
+
+
+def _estatisticas(latencias: list, erros: int, queries: int, db_ms: float, duracao: float) -> dict:
+    ordenados = sorted(latencias)
+    sucesso = len(ordenados) - erros
+    return {
+        "requisicoes": len(ordenados),
+        "erros": erros,
+        "req_s": round(len(ordenados) / duracao, 2),
+        "p50_ms": round(percentil(ordenados, 50) * 1000, 2),
+        "p95_ms": round(percentil(ordenados, 95) * 1000, 2),
+        "p99_ms": round(percentil(ordenados, 99) * 1000, 2),
+        "max_ms": round(ordenados[-1] * 1000, 2) if ordenados else 0.0,
+        "queries_media": round(queries / sucesso, 2) if sucesso else None,
+        "db_ms_media": round(db_ms / sucesso, 3) if sucesso else None,
+    }
+
+
+def resumir(coletor: Coletor, duracao: float) -> dict:
+    rotas = {
+        rota: _estatisticas(latencias, coletor.erros[rota], coletor.queries[rota], coletor.db_ms[rota], duracao)
+        for rota, latencias in sorted(coletor.latencias.items())
+    }
+    total = _estatisticas(
+        [latencia for latencias in coletor.latencias.values() for latencia in latencias],
+        sum(coletor.erros.values()), sum(coletor.queries.values()), sum(coletor.db_ms.values()), duracao,
+    )
+    return {"duracao_s": round(duracao, 2), "total": total, "rotas": rotas}
+
+
+# Execução
+
+async def _aguardar_servidor(base_url: str, tentativas: int = 100):
+    async with httpx.AsyncClient() as client:
+        for _ in range(tentativas):
+            try:
+                await client.get(f"{base_url}/health")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"Servidor em {base_url} não respondeu")
+
+
+def executar_modo(modo_async: bool, ids: dict, args, postgres: bool) -> dict:
+    env = dict(os.environ, DB_ASYNC=str(modo_async))
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.porta), "--log-level", "critical"],
+        cwd=RAIZ,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{args.porta}"
+    try:
+        asyncio.run(_aguardar_servidor(base_url))
+        return asyncio.run(disparar(base_url, ids, args, postgres))
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modo", choices=["sync", "async", "ambos"], default="ambos")
+    parser.add_argument("--clientes", type=int, default=50, help="Clientes concorrentes")
+    parser.add_argument("--duracao", type=float, default=30, help="Duração da medição em segundos (por modo)")
+    parser.add_argument("--aquecimento", type=float, default=3, help="Segundos de aquecimento descartados")
+    parser.add_argument("--escritas", type=float, default=0.05, help="Probabilidade de um ciclo de escrita por iteração")
+    parser.add_argument("--sem-cache", action="store_true", help="Envia Cache-Control: no-cache nas requisições")
+    parser.add_argument("--semente", type=int, default=SEMENTE)
+    parser.add_argument("--porta", type=int, default=8766)
+    parser.add_argument("--base-url", help="Usa um servidor já em execução em vez de subir o uvicorn")
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: saída padrão)")
+    args = parser.parse_args()
+
+    ids = carregar_ids(random.Random(args.semente))
+    # bulk e importação usam INSERT ... ON CONFLICT do Postgres
+    postgres = engine.dialect.name == "postgresql"
+
+    resultado = {
+        "meta": {
+            "commit": _commit_atual(),
+            "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "banco": engine.dialect.name,
+            "clientes": args.clientes,
+            "duracao_s": args.duracao,
+            "escritas": args.escritas,
+            "cache": not args.sem_cache,
+            "semente": args.semente,
+            "amostra": {chave: len(valores) for chave, valores in ids.items()},
+        },
+        "modos": {},
+    }
+
+    if args.base_url:
+        resultado["modos"]["servidor"] = asyncio.run(disparar(args.base_url, ids, args, postgres))
+    else:
+        modos = {"sync": [False], "async": [True], "ambos": [False, True]}[args.modo]
+        for modo_async in modos:
+            nome = "async" if modo_async else "sync"
+            print(f"Executando modo {nome}...", file=sys.stderr)
+            resultado["modos"][nome] = executar_modo(modo_async, ids, args, postgres)
+
+    saida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(saida + "\n")
+        for nome, modo in resultado["modos"].items():
+            print(f"{nome:>8}: {modo['total']}", file=sys.stderr)
+    else:
+        print(saida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compara dois resultados de `python -m benchmarks.carga` (ex.: antes e depois de um commit)
+
+Uso:
+    python -m benchmarks.comparar antes.json depois.json [--limite 10]
+
+Mostra, por modo e rota, p50/p95/p99, vazão e queries médias dos dois
+resultados e a variação percentual; variações piores que `--limite` por cento
+em p95 ou em vazão são marcadas com "!".
+"""
+import argparse
+import json
+
+METRICAS = ("p50_ms", "p95_ms", "p99_ms", "req_s", "queries_media")
+
+
+def _variacao(antes, depois):
+    if antes in (None, 0) or depois is None:
+        return None
+    return (depois - antes) / antes * 100
+
+
+def _regrediu(metrica: str, variacao, limite: float) -> bool:
+    if variacao is None:
+        return False
+    # Latência e queries: maior é pior; vazão: menor é pior
+    return variacao < -limite if metrica == "req_s" else variacao > limite
+
+
+def comparar(antes: dict, depois: dict, limite: float) -> list:
+    linhas = []
+    for modo in sorted(set(antes["modos"]) & set(depois["modos"])):
+        rotas_antes = {"TOTAL": antes["modos"][modo]["total"], **antes["modos"][modo]["rotas"]}
+        rotas_depois = {"TOTAL": depois["modos"][modo]["total"], **depois["modos"][modo]["rotas"]}
+        for rota in sorted(set(rotas_antes) & set(rotas_depois), key=lambda r: (r != "TOTAL", r)):
+            celulas = []
+            regressao = False
+            for metrica in METRICAS:
+                valor_antes, valor_depois = rotas_antes[rota].get(metrica), rotas_depois[rota].get(metrica)
+                variacao = _variacao(valor_antes, valor_depois)
+                regressao |= metrica in ("p95_ms", "req_s") and _regrediu(metrica, variacao, limite)
+                texto_variacao = f"{variacao:+.0f}%" if variacao is not None else "-"
+                celulas.append(f"{metrica}={valor_antes}→{valor_depois} ({texto_variacao})")
+            linhas.append(f"{'!' if regressao else ' '} [{modo}] {rota}: " + ", ".join(celulas))
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("antes")
+    parser.add_argument("depois")
+    parser.add_argument("--limite", type=float, default=10, help="Variação (%%) considerada regressão")
+    args = parser.parse_args()
+
+    with open(args.antes, encoding="utf-8") as arquivo:
+        antes = json.load(arquivo)
+    with open(args.depois, encoding="utf-8") as arquivo:
+        depois = json.load(arquivo)
+
+    print(f"antes: {antes['meta'].get('commit')}  depois: {depois['meta'].get('commit')}")
+    for linha in comparar(antes, depois, args.limite):
+        print(linha)
+
+
+if __name__ == "__main__":
+    main()
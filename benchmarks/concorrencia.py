@@ -0,0 +1,97 @@
+"""
+Benchmark de vazão: modo síncrono (threadpool) vs. modo assíncrono (DB_ASYNC=True)
+
+Sobe a API duas vezes com uvicorn, uma em cada modo, e dispara requisições
+concorrentes contra o mesmo endpoint, reportando req/s e latências.
+
+Uso:
+    python benchmarks/concorrencia.py --clientes 300 --duracao 15 --caminho /api/v1/formularios/1
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def _aguardar_servidor(base_url: str, tentativas: int = 100):
+    async with httpx.AsyncClient() as client:
+        for _ in range(tentativas):
+            try:
+                await client.get(f"{base_url}/health")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"Servidor em {base_url} não respondeu")
+
+
+async def _disparar(base_url: str, caminho: str, clientes: int, duracao: float):
+    latencias = []
+    erros = 0
+    limites = httpx.Limits(max_connections=clientes, max_keepalive_connections=clientes)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limites, timeout=30) as client:
+        fim = time.perf_counter() + duracao
+
+        async def cliente():
+            nonlocal erros
+            while time.perf_counter() < fim:
+                inicio = time.perf_counter()
+                try:
+                    response = await client.get(caminho)
+                    if response.status_code != 200:
+                        erros += 1
+                except httpx.HTTPError:
+                    erros += 1
+                latencias.append(time.perf_counter() - inicio)
+
+        await asyncio.gather(*(cliente() for _ in range(clientes)))
+
+    latencias.sort()
+    return {
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "req_s": round(len(latencias) / duracao, 1),
+        "p50_ms": round(statistics.median(latencias) * 1000, 2),
+        "p95_ms": round(latencias[int(len(latencias) * 0.95) - 1] * 1000, 2),
+    }
+
+
+def executar_modo(modo_async: bool, porta: int, args) -> dict:
+    env = dict(os.environ, DB_ASYNC=str(modo_async))
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app",
+         "--port", str(porta), "--log-level", "critical"],
+        cwd=RAIZ,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{porta}"
+    try:
+        asyncio.run(_aguardar_servidor(base_url))
+        return asyncio.run(_disparar(base_url, args.caminho, args.clientes, args.duracao))
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=300, help="Clientes concorrentes")
+    parser.add_argument("--duracao", type=float, default=15, help="Duração de cada rodada em segundos")
+    parser.add_argument("--caminho", default="/api/v1/formularios/1", help="Endpoint a ser exercitado")
+    parser.add_argument("--porta", type=int, default=8765)
+    args = parser.parse_args()
+
+    for nome, modo_async in (("sincrono", False), ("assincrono", True)):
+        resultado = executar_modo(modo_async, args.porta, args)
+        print(f"{nome:>10}: {resultado}")
+
+
+if __name__ == "__main__":
+    main()
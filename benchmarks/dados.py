@@ -0,0 +1,142 @@
+"""
+Gera um dataset sintético e reprodutível para os benchmarks
+
+Os formulários gerados têm título "[bench] Formulário NNNNNN" e as perguntas
+código "bench-NNNNNN-PPP"; o conteúdo de cada formulário depende apenas da
+semente e do seu índice. A gravação usa `app.semeadura` (COPY no Postgres), em
+lotes com um commit cada, e formulários já existentes são pulados: rodar de
+novo com os mesmos parâmetros completa um dataset interrompido sem duplicar nada.
+
+Funciona com qualquer URL do SQLAlchemy (Postgres, SQLite...); por padrão usa o
+banco configurado no `.env`.
+
+Uso:
+    python -m benchmarks.dados --formularios 10000 --perguntas 200 --opcoes 5
+    python -m benchmarks.dados --formularios 100 --url sqlite:///bench.db
+    python -m benchmarks.dados --limpar
+"""
+import argparse
+import random
+from typing import Iterator, List, Tuple
+
+from sqlalchemy import create_engine, delete, select
+
+from app.database import DATABASE_URL
+from app.migracoes import migrar
+from app.models import Formulario, Pergunta, OpcoesRespostas, OpcoesRespostaPergunta
+from app.schemas import TipoPerguntaEnum
+from app.semeadura import LINHAS_POR_LOTE, semear
+
+PREFIXO_TITULO = "[bench] Formulário "
+PREFIXO_CODIGO = "bench-"
+SEMENTE = 42
+
+_ASSUNTOS = ["cadastro", "satisfação", "saúde", "endereço", "renda", "escolaridade", "transporte", "moradia"]
+_VERBOS = ["Informe", "Selecione", "Indique", "Descreva", "Avalie", "Confirme"]
+_COMPLEMENTOS = ["atual", "principal", "do responsável", "nos últimos 12 meses", "da família", "preferido"]
+_TIPOS = [tipo.value for tipo in TipoPerguntaEnum]
+
+
+def titulo_formulario(indice: int) -> str:
+    return f"{PREFIXO_TITULO}{indice:06d}"
+
+
+def gerar_formulario(indice: int, perguntas: int, opcoes: int, semente: int = SEMENTE) -> Tuple[dict, List[Tuple[dict, List[dict]]]]:
+    """
+    Linhas de um formulário: (formulario, [(pergunta, [opcoes]), ...]), sem ids.
+    O resultado depende apenas dos parâmetros, então é estável entre execuções.
+    """
+    rng = random.Random(f"{semente}-{indice}")
+    assunto = rng.choice(_ASSUNTOS)
+    formulario = {
+        "titulo": titulo_formulario(indice),
+        "descricao": f"Formulário sintético de {assunto}",
+        "ordem": indice,
+    }
+
+    linhas = []
+    for ordem in range(1, perguntas + 1):
+        pergunta = {
+            "titulo": f"{rng.choice(_VERBOS)} {rng.choice(_ASSUNTOS)} {rng.choice(_COMPLEMENTOS)}",
+            "codigo": f"{PREFIXO_CODIGO}{indice:06d}-{ordem:03d}",
+            "orientacao_resposta": rng.choice([None, "Responda com atenção", "Campo opcional"]),
+            "ordem": ordem,
+            "obrigatoria": rng.random() < 0.3,
+            "sub_pergunta": rng.random() < 0.1,
+            "tipo_pergunta": rng.choice(_TIPOS),
+        }
+        opcoes_pergunta = [
+            {"resposta": f"Opção {n}", "ordem": n, "resposta_aberta": n == opcoes and rng.random() < 0.2}
+            for n in range(1, opcoes + 1)
+        ]
+        linhas.append((pergunta, opcoes_pergunta))
+    return formulario, linhas
+
+
+def gerar_formularios(formularios: int, perguntas: int, opcoes: int, semente: int = SEMENTE) -> Iterator:
+    for indice in range(1, formularios + 1):
+        yield gerar_formulario(indice, perguntas, opcoes, semente)
+
+
+def gerar_dataset(
+    url: str = DATABASE_URL,
+    formularios: int = 100,
+    perguntas: int = 50,
+    opcoes: int = 5,
+    semente: int = SEMENTE,
+    linhas_por_lote: int = LINHAS_POR_LOTE,
+    verbose: bool = True,
+) -> dict:
+    """Grava o dataset (pulando formulários já existentes) e retorna as contagens"""
+    migrar(url)
+    engine = create_engine(url)
+
+    def progresso(resultado):
+        if verbose:
+            print(f"  {resultado['formularios'] + resultado['formularios_existentes']}/{formularios} formulários "
+                  f"({resultado['linhas_s']} linhas/s)")
+
+    try:
+        return semear(engine, gerar_formularios(formularios, perguntas, opcoes, semente), linhas_por_lote, progresso)
+    finally:
+        engine.dispose()
+
+
+def limpar_dataset(url: str = DATABASE_URL):
+    """Remove os formulários sintéticos (e suas perguntas e opções)"""
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        perguntas = select(Pergunta.id).where(Pergunta.codigo.startswith(PREFIXO_CODIGO))
+        opcoes = select(OpcoesRespostas.id).where(OpcoesRespostas.id_pergunta.in_(perguntas))
+        conn.execute(delete(OpcoesRespostaPergunta).where(OpcoesRespostaPergunta.id_opcao_resposta.in_(opcoes)))
+        conn.execute(delete(OpcoesRespostaPergunta).where(OpcoesRespostaPergunta.id_pergunta.in_(perguntas)))
+        conn.execute(delete(OpcoesRespostas).where(OpcoesRespostas.id_pergunta.in_(perguntas)))
+        conn.execute(delete(Pergunta).where(Pergunta.codigo.startswith(PREFIXO_CODIGO)))
+        conn.execute(delete(Formulario).where(Formulario.titulo.startswith(PREFIXO_TITULO)))
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formularios", type=int, default=100)
+    parser.add_argument("--perguntas", type=int, default=50, help="Perguntas por formulário")
+    parser.add_argument("--opcoes", type=int, default=5, help="Opções de resposta por pergunta")
+    parser.add_argument("--semente", type=int, default=SEMENTE)
+    parser.add_argument("--lote", type=int, default=LINHAS_POR_LOTE, help="Linhas por transação")
+    parser.add_argument("--url", default=DATABASE_URL, help="URL do banco (padrão: configuração do .env)")
+    parser.add_argument("--limpar", action="store_true", help="Remove o dataset sintético e sai")
+    args = parser.parse_args()
+
+    if args.limpar:
+        limpar_dataset(args.url)
+        print("Dataset sintético removido")
+        return
+
+    totais = gerar_dataset(
+        args.url, args.formularios, args.perguntas, args.opcoes, args.semente, args.lote
+    )
+    print(f"Criados: {totais}")
+
+
+if __name__ == "__main__":
+    main()
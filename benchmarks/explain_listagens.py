@@ -0,0 +1,130 @@
+"""
+Verifica com EXPLAIN que as listagens usam índices: nenhum Seq Scan e nenhum Sort
+
+Executa as funções de listagem do CRUD, captura o SQL emitido e roda EXPLAIN
+sobre cada consulta com `enable_seqscan = off`. Assim o resultado não depende do
+volume de dados: se ainda houver Seq Scan ou Sort no plano, nenhum índice
+atende ao filtro e à ordenação pedidos. Um Sort acima de um Limit (reordenar
+uma página já limitada) é aceito.
+
+Uso:
+    python benchmarks/explain_listagens.py [--formulario-id 1]
+
+Sai com código 1 se alguma listagem não estiver coberta por índice.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, func, text
+
+import app.crud as crud
+from app.database import SessionLocal, engine
+from app.models import Pergunta
+from app.schemas import OrdenacaoPerguntaEnum, PerguntaFilter, TipoPerguntaEnum
+
+NOS_PROIBIDOS = {"Seq Scan", "Sort", "Incremental Sort"}
+
+
+def _nos_proibidos(plano):
+    """Tipos de nó proibidos no plano; Sort sobre um Limit ordena só a página e é aceito"""
+    tipo = plano["Node Type"]
+    filhos = plano.get("Plans", [])
+    if tipo in NOS_PROIBIDOS and not (tipo != "Seq Scan" and _contem_limit(plano)):
+        yield tipo
+    for filho in filhos:
+        yield from _nos_proibidos(filho)
+
+
+def _contem_limit(plano) -> bool:
+    return any(filho["Node Type"] == "Limit" or _contem_limit(filho) for filho in plano.get("Plans", []))
+
+
+def _capturar(funcao):
+    """Executa `funcao` e retorna os SELECTs emitidos, com seus parâmetros"""
+    capturados = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            capturados.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        funcao()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return capturados
+
+
+def _explicar(statement, parameters):
+    with engine.connect() as conn:
+        with conn.begin():
+            conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            resultado = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    return set(_nos_proibidos(resultado[0]["Plan"]))
+
+
+def cenarios(db, formulario_id):
+    yield "get_formularios_json", lambda: crud.get_formularios_json(db, limit=10)
+    _, cursor = crud.get_formularios_json(db, limit=10)
+    if cursor:
+        yield "get_formularios_json (cursor)", lambda: crud.get_formularios_json(db, limit=10, cursor=cursor)
+
+    filtros = {
+        "sem filtro": None,
+        "obrigatoria": PerguntaFilter(obrigatoria=True),
+        "tipo_pergunta": PerguntaFilter(tipo_pergunta=TipoPerguntaEnum.TEXTO_LIVRE),
+    }
+    for campo in OrdenacaoPerguntaEnum:
+        for order_desc in (False, True):
+            for nome_filtro, filtro in filtros.items():
+                if filtro is not None and campo != OrdenacaoPerguntaEnum.ORDEM:
+                    continue
+                nome = f"get_perguntas_by_formulario_json order_by={campo.value} desc={order_desc} {nome_filtro}"
+                yield nome, (lambda campo=campo, order_desc=order_desc, filtro=filtro:
+                             crud.get_perguntas_by_formulario_json(
+                                 db, formulario_id, limit=10, filters=filtro,
+                                 order_by=campo.value, order_desc=order_desc))
+
+    yield "get_pagina_perguntas_json", lambda: crud.get_pagina_perguntas_json(db, formulario_id, limit=10)
+
+    _, cursor = crud.get_perguntas_by_formulario_json(db, formulario_id, limit=10)
+    if cursor:
+        yield "get_perguntas_by_formulario_json (cursor)", lambda: crud.get_perguntas_by_formulario_json(
+            db, formulario_id, limit=10, cursor=cursor)
+        yield "get_pagina_perguntas_json (cursor)", lambda: crud.get_pagina_perguntas_json(
+            db, formulario_id, limit=10, cursor=cursor)
+
+    pergunta_id = db.query(func.min(Pergunta.id)).filter(Pergunta.id_formulario == formulario_id).scalar()
+    if pergunta_id is not None:
+        yield "get_opcoes_resposta_json", lambda: crud.get_opcoes_resposta_json(db, pergunta_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formulario-id", type=int, help="Formulário usado nas listagens (padrão: o maior)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        formulario_id = args.formulario_id or db.execute(text(
+            "SELECT id_formulario FROM pergunta GROUP BY id_formulario ORDER BY count(*) DESC LIMIT 1"
+        )).scalar()
+
+        falhas = 0
+        for nome, funcao in cenarios(db, formulario_id):
+            for statement, parameters in _capturar(funcao):
+                proibidos = _explicar(statement, parameters)
+                situacao = "FALHA " + ", ".join(sorted(proibidos)) if proibidos else "ok"
+                falhas += bool(proibidos)
+                print(f"[{situacao}] {nome}")
+    finally:
+        db.close()
+
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
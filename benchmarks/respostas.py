@@ -0,0 +1,283 @@
+"""
+Vazão da ingestão de respostas (POST /formularios/{id}/respostas)
+
+Cria um formulário temporário com perguntas de todos os tipos e gera
+submissões válidas para ele. Mede, por etapa:
+
+- validação: `preparar_submissao` (o trabalho da rota antes de enfileirar);
+- gravação: a fila e a thread de `app.ingestao` com COPY, com INSERT de várias
+  linhas e, como referência, com uma transação por submissão (lote de 1);
+- HTTP (opcional, `--http`): clientes concorrentes contra o uvicorn, com as
+  respostas 202/503 e as latências, esperando a fila esvaziar no fim.
+
+Ao final o formulário é removido, e com ele as respostas (ON DELETE CASCADE).
+
+Uso:
+    python -m benchmarks.respostas
+    python -m benchmarks.respostas --submissoes 200000 --lote 5000
+    python -m benchmarks.respostas --http --modo ambos --clientes 100 --duracao 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+from sqlalchemy import func, select
+
+import app.crud as crud
+from app.database import SessionLocal, engine
+from app.ingestao import IngestaoRespostas, preparar_submissao
+from app.models import Resposta
+from app.schemas import FormularioCreate, OpcoesRespostasCreate, PerguntaCreate, RespostaCreate, TipoPerguntaEnum
+from benchmarks.carga import RAIZ, API, _aguardar_servidor, percentil
+from benchmarks.dados import PREFIXO_CODIGO, PREFIXO_TITULO, SEMENTE
+
+# Tipos das perguntas do formulário temporário, repetidos até `--perguntas`
+TIPOS = (
+    TipoPerguntaEnum.TEXTO_LIVRE,
+    TipoPerguntaEnum.UNICA_ESCOLHA,
+    TipoPerguntaEnum.INTEIRO,
+    TipoPerguntaEnum.MULTIPLA_ESCOLHA,
+    TipoPerguntaEnum.SIM_NAO,
+    TipoPerguntaEnum.NUMERO_DECIMAL,
+)
+OPCOES = 5
+PALAVRAS = ("sim", "não", "renda", "escola", "endereço", "saúde", "transporte", "família", "trabalho", "bairro")
+
+
+# Formulário e submissões
+
+def criar_formulario(perguntas: int) -> int:
+    sufixo = uuid.uuid4().hex[:12]
+    db = SessionLocal()
+    try:
+        formulario_id = crud.create_formulario(
+            db, FormularioCreate(titulo=f"{PREFIXO_TITULO}respostas-{sufixo}", descricao="Benchmark de respostas", ordem=0)
+        ).id
+        for ordem in range(1, perguntas + 1):
+            tipo = TIPOS[(ordem - 1) % len(TIPOS)]
+            opcoes = []
+            if tipo in (TipoPerguntaEnum.UNICA_ESCOLHA, TipoPerguntaEnum.MULTIPLA_ESCOLHA):
+                opcoes = [OpcoesRespostasCreate(resposta=f"Opção {n}", ordem=n) for n in range(1, OPCOES + 1)]
+            elif tipo == TipoPerguntaEnum.SIM_NAO:
+                opcoes = [OpcoesRespostasCreate(resposta="Sim", ordem=1), OpcoesRespostasCreate(resposta="Não", ordem=2)]
+            crud.create_pergunta(db, PerguntaCreate(
+                id_formulario=formulario_id, titulo=f"Pergunta {ordem}", codigo=f"{PREFIXO_CODIGO}r-{sufixo}-{ordem:03d}",
+                ordem=ordem, tipo_pergunta=tipo, obrigatoria=ordem % 3 == 1, opcoes_respostas=opcoes,
+            ))
+        return formulario_id
+    finally:
+        db.close()
+
+
+def remover_formulario(formulario_id: int):
+    db = SessionLocal()
+    try:
+        crud.delete_formulario(db, formulario_id)
+    finally:
+        db.close()
+
+
+def estrutura(formulario_id: int):
+    db = SessionLocal()
+    try:
+        return crud.get_estrutura_formulario(db, formulario_id)
+    finally:
+        db.close()
+
+
+def gerar_corpos(estrutura_formulario, quantidade: int, rng: random.Random) -> list:
+    """Corpos JSON de submissões válidas; perguntas opcionais ficam sem resposta às vezes"""
+    corpos = []
+    for _ in range(quantidade):
+        valores = []
+        for pergunta_id, pergunta in estrutura_formulario.perguntas.items():
+            if not pergunta.obrigatoria and rng.random() < 0.2:
+                continue
+            opcoes = sorted(pergunta.opcoes)
+            if pergunta.tipo == TipoPerguntaEnum.MULTIPLA_ESCOLHA.value:
+                for opcao_id in rng.sample(opcoes, rng.randint(1, 3)):
+                    valores.append({"id_pergunta": pergunta_id, "id_opcao_resposta": opcao_id})
+            elif opcoes:
+                valores.append({"id_pergunta": pergunta_id, "id_opcao_resposta": rng.choice(opcoes)})
+            elif pergunta.tipo == TipoPerguntaEnum.INTEIRO.value:
+                valores.append({"id_pergunta": pergunta_id, "valor": str(rng.randint(0, 120))})
+            elif pergunta.tipo == TipoPerguntaEnum.NUMERO_DECIMAL.value:
+                valores.append({"id_pergunta": pergunta_id, "valor": f"{rng.uniform(0, 10000):.2f}"})
+            else:
+                valores.append({"id_pergunta": pergunta_id, "valor": " ".join(rng.choices(PALAVRAS, k=rng.randint(2, 12)))})
+        corpos.append({"valores": valores})
+    return corpos
+
+
+# Etapas
+
+def medir_validacao(formulario_id: int, estrutura_formulario, corpos: list) -> tuple:
+    respostas = [RespostaCreate.model_validate(corpo) for corpo in corpos]
+    inicio = time.perf_counter()
+    submissoes = [preparar_submissao(formulario_id, estrutura_formulario, resposta) for resposta in respostas]
+    duracao = time.perf_counter() - inicio
+    return submissoes, {"submissoes_s": round(len(submissoes) / duracao), "us_por_submissao": round(duracao / len(submissoes) * 1e6, 2)}
+
+
+def medir_gravacao(submissoes: list, metodo: str, lote: int, intervalo_ms: float, fila_max: int) -> dict:
+    """Enfileira as submissões o mais rápido possível e espera a fila esvaziar"""
+    # Ids novos: cada medição grava as mesmas submissões
+    submissoes = [submissao._replace(id=uuid.uuid4()) for submissao in submissoes]
+    ingestao = IngestaoRespostas(engine, fila_max=fila_max, lote=lote, intervalo_ms=intervalo_ms, metodo=metodo)
+    ingestao.iniciar()
+    recusas = 0
+    inicio = time.perf_counter()
+    for submissao in submissoes:
+        while not ingestao.enfileirar(submissao):
+            recusas += 1
+            time.sleep(0.001)
+    while ingestao.pendentes():
+        time.sleep(0.005)
+    duracao = time.perf_counter() - inicio
+    ingestao.encerrar()
+    stats = ingestao.stats()
+    return {
+        "metodo": stats["metodo"],
+        "lote_max": lote,
+        "submissoes": stats["gravadas"],
+        "valores": stats["valores_gravados"],
+        "descartadas": stats["descartadas"],
+        "lotes": stats["lotes"],
+        "fila_cheia": recusas,
+        "duracao_s": round(duracao, 3),
+        "submissoes_s": round(stats["gravadas"] / duracao),
+        "valores_s": round(stats["valores_gravados"] / duracao),
+    }
+
+
+async def _disparar_http(base_url: str, formulario_id: int, corpos: list, clientes: int, duracao: float) -> dict:
+    url = f"{API}/formularios/{formulario_id}/respostas"
+    conteudos = [json.dumps(corpo).encode() for corpo in corpos]
+    latencias, codigos = [], {}
+    limites = httpx.Limits(max_connections=clientes, max_keepalive_connections=clientes)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limites, timeout=60) as client:
+        async def cliente(indice: int, fim: float):
+            posicao = indice
+            while time.perf_counter() < fim:
+                inicio = time.perf_counter()
+                response = await client.post(url, content=conteudos[posicao % len(conteudos)],
+                                             headers={"content-type": "application/json"})
+                latencias.append(time.perf_counter() - inicio)
+                codigos[response.status_code] = codigos.get(response.status_code, 0) + 1
+                posicao += clientes
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(i, inicio + duracao) for i in range(clientes)))
+        medida = time.perf_counter() - inicio
+
+        # Espera o worker gravar o que aceitou
+        inicio_espera = time.perf_counter()
+        while True:
+            stats = (await client.get("/metrics")).json()["respostas"]
+            if stats["aceitas"] == stats["gravadas"] + stats["descartadas"]:
+                break
+            await asyncio.sleep(0.05)
+        espera = time.perf_counter() - inicio_espera
+
+    ordenados = sorted(latencias)
+    aceitas = codigos.get(202, 0)
+    return {
+        "duracao_s": round(medida, 2),
+        "requisicoes": len(ordenados),
+        "status": {str(codigo): total for codigo, total in sorted(codigos.items())},
+        "aceitas_s": round(aceitas / medida),
+        "p50_ms": round(percentil(ordenados, 50) * 1000, 2),
+        "p95_ms": round(percentil(ordenados, 95) * 1000, 2),
+        "p99_ms": round(percentil(ordenados, 99) * 1000, 2),
+        "espera_gravacao_s": round(espera, 2),
+        "ingestao": stats,
+    }
+
+
+def medir_http(modo_async: bool, formulario_id: int, corpos: list, args) -> dict:
+    env = dict(os.environ, DB_ASYNC=str(modo_async))
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.porta), "--log-level", "critical"],
+        cwd=RAIZ,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{args.porta}"
+    try:
+        asyncio.run(_aguardar_servidor(base_url))
+        return asyncio.run(_disparar_http(base_url, formulario_id, corpos, args.clientes, args.duracao))
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissoes", type=int, default=50000, help="Submissões gravadas por método")
+    parser.add_argument("--perguntas", type=int, default=20, help="Perguntas do formulário temporário")
+    parser.add_argument("--lote", type=int, default=2000, help="Submissões por lote (RESPOSTAS_LOTE)")
+    parser.add_argument("--intervalo-ms", type=float, default=200, help="RESPOSTAS_INTERVALO_MS")
+    parser.add_argument("--fila", type=int, default=50000, help="RESPOSTAS_FILA_MAX")
+    parser.add_argument("--linha-a-linha", type=int, default=2000,
+                        help="Submissões da referência com uma transação por submissão (0 desliga)")
+    parser.add_argument("--http", action="store_true", help="Mede também a rota pelo uvicorn")
+    parser.add_argument("--modo", choices=["sync", "async", "ambos"], default="sync")
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--duracao", type=float, default=10, help="Segundos de medição HTTP (por modo)")
+    parser.add_argument("--semente", type=int, default=SEMENTE)
+    parser.add_argument("--porta", type=int, default=8767)
+    args = parser.parse_args()
+
+    rng = random.Random(args.semente)
+    formulario_id = criar_formulario(args.perguntas)
+    try:
+        estrutura_formulario = estrutura(formulario_id)
+        corpos = gerar_corpos(estrutura_formulario, args.submissoes, rng)
+        submissoes, validacao = medir_validacao(formulario_id, estrutura_formulario, corpos)
+        resultado = {
+            "meta": {
+                "banco": engine.dialect.name,
+                "cpus": os.cpu_count(),
+                "perguntas": args.perguntas,
+                "valores_por_submissao": round(sum(len(s.valores) for s in submissoes) / len(submissoes), 1),
+            },
+            "validacao": validacao,
+            "gravacao": {},
+        }
+        metodos = ["copy", "insert"] if engine.dialect.driver == "psycopg2" else ["insert"]
+        for metodo in metodos:
+            print(f"Gravando com {metodo}...", file=sys.stderr)
+            resultado["gravacao"][metodo] = medir_gravacao(submissoes, metodo, args.lote, args.intervalo_ms, args.fila)
+        if args.linha_a_linha:
+            print("Gravando uma submissão por transação...", file=sys.stderr)
+            resultado["gravacao"]["linha_a_linha"] = medir_gravacao(
+                submissoes[:args.linha_a_linha], "insert", 1, args.intervalo_ms, args.fila
+            )
+
+        if args.http:
+            resultado["http"] = {}
+            modos = {"sync": [False], "async": [True], "ambos": [False, True]}[args.modo]
+            for modo_async in modos:
+                nome = "async" if modo_async else "sync"
+                print(f"HTTP modo {nome}...", file=sys.stderr)
+                resultado["http"][nome] = medir_http(modo_async, formulario_id, corpos, args)
+
+        with engine.connect() as conn:
+            resultado["respostas_no_banco"] = conn.scalar(
+                select(func.count()).select_from(Resposta).where(Resposta.id_formulario == formulario_id)
+            )
+    finally:
+        remover_formulario(formulario_id)
+
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,36 @@
 """
-Script para inicializar o banco de dados com tabelas e dados de exemplo
+Script para inicializar o banco de dados: aplica as migrações do esquema
+(Alembic) e cria dados de exemplo
+
+Uso:
+    python init_db.py                       # tabelas + formulário de exemplo
+    python init_db.py --bulk --formularios 10000 --perguntas 200 --opcoes 5
+    python init_db.py --bulk --arquivo formularios.ndjson
+
+O modo --bulk grava em massa (COPY no Postgres, INSERTs de várias linhas nos
+demais bancos) formulários sintéticos ou lidos de um NDJSON exportado por
+`transferir_formularios.py`. Formulários e perguntas que já existem são
+pulados, então uma carga interrompida pode ser simplesmente repetida.
 """
+import argparse
 import os
 import sys
 
 # Adicionar o diretório raiz ao path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.database import engine, Base, SessionLocal
+from app.database import engine, SessionLocal
+from app.migracoes import migrar
 from app.models import Formulario, Pergunta, OpcoesRespostas
 
 
 def create_tables():
-    """Cria todas as tabelas no banco de dados"""
-    print("Criando tabelas no banco de dados...")
-    Base.metadata.create_all(bind=engine)
-    print("Tabelas criadas com sucesso!")
+    """Aplica as migrações do esquema (equivalente a `alembic upgrade head`)"""
+    print("Aplicando migrações no banco de dados...")
+    legada = migrar()
+    if legada is not None:
+        print(f"Banco criado antes das migrações: marcado na revisão {legada}")
+    print("Esquema atualizado com sucesso!")
 
 
 def create_sample_data():
@@ -38,8 +53,7 @@ def create_sample_data():
             ordem=1
         )
         db.add(formulario)
-        db.commit()
-        db.refresh(formulario)
+        db.flush()
         
         # Criar perguntas de exemplo
         perguntas_exemplo = [
@@ -87,8 +101,7 @@ def create_sample_data():
                 **pergunta_data
             )
             db.add(pergunta)
-            db.commit()
-            db.refresh(pergunta)
+            db.flush()
             
             # Adicionar opções para pergunta de gênero
             if pergunta.codigo == "genero":
@@ -130,8 +143,60 @@ def create_sample_data():
         db.close()
 
 
+def create_bulk_data(args):
+    """Carga em massa de formulários sintéticos ou de um arquivo NDJSON"""
+    from app.semeadura import semear
+
+    if args.arquivo:
+        from app.transferencia import ler_formularios_ndjson
+        entrada = sys.stdin if args.arquivo == "-" else open(args.arquivo, encoding="utf-8")
+        formularios = ler_formularios_ndjson(entrada)
+    else:
+        from benchmarks.dados import gerar_formularios
+        entrada = None
+        formularios = gerar_formularios(args.formularios, args.perguntas, args.opcoes, args.semente)
+
+    def progresso(resultado):
+        linhas = resultado["formularios"] + resultado["perguntas"] + resultado["opcoes_respostas"]
+        print(f"  {linhas} linhas em {resultado['segundos']}s ({resultado['linhas_s']} linhas/s)")
+
+    print("Gravando dados em massa...")
+    try:
+        resultado = semear(engine, formularios, args.lote, progresso)
+    except ValueError as e:
+        print(f"Erro no arquivo: {e}")
+        sys.exit(1)
+    finally:
+        if entrada not in (None, sys.stdin):
+            entrada.close()
+
+    print(
+        f"Carga concluída em {resultado['segundos']}s ({resultado['linhas_s']} linhas/s): "
+        f"{resultado['formularios']} formulários, {resultado['perguntas']} perguntas, "
+        f"{resultado['opcoes_respostas']} opções"
+    )
+    if resultado["formularios_existentes"] or resultado["perguntas_existentes"]:
+        print(
+            f"Pulados por já existirem: {resultado['formularios_existentes']} formulários, "
+            f"{resultado['perguntas_existentes']} perguntas"
+        )
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inicializa o banco de dados")
+    parser.add_argument("--bulk", action="store_true", help="Carga em massa em vez do exemplo")
+    parser.add_argument("--arquivo", help="NDJSON de formulários (\"-\" para a entrada padrão)")
+    parser.add_argument("--formularios", type=int, default=1000, help="Formulários sintéticos")
+    parser.add_argument("--perguntas", type=int, default=50, help="Perguntas por formulário")
+    parser.add_argument("--opcoes", type=int, default=5, help="Opções por pergunta")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--lote", type=int, default=50000, help="Linhas por transação")
+    args = parser.parse_args()
+
     print("Inicializando banco de dados...")
     create_tables()
-    create_sample_data()
+    if args.bulk:
+        create_bulk_data(args)
+    else:
+        create_sample_data()
     print("Inicialização concluída!")
@@ -0,0 +1,80 @@
+"""Esquema inicial: formulários, perguntas e opções de resposta
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Corresponde às tabelas que `Base.metadata.create_all` criava antes das
+migrações. Bancos criados dessa forma devem ser marcados com
+`alembic stamp 0001` antes do primeiro `alembic upgrade head`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "formulario",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("titulo", sa.String(length=255), nullable=False),
+        sa.Column("descrição", sa.Text(), nullable=True),
+        sa.Column("ordem", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_formulario_id", "formulario", ["id"])
+
+    op.create_table(
+        "pergunta",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_formulario", sa.Integer(), nullable=False),
+        sa.Column("titulo", sa.String(length=255), nullable=False),
+        sa.Column("codigo", sa.String(length=100), nullable=False),
+        sa.Column("orientacao_resposta", sa.Text(), nullable=True),
+        sa.Column("ordem", sa.Integer(), nullable=False),
+        sa.Column("obrigatoria", sa.Boolean(), nullable=True),
+        sa.Column("sub_pergunta", sa.Boolean(), nullable=True),
+        sa.Column("tipo_pergunta", sa.String(length=50), nullable=False),
+        sa.ForeignKeyConstraint(["id_formulario"], ["formulario.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("codigo"),
+    )
+    op.create_index("ix_pergunta_id", "pergunta", ["id"])
+
+    op.create_table(
+        "opcoes_respostas",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_pergunta", sa.Integer(), nullable=False),
+        sa.Column("resposta", sa.Text(), nullable=False),
+        sa.Column("ordem", sa.Integer(), nullable=False),
+        sa.Column("resposta_aberta", sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(["id_pergunta"], ["pergunta.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_opcoes_respostas_id", "opcoes_respostas", ["id"])
+
+    op.create_table(
+        "opcoes_resposta_pergunta",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_opcao_resposta", sa.Integer(), nullable=False),
+        sa.Column("id_pergunta", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["id_opcao_resposta"], ["opcoes_respostas.id"]),
+        sa.ForeignKeyConstraint(["id_pergunta"], ["pergunta.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_opcoes_resposta_pergunta_id", "opcoes_resposta_pergunta", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("opcoes_resposta_pergunta")
+    op.drop_table("opcoes_respostas")
+    op.drop_table("pergunta")
+    op.drop_table("formulario")
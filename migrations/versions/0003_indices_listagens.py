@@ -0,0 +1,49 @@
+"""Índices compostos das listagens e das chaves estrangeiras
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_formulario_ordem_id", "formulario", ["ordem", "id"])
+
+    op.create_index("ix_pergunta_formulario_ordem", "pergunta", ["id_formulario", "ordem", "id"])
+    op.create_index("ix_pergunta_formulario_titulo", "pergunta", ["id_formulario", "titulo", "id"])
+    op.create_index("ix_pergunta_formulario_id", "pergunta", ["id_formulario", "id"])
+    op.create_index("ix_pergunta_formulario_tipo", "pergunta", ["id_formulario", "tipo_pergunta", "ordem", "id"])
+    op.create_index(
+        "ix_pergunta_formulario_obrigatoria", "pergunta", ["id_formulario", "ordem", "id"],
+        postgresql_where=sa.text("obrigatoria"),
+    )
+
+    op.create_index("ix_opcoes_respostas_pergunta_ordem", "opcoes_respostas", ["id_pergunta", "ordem", "id"])
+
+    op.create_index(
+        "ix_opcoes_resposta_pergunta_id_opcao_resposta", "opcoes_resposta_pergunta", ["id_opcao_resposta"]
+    )
+    op.create_index("ix_opcoes_resposta_pergunta_id_pergunta", "opcoes_resposta_pergunta", ["id_pergunta"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_opcoes_resposta_pergunta_id_pergunta", table_name="opcoes_resposta_pergunta")
+    op.drop_index("ix_opcoes_resposta_pergunta_id_opcao_resposta", table_name="opcoes_resposta_pergunta")
+    op.drop_index("ix_opcoes_respostas_pergunta_ordem", table_name="opcoes_respostas")
+    op.drop_index("ix_pergunta_formulario_obrigatoria", table_name="pergunta")
+    op.drop_index("ix_pergunta_formulario_tipo", table_name="pergunta")
+    op.drop_index("ix_pergunta_formulario_id", table_name="pergunta")
+    op.drop_index("ix_pergunta_formulario_titulo", table_name="pergunta")
+    op.drop_index("ix_pergunta_formulario_ordem", table_name="pergunta")
+    op.drop_index("ix_formulario_ordem_id", table_name="formulario")
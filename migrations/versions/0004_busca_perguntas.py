@@ -0,0 +1,67 @@
+"""Busca textual de perguntas: coluna tsvector gerada, índice GIN e trigramas
+
+Apenas no Postgres. As extensões unaccent e pg_trgm são criadas quando o
+servidor as oferece (pacote contrib); sem unaccent a configuração `pt_busca`
+é a `portuguese` pura, e sem pg_trgm não há índice de trigramas (a busca cai
+para ILIKE quando o tsvector não encontra nada).
+
+A coluna gerada reescreve a tabela `pergunta`: em bancos grandes, aplique em
+uma janela de manutenção.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DOCUMENTO_BUSCA = (
+    "setweight(to_tsvector('pt_busca', regexp_replace(codigo, '[^[:alnum:]]+', ' ', 'g')), 'A') || "
+    "setweight(to_tsvector('pt_busca', coalesce(titulo, '')), 'A') || "
+    "setweight(to_tsvector('pt_busca', coalesce(orientacao_resposta, '')), 'C')"
+)
+
+
+def _extensoes_disponiveis(bind) -> set:
+    return set(bind.execute(sa.text("SELECT name FROM pg_available_extensions")).scalars())
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    disponiveis = _extensoes_disponiveis(bind)
+
+    op.execute("CREATE TEXT SEARCH CONFIGURATION pt_busca (COPY = portuguese)")
+    if "unaccent" in disponiveis:
+        op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        op.execute(
+            "ALTER TEXT SEARCH CONFIGURATION pt_busca "
+            "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem"
+        )
+
+    op.add_column("pergunta", sa.Column("busca", TSVECTOR, sa.Computed(DOCUMENTO_BUSCA, persisted=True)))
+    op.create_index("ix_pergunta_busca", "pergunta", ["busca"], postgresql_using="gin")
+
+    if "pg_trgm" in disponiveis:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX ix_pergunta_busca_trgm ON pergunta USING gin ((titulo || ' ' || codigo) gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS ix_pergunta_busca_trgm")
+    op.drop_index("ix_pergunta_busca", table_name="pergunta")
+    op.drop_column("pergunta", "busca")
+    op.execute("DROP TEXT SEARCH CONFIGURATION pt_busca")
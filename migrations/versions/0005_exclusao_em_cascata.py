@@ -0,0 +1,61 @@
+"""Chaves estrangeiras com ON DELETE CASCADE
+
+Perguntas, opções de resposta e vínculos passam a ser removidos pelo próprio
+banco junto com o formulário ou a pergunta a que pertencem, e o ORM deixa de
+carregá-los para apagar um a um (passive_deletes). As colunas de referência
+já são indexadas (migração 0003 e `index=True` dos vínculos), então a cascata
+não percorre as tabelas filhas.
+
+No Postgres as restrições são trocadas com ALTER TABLE; no SQLite, que não
+altera restrições, o Alembic recria as tabelas (modo batch).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tabela, coluna, tabela referenciada)
+CHAVES = (
+    ("pergunta", "id_formulario", "formulario"),
+    ("opcoes_respostas", "id_pergunta", "pergunta"),
+    ("opcoes_resposta_pergunta", "id_opcao_resposta", "opcoes_respostas"),
+    ("opcoes_resposta_pergunta", "id_pergunta", "pergunta"),
+)
+# Nomes padrão do Postgres; no SQLite, dá nome às restrições criadas sem nome pela 0001
+CONVENCAO = {"fk": "%(table_name)s_%(column_0_name)s_fkey"}
+
+
+def _nome_atual(inspetor, tabela: str, coluna: str) -> Optional[str]:
+    for chave in inspetor.get_foreign_keys(tabela):
+        if chave["constrained_columns"] == [coluna]:
+            return chave["name"]
+    return None
+
+
+def _recriar_chaves(ondelete: Optional[str]) -> None:
+    inspetor = sa.inspect(op.get_bind())
+    for tabela in dict.fromkeys(tabela for tabela, _, _ in CHAVES):
+        with op.batch_alter_table(tabela, naming_convention=CONVENCAO) as batch:
+            for _, coluna, referenciada in (chave for chave in CHAVES if chave[0] == tabela):
+                nome = f"{tabela}_{coluna}_fkey"
+                batch.drop_constraint(_nome_atual(inspetor, tabela, coluna) or nome, type_="foreignkey")
+                batch.create_foreign_key(nome, referenciada, [coluna], ["id"], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    _recriar_chaves("CASCADE")
+
+
+def downgrade() -> None:
+    _recriar_chaves(None)
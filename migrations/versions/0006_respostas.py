@@ -0,0 +1,58 @@
+"""Respostas dos formulários: cabeçalho da submissão e valores por pergunta
+
+As tabelas recebem as submissões gravadas em lote por app/ingestao.py. Todas
+as chaves estrangeiras têm ON DELETE CASCADE, como as da migração 0005, e são
+indexadas; não há outros índices, para não encarecer a ingestão.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "resposta",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("id_formulario", sa.Integer(), nullable=False),
+        sa.Column("versao_formulario", sa.Integer(), nullable=False),
+        sa.Column("recebida_em", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["id_formulario"], ["formulario.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_resposta_formulario_recebida", "resposta", ["id_formulario", "recebida_em"])
+
+    op.create_table(
+        "resposta_valor",
+        sa.Column("id_resposta", sa.Uuid(), nullable=False),
+        sa.Column("posicao", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("id_pergunta", sa.Integer(), nullable=False),
+        sa.Column("id_opcao_resposta", sa.Integer(), nullable=True),
+        sa.Column("valor", sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(["id_resposta"], ["resposta.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["id_pergunta"], ["pergunta.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["id_opcao_resposta"], ["opcoes_respostas.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id_resposta", "posicao"),
+    )
+    op.create_index("ix_resposta_valor_pergunta", "resposta_valor", ["id_pergunta"])
+    op.create_index(
+        "ix_resposta_valor_opcao", "resposta_valor", ["id_opcao_resposta"],
+        postgresql_where=sa.text("id_opcao_resposta IS NOT NULL"),
+        sqlite_where=sa.text("id_opcao_resposta IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("resposta_valor")
+    op.drop_table("resposta")
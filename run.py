@@ -1,23 +1,160 @@
 """
 Script para executar a aplicação FastAPI
+
+Uso:
+    python run.py               # desenvolvimento: um processo (reload com API_DEBUG=True)
+    python run.py --producao    # produção: API_WORKERS processos (padrão: número de CPUs)
+
+No modo de produção o pool de conexões de cada worker é dimensionado para que
+o total fique dentro de DB_MAX_CONNECTIONS (o orçamento de conexões do Postgres
+reservado para a API). Em Linux/macOS os workers são gerenciados pelo gunicorn
+(`kill -HUP <pid do master>` troca os workers sem derrubar conexões em
+andamento); no Windows, pelo próprio uvicorn.
 """
-import uvicorn
+import argparse
 import os
+import sys
+
+import uvicorn
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Threads do threadpool do FastAPI/Starlette (anyio) por worker: limita os
+# endpoints síncronos em execução simultânea
+THREADS_POR_WORKER = 40
+
+# Conexões da gravação das respostas por worker, fora do pool das requisições
+# (DB_CONEXOES_INGESTAO em app/database.py; app não é importado aqui para que
+# os workers criem os engines já com o pool dimensionado)
+CONEXOES_INGESTAO = 1
+
+
+def dimensionar_pool(workers: int, orcamento: int, pool_size: int, max_overflow: int):
+    """
+    Divide o orçamento de conexões entre os workers, sem ultrapassar o pool
+    configurado. Cada worker reserva CONEXOES_INGESTAO para a gravação das
+    respostas; o restante vai para o pool das requisições. Retorna
+    (pool_size, max_overflow) por worker.
+    """
+    por_worker = orcamento // workers - CONEXOES_INGESTAO
+    if por_worker < 1:
+        raise ValueError(
+            f"DB_MAX_CONNECTIONS={orcamento} não comporta {workers} workers "
+            f"(mínimo {1 + CONEXOES_INGESTAO} conexões por worker, {CONEXOES_INGESTAO} da gravação de respostas)"
+        )
+    pool_size = min(pool_size, por_worker)
+    max_overflow = min(max_overflow, por_worker - pool_size)
+    return pool_size, max_overflow
+
+
+def _configuracao_producao(args) -> dict:
+    workers = args.workers or int(os.getenv("API_WORKERS", 0)) or os.cpu_count() or 1
+    pool_size = int(os.getenv("DB_POOL_SIZE", 5))
+    max_overflow = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    orcamento = os.getenv("DB_MAX_CONNECTIONS")
+    if orcamento:
+        pool_size, max_overflow = dimensionar_pool(workers, int(orcamento), pool_size, max_overflow)
+
+    return {
+        "workers": workers,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "orcamento": int(orcamento) if orcamento else None,
+        "keepalive": int(os.getenv("API_KEEPALIVE", 5)),
+        "backlog": int(os.getenv("API_BACKLOG", 2048)),
+        "graceful_timeout": int(os.getenv("API_GRACEFUL_TIMEOUT", 30)),
+        "async": os.getenv("DB_ASYNC", "False").lower() == "true",
+    }
+
+
+def _imprimir_concorrencia(config: dict):
+    conexoes = config["pool_size"] + config["max_overflow"]
+    total = config["workers"] * (conexoes + CONEXOES_INGESTAO)
+    # No modo síncrono cada requisição ocupa uma thread enquanto espera o banco
+    simultaneas = conexoes if config["async"] else min(conexoes, THREADS_POR_WORKER)
+    orcamento = f" (orçamento DB_MAX_CONNECTIONS={config['orcamento']})" if config["orcamento"] else ""
+
+    print(f"Workers: {config['workers']} ({'assíncrono' if config['async'] else 'síncrono'})")
+    print(f"Pool por worker: {config['pool_size']} + {config['max_overflow']} overflow, "
+          f"+ {CONEXOES_INGESTAO} da gravação de respostas")
+    print(f"Conexões com o banco no pico: {total}{orcamento}")
+    print(f"Requisições simultâneas no banco: {config['workers'] * simultaneas} ({simultaneas} por worker)")
+    print(f"Keep-alive: {config['keepalive']}s, backlog: {config['backlog']}, "
+          f"encerramento gracioso: {config['graceful_timeout']}s")
+
+
+def _executar_gunicorn(host: str, port: int, config: dict):
+    from gunicorn.app.base import BaseApplication
+
+    class Aplicacao(BaseApplication):
+        def load_config(self):
+            opcoes = {
+                "bind": f"{host}:{port}",
+                "workers": config["workers"],
+                "worker_class": "uvicorn.workers.UvicornWorker",
+                "keepalive": config["keepalive"],
+                "backlog": config["backlog"],
+                "graceful_timeout": config["graceful_timeout"],
+                # Sem preload: cada worker importa a aplicação e cria o próprio pool
+                "preload_app": False,
+            }
+            for chave, valor in opcoes.items():
+                self.cfg.set(chave, valor)
+
+        def load(self):
+            from app.main import app
+            return app
+
+    Aplicacao().run()
+
+
+def executar_producao(host: str, port: int, args):
+    config = _configuracao_producao(args)
+    # Os workers leem o pool do ambiente ao importar app.database
+    os.environ["DB_POOL_SIZE"] = str(config["pool_size"])
+    os.environ["DB_MAX_OVERFLOW"] = str(config["max_overflow"])
+
+    print(f"Iniciando servidor (produção) em http://{host}:{port}")
+    _imprimir_concorrencia(config)
+
+    if sys.platform != "win32":
+        _executar_gunicorn(host, port, config)
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host=host,
+            port=port,
+            workers=config["workers"],
+            timeout_keep_alive=config["keepalive"],
+            backlog=config["backlog"],
+            timeout_graceful_shutdown=config["graceful_timeout"],
+        )
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--producao", action="store_true", help="Vários workers, sem reload")
+    parser.add_argument("--workers", type=int, help="Número de workers (padrão: API_WORKERS ou número de CPUs)")
+    args = parser.parse_args()
+
     host = os.getenv("API_HOST", "127.0.0.1")
     port = int(os.getenv("API_PORT", 8000))
     debug = os.getenv("API_DEBUG", "True").lower() == "true"
-    
-    print(f"Iniciando servidor em http://{host}:{port}")
-    print(f"Documentação disponível em http://{host}:{port}/docs")
-    
-    uvicorn.run(
-        "app.main:app",
-        host=host,
-        port=port,
-        reload=debug
-    )
+
+    if args.producao:
+        try:
+            executar_producao(host, port, args)
+        except ValueError as e:
+            print(f"Erro: {e}")
+            sys.exit(1)
+    else:
+        print(f"Iniciando servidor em http://{host}:{port}")
+        print(f"Documentação disponível em http://{host}:{port}/docs")
+
+        uvicorn.run(
+            "app.main:app",
+            host=host,
+            port=port,
+            reload=debug
+        )
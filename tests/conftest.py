@@ -0,0 +1,85 @@
+"""
+Configuração dos testes: um banco SQLite temporário, com as migrações aplicadas.
+
+As variáveis de ambiente são definidas antes de qualquer import de `app`, que
+lê a configuração do banco ao ser importado. O cache de leitura fica desligado
+para que as contagens de consultas não dependam da ordem dos testes.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+_DIRETORIO = tempfile.mkdtemp(prefix="formularios-testes-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_DIRETORIO, 'testes.db')}",
+    "DB_ASYNC": "False",
+    "DATABASE_REPLICA_URLS": "",
+    "CACHE_MAXSIZE": "0",
+    "DB_POOL_WARMUP": "0",
+})
+
+from sqlalchemy import event  # noqa: E402
+
+from app.database import DATABASE_URL, SessionLocal, engine  # noqa: E402
+from app.migracoes import migrar  # noqa: E402
+import app.crud as crud  # noqa: E402
+from app.schemas import FormularioCreate, OpcoesRespostasCreate, PerguntaCreate, TipoPerguntaEnum  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def banco():
+    migrar(DATABASE_URL)
+    yield
+    engine.dispose()
+
+
+@pytest.fixture
+def db():
+    sessao = SessionLocal()
+    try:
+        yield sessao
+    finally:
+        sessao.close()
+
+
+@contextmanager
+def _contar_consultas():
+    """Lista dos statements executados no engine enquanto o bloco roda"""
+    consultas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        consultas.append(statement)
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        yield consultas
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+
+
+@pytest.fixture
+def contar_consultas():
+    return _contar_consultas
+
+
+@pytest.fixture
+def criar_formulario(db):
+    """Cria formulários com `perguntas` perguntas de `opcoes` opções cada; remove-os no fim"""
+    criados = []
+
+    def criar(perguntas: int, opcoes: int = 3) -> int:
+        formulario_id = crud.create_formulario(db, FormularioCreate(titulo=f"Teste {len(criados)}", ordem=0)).id
+        criados.append(formulario_id)
+        for ordem in range(1, perguntas + 1):
+            crud.create_pergunta(db, PerguntaCreate(
+                id_formulario=formulario_id, titulo=f"Pergunta {ordem}", codigo=f"t{formulario_id}-{ordem}",
+                ordem=ordem, tipo_pergunta=TipoPerguntaEnum.UNICA_ESCOLHA,
+                opcoes_respostas=[OpcoesRespostasCreate(resposta=f"Opção {n}", ordem=n) for n in range(1, opcoes + 1)],
+            ))
+        return formulario_id
+
+    yield criar
+    for formulario_id in criados:
+        crud.delete_formulario(db, formulario_id)
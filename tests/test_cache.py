@@ -0,0 +1,106 @@
+"""
+Cache de leitura: uma escrita que acontece enquanto uma leitura está no banco
+impede que o valor lido (possivelmente anterior à escrita) seja guardado.
+"""
+import pytest
+from sqlalchemy import select
+
+import app.crud as crud
+from app.cache import CacheLRU, cache, chave_estrutura, chave_formulario, chave_pergunta
+from app.database import SessionLocal
+from app.models import Pergunta
+from app.schemas import FormularioUpdate, PerguntaCreate, TipoPerguntaEnum
+
+
+@pytest.fixture
+def cache_ligado(monkeypatch):
+    monkeypatch.setattr(cache, "maxsize", 100)
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+def test_set_com_marca_anterior_a_invalidacao_e_ignorado():
+    lru = CacheLRU(maxsize=10, ttl=60)
+    marca = lru.marca()
+    lru.invalidate("outra")
+    lru.set("chave", 1, marca)
+    assert lru.get("chave") is None
+    lru.set("chave", 2, lru.marca())
+    assert lru.get("chave") == 2
+
+
+def _escrever_no_meio(monkeypatch, nome: str, escrita):
+    """Faz `crud.<nome>` executar `escrita` (em outra sessão) logo depois da primeira chamada"""
+    original = getattr(crud, nome)
+    pendente = [True]
+
+    def lendo(*args, **kwargs):
+        resultado = original(*args, **kwargs)
+        if not pendente:
+            return resultado
+        pendente.clear()
+        outra = SessionLocal()
+        try:
+            escrita(outra)
+        finally:
+            outra.close()
+        return resultado
+
+    monkeypatch.setattr(crud, nome, lendo)
+
+
+def test_formulario_lido_antes_de_uma_escrita_nao_fica_no_cache(cache_ligado, criar_formulario, db, monkeypatch):
+    formulario_id = criar_formulario(2)
+    _escrever_no_meio(
+        monkeypatch, "get_formulario_completo",
+        lambda outra: crud.update_formulario(outra, formulario_id, FormularioUpdate(titulo="Alterado")),
+    )
+    versao, conteudo = crud.get_formulario_json(db, formulario_id)
+    assert b"Alterado" not in conteudo
+    assert cache.get(chave_formulario(formulario_id)) is None
+
+    monkeypatch.undo()
+    monkeypatch.setattr(cache, "maxsize", 100)
+    versao, conteudo = crud.get_formulario_json(db, formulario_id)
+    assert b"Alterado" in conteudo
+    assert cache.get(chave_formulario(formulario_id)) == (versao, conteudo)
+
+
+def test_pergunta_lida_antes_de_uma_escrita_nao_fica_no_cache(cache_ligado, criar_formulario, db, monkeypatch):
+    formulario_id = criar_formulario(1)
+    pergunta_id = db.scalar(select(Pergunta.id).where(Pergunta.id_formulario == formulario_id))
+    _escrever_no_meio(
+        monkeypatch, "_perguntas_com_opcoes",
+        lambda outra: crud.update_formulario(outra, formulario_id, FormularioUpdate(titulo="Alterado")),
+    )
+    assert crud.get_pergunta_json(db, pergunta_id) is not None
+    assert cache.get(chave_pergunta(pergunta_id)) is None
+
+
+def test_lote_lido_antes_de_uma_escrita_nao_fica_no_cache(cache_ligado, criar_formulario, db, monkeypatch):
+    formulario_id = criar_formulario(2)
+    _escrever_no_meio(
+        monkeypatch, "_formularios_lote_json",
+        lambda outra: crud.update_formulario(outra, formulario_id, FormularioUpdate(titulo="Alterado")),
+    )
+    crud.get_formularios_lote_json(db, [formulario_id])
+    assert cache.get(chave_formulario(formulario_id)) is None
+
+
+def test_estrutura_lida_antes_de_uma_escrita_nao_fica_no_cache(cache_ligado, criar_formulario, db, monkeypatch):
+    formulario_id = criar_formulario(1)
+    _escrever_no_meio(
+        monkeypatch, "montar_estrutura",
+        lambda outra: crud.create_pergunta(outra, PerguntaCreate(
+            id_formulario=formulario_id, titulo="Nova", codigo=f"t{formulario_id}-nova", ordem=99,
+            tipo_pergunta=TipoPerguntaEnum.TEXTO_LIVRE, obrigatoria=True,
+        )),
+    )
+    estrutura = crud.get_estrutura_formulario(db, formulario_id)
+    assert len(estrutura.perguntas) == 1
+    assert cache.get(chave_estrutura(formulario_id)) is None
+
+    monkeypatch.undo()
+    monkeypatch.setattr(cache, "maxsize", 100)
+    assert len(crud.get_estrutura_formulario(db, formulario_id).obrigatorias) == 1
@@ -0,0 +1,103 @@
+"""
+Número de consultas das leituras e escritas que não podem crescer com o
+tamanho do formulário (N+1)
+"""
+from sqlalchemy import func, select
+
+import app.crud as crud
+from app.database import SessionLocal, engine
+from app.models import OpcoesRespostas, Pergunta
+from app.schemas import Formulario, Pergunta as PerguntaSchema
+
+TAMANHOS = (5, 50)
+
+
+def _consultas_arvore(contar_consultas, formulario_id: int) -> int:
+    # Sessão nova: nada no identity map
+    db = SessionLocal()
+    try:
+        with contar_consultas() as consultas:
+            formulario = crud.get_formulario_completo(db, formulario_id)
+            Formulario.model_validate(formulario)  # a serialização não dispara lazy loads
+        return len(consultas)
+    finally:
+        db.close()
+
+
+def test_arvore_do_formulario_em_numero_fixo_de_consultas(criar_formulario, contar_consultas):
+    contagens = {tamanho: _consultas_arvore(contar_consultas, criar_formulario(tamanho)) for tamanho in TAMANHOS}
+    assert contagens[5] == contagens[50] <= 3, contagens
+
+
+def test_json_do_formulario_em_numero_fixo_de_consultas(criar_formulario, contar_consultas, db):
+    contagens = {}
+    for tamanho in TAMANHOS:
+        formulario_id = criar_formulario(tamanho)
+        with contar_consultas() as consultas:
+            versao, conteudo = crud.get_formulario_json(db, formulario_id, usar_cache=False)
+        assert conteudo is not None
+        contagens[tamanho] = len(consultas)
+    assert contagens[5] == contagens[50] <= 3, contagens
+
+
+def test_exclusao_em_cascata_em_numero_fixo_de_consultas(criar_formulario, contar_consultas, db):
+    contagens = {}
+    for tamanho in TAMANHOS:
+        formulario_id = criar_formulario(tamanho)
+        pergunta_id = db.scalar(select(Pergunta.id).where(Pergunta.id_formulario == formulario_id).limit(1))
+        with contar_consultas() as consultas_pergunta:
+            assert crud.delete_pergunta(db, pergunta_id) is not None
+        with contar_consultas() as consultas_formulario:
+            assert crud.delete_formulario(db, formulario_id) is not None
+        contagens[tamanho] = (len(consultas_pergunta), len(consultas_formulario))
+
+        # O banco removeu perguntas e opções junto com o formulário
+        assert db.scalar(select(func.count()).select_from(Pergunta).where(Pergunta.id_formulario == formulario_id)) == 0
+        assert db.scalar(
+            select(func.count()).select_from(OpcoesRespostas)
+            .where(OpcoesRespostas.id_pergunta.notin_(select(Pergunta.id)))
+        ) == 0
+    assert contagens[5] == contagens[50], contagens
+    assert contagens[5][0] <= 2 and contagens[5][1] <= 2, contagens
+
+
+def _problemas_do_plano(plano) -> list:
+    """
+    Equivalente no SQLite da checagem de benchmarks/explain_listagens.py: nenhuma
+    tabela percorrida sem índice e nenhuma ordenação em árvore temporária, a não
+    ser a da página já limitada em uma subconsulta materializada
+    """
+    detalhes = [linha[3] for linha in plano]
+    problemas = [
+        detalhe for detalhe in detalhes
+        if detalhe.startswith("SCAN ") and "USING" not in detalhe and not detalhe.startswith("SCAN anon_")
+    ]
+    if not any(detalhe.startswith("MATERIALIZE") for detalhe in detalhes):
+        problemas += [detalhe for detalhe in detalhes if "TEMP B-TREE" in detalhe]
+    return problemas
+
+
+def test_listagens_usam_indices(criar_formulario, db):
+    from benchmarks.explain_listagens import _capturar, cenarios
+
+    formulario_id = criar_formulario(30)
+    falhas = {}
+    for nome, funcao in cenarios(db, formulario_id):
+        for statement, parameters in _capturar(funcao):
+            with engine.connect() as conn:
+                plano = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+            problemas = _problemas_do_plano(plano)
+            if problemas:
+                falhas[nome] = problemas
+    assert not falhas, falhas
+
+
+def test_json_da_pergunta_igual_ao_schema(criar_formulario, contar_consultas, db):
+    formulario_id = criar_formulario(1, opcoes=5)
+    pergunta_id = db.scalar(select(Pergunta.id).where(Pergunta.id_formulario == formulario_id))
+    with contar_consultas() as consultas:
+        versao, conteudo = crud.get_pergunta_json(db, pergunta_id, usar_cache=False)
+    # versão, pergunta e opções, sem carregar o ORM
+    assert len(consultas) == 3, consultas
+    esperado = PerguntaSchema.model_validate(db.get(Pergunta, pergunta_id)).model_dump_json().encode()
+    assert conteudo == esperado
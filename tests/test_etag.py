@@ -0,0 +1,72 @@
+"""
+GETs condicionais: o 304 traz o mesmo ETag do 200 que ele substitui, com ou
+sem compressão; no streaming, a conexão própria volta ao pool mesmo que o
+cliente desconecte antes da primeira parte.
+"""
+import anyio
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+import app.crud as crud
+from app.etag import resposta_condicional_stream
+from app.main import app
+from app.models import Pergunta
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+@pytest.mark.parametrize("codificacao", ["gzip", "identity"])
+def test_304_traz_o_etag_do_200(client, criar_formulario, db, codificacao):
+    # 50 perguntas: a árvore passa de COMPRESSAO_MIN_BYTES e sai comprimida com gzip
+    formulario_id = criar_formulario(50)
+    pergunta_id = db.scalar(select(Pergunta.id).where(Pergunta.id_formulario == formulario_id).limit(1))
+
+    for url in (f"/api/v1/formularios/{formulario_id}", f"/api/v1/perguntas/{pergunta_id}"):
+        headers = {"Accept-Encoding": codificacao}
+        resposta = client.get(url, headers=headers)
+        assert resposta.status_code == 200
+        etag = resposta.headers["etag"]
+
+        condicional = client.get(url, headers={**headers, "If-None-Match": etag})
+        assert condicional.status_code == 304
+        assert condicional.headers["etag"] == etag
+
+    resposta = client.get(f"/api/v1/formularios/{formulario_id}", headers={"Accept-Encoding": codificacao})
+    assert resposta.headers.get("content-encoding") == ("gzip" if codificacao == "gzip" else None)
+
+
+def _enviar(resposta, desconectar: bool) -> bytes:
+    """Executa a resposta ASGI; com `desconectar`, o cliente já saiu antes da primeira parte"""
+    corpo = []
+
+    async def receive():
+        if not desconectar:
+            await anyio.sleep_forever()
+        return {"type": "http.disconnect"}
+
+    async def send(mensagem):
+        corpo.append(mensagem.get("body", b""))
+
+    anyio.run(resposta, {"type": "http"}, receive, send)
+    return b"".join(corpo)
+
+
+@pytest.mark.parametrize("desconectar", [True, False])
+def test_stream_devolve_a_conexao(criar_formulario, db, desconectar):
+    formulario_id = criar_formulario(3)
+    pool = db.get_bind().pool
+    abertas = pool.checkedout()
+
+    versao, partes, fechar = crud.get_formulario_stream(db, formulario_id, usar_cache=False)
+    assert pool.checkedout() == abertas + 1
+    # `partes` continua referenciado: sem `fechar`, só o coletor de lixo liberaria a conexão
+    corpo = _enviar(resposta_condicional_stream("formulario", formulario_id, versao, partes, fechar), desconectar)
+    assert pool.checkedout() == abertas
+    if not desconectar:
+        assert len(orjson.loads(corpo)["perguntas"]) == 3
@@ -0,0 +1,27 @@
+"""
+Orçamento de conexões (run.py): pool das requisições mais a conexão da
+gravação das respostas, por worker, cabem em DB_MAX_CONNECTIONS.
+"""
+import pytest
+
+import run
+from app.database import DB_CONEXOES_INGESTAO, engine_ingestao
+from app.ingestao import ingestao
+
+
+def test_gravacao_das_respostas_tem_engine_proprio():
+    assert ingestao.engine is engine_ingestao
+    assert engine_ingestao.pool.size() + engine_ingestao.pool._max_overflow == DB_CONEXOES_INGESTAO
+    assert run.CONEXOES_INGESTAO == DB_CONEXOES_INGESTAO
+
+
+@pytest.mark.parametrize("workers, orcamento", [(1, 2), (1, 16), (4, 80), (4, 30), (8, 17), (3, 100)])
+def test_pico_de_conexoes_cabe_no_orcamento(workers, orcamento):
+    pool_size, max_overflow = run.dimensionar_pool(workers, orcamento, pool_size=5, max_overflow=10)
+    assert pool_size >= 1
+    assert workers * (pool_size + max_overflow + run.CONEXOES_INGESTAO) <= orcamento
+
+
+def test_orcamento_sem_espaco_para_a_gravacao():
+    with pytest.raises(ValueError):
+        run.dimensionar_pool(4, 4, pool_size=5, max_overflow=10)
@@ -0,0 +1,191 @@
+"""
+Leitura após escrita: só as rotas marcadas com `@escrita` devolvem o cookie
+`ler_primario`; POSTs que apenas leem ou enviam respostas não desviam o
+cliente das réplicas.
+
+Roteamento: com bancos SQLite temporários como réplicas, cada um com um
+formulário marcador, as listagens mostram qual banco as serviu (rodízio,
+réplica fora do ar, volta ao primário e leitura após escrita).
+"""
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+import app.crud as crud
+import app.database as database
+from app.main import app
+from app.migracoes import migrar
+from app.models import OpcoesRespostas, Pergunta
+from app.replicas import CABECALHO_PRIMARIO, COOKIE_PRIMARIO, MiddlewareLeituraAposEscrita
+from app.schemas import FormularioCreate
+
+
+@pytest.fixture
+def client():
+    with TestClient(MiddlewareLeituraAposEscrita(app, segundos=5)) as cliente:
+        yield cliente
+
+
+def _marcado(resposta) -> bool:
+    return COOKIE_PRIMARIO in resposta.cookies
+
+
+def test_escrita_marca_o_cliente(client, criar_formulario):
+    formulario_id = criar_formulario(1)
+    resposta = client.put(f"/api/v1/formularios/{formulario_id}", json={"titulo": "Alterado"})
+    assert resposta.status_code == 200
+    assert _marcado(resposta)
+
+
+def test_escrita_com_erro_nao_marca(client):
+    resposta = client.delete("/api/v1/formularios/999999999")
+    assert resposta.status_code == 404
+    assert not _marcado(resposta)
+
+
+def test_leitura_em_lote_nao_marca(client, criar_formulario, db):
+    formulario_id = criar_formulario(3)
+    ids = list(db.scalars(select(Pergunta.id).where(Pergunta.id_formulario == formulario_id)))
+
+    resposta = client.post("/api/v1/perguntas/batch", json={"ids": ids})
+    assert resposta.status_code == 200
+    assert len(resposta.json()["items"]) == 3
+    assert not _marcado(resposta)
+
+    # Opções em lote, pelos ids das perguntas
+    resposta = client.post("/api/v1/opcoes-respostas/batch", json={"ids": ids})
+    assert resposta.status_code == 200
+    assert len(resposta.json()["items"]) == 3
+    assert not _marcado(resposta)
+
+
+def test_envio_de_resposta_nao_marca(client, criar_formulario, db):
+    formulario_id = criar_formulario(1)
+    pergunta_id, opcao_id = db.execute(
+        select(Pergunta.id, OpcoesRespostas.id)
+        .join(OpcoesRespostas, OpcoesRespostas.id_pergunta == Pergunta.id)
+        .where(Pergunta.id_formulario == formulario_id)
+        .limit(1)
+    ).one()
+
+    resposta = client.post(
+        f"/api/v1/formularios/{formulario_id}/respostas",
+        json={"valores": [{"id_pergunta": pergunta_id, "id_opcao_resposta": opcao_id}]},
+    )
+    assert resposta.status_code == 202
+    assert not _marcado(resposta)
+
+
+# Roteamento das leituras
+
+MARCADORES = {"primario", "replica1", "replica2"}
+
+
+@pytest.fixture
+def primario(db):
+    """Id do formulário marcador do primário"""
+    formulario_id = crud.create_formulario(db, FormularioCreate(titulo="primario", ordem=0)).id
+    yield formulario_id
+    crud.delete_formulario(db, formulario_id)
+
+
+@pytest.fixture
+def urls_replicas(tmp_path) -> dict:
+    """URL de cada réplica (um diretório por banco, para poder derrubá-la) e de uma inacessível"""
+    urls = {"morta": f"sqlite:///{tmp_path / 'inexistente' / 'banco.db'}"}
+    for nome in ("replica1", "replica2"):
+        (tmp_path / nome).mkdir()
+        urls[nome] = f"sqlite:///{tmp_path / nome / 'banco.db'}"
+        migrar(urls[nome])
+        engine = create_engine(urls[nome])
+        with Session(engine) as sessao:
+            crud.create_formulario(sessao, FormularioCreate(titulo=nome, ordem=0))
+        engine.dispose()
+    return urls
+
+
+@pytest.fixture
+def usar_replicas(monkeypatch, urls_replicas):
+    """Troca as réplicas da aplicação pelas de `nomes`, na ordem dada"""
+    criadas = []
+
+    def usar(*nomes: str):
+        replicas = database._criar_replicas([urls_replicas[nome] for nome in nomes])
+        criadas.append(replicas)
+        monkeypatch.setattr(database, "replicas", replicas)
+        return replicas
+
+    yield usar
+    for replicas in criadas:
+        for engine in replicas.engines:
+            engine.dispose()
+
+
+def _derrubar(replicas, indice: int):
+    """Fecha as conexões da réplica e some com o seu arquivo: os próximos connects falham"""
+    engine = replicas.engines[indice]
+    engine.dispose()
+    diretorio = os.path.dirname(engine.url.database)
+    os.rename(diretorio, diretorio + "-fora")
+
+
+def _servido_por(client, **kwargs) -> str:
+    resposta = client.get("/api/v1/formularios/", params={"limit": 100}, **kwargs)
+    assert resposta.status_code == 200
+    (marcador,) = {formulario["titulo"] for formulario in resposta.json()} & MARCADORES
+    return marcador
+
+
+def test_leituras_em_rodizio_entre_as_replicas(client, primario, usar_replicas):
+    replicas = usar_replicas("replica1", "replica2")
+    assert [_servido_por(client) for _ in range(4)] == ["replica1", "replica2"] * 2
+    assert replicas.leituras == {"replica": 4, "primario": 0, "sem_replica_disponivel": 0}
+
+
+def test_replica_inacessivel_sai_do_rodizio(client, primario, usar_replicas):
+    replicas = usar_replicas("morta", "replica1", "replica2")
+    servidos = [_servido_por(client) for _ in range(6)]
+    assert set(servidos) == {"replica1", "replica2"}
+    assert [replica["falhas"] for replica in replicas.stats()["replicas"]] == [1, 0, 0]
+    assert not replicas.stats()["replicas"][0]["disponivel"]
+
+    # Uma réplica que cai depois de servir leituras também sai do rodízio
+    _derrubar(replicas, 2)
+    assert [_servido_por(client) for _ in range(3)] == ["replica1"] * 3
+    assert [replica["falhas"] for replica in replicas.stats()["replicas"]] == [1, 0, 1]
+
+
+def test_sem_replicas_disponiveis_le_do_primario(client, primario, usar_replicas):
+    replicas = usar_replicas("morta")
+    assert _servido_por(client) == "primario"
+    assert replicas.leituras["sem_replica_disponivel"] == 1
+
+    replicas = usar_replicas("replica1")
+    assert _servido_por(client) == "replica1"
+    _derrubar(replicas, 0)
+    assert _servido_por(client) == "primario"
+    assert replicas.leituras == {"replica": 1, "primario": 0, "sem_replica_disponivel": 1}
+
+
+def test_leitura_apos_escrita_vai_para_o_primario(client, primario, usar_replicas):
+    replicas = usar_replicas("replica1", "replica2")
+    assert _servido_por(client) == "replica1"
+
+    resposta = client.put(f"/api/v1/formularios/{primario}", json={"ordem": 1})
+    assert resposta.status_code == 200 and _marcado(resposta)
+    # O TestClient guarda o cookie, como um navegador
+    assert [_servido_por(client) for _ in range(2)] == ["primario"] * 2
+
+    client.cookies.clear()
+    assert _servido_por(client) == "replica2"
+    assert _servido_por(client, headers={CABECALHO_PRIMARIO: "1"}) == "primario"
+
+    # Com o cookie, o primário serve a leitura mesmo com as réplicas fora do ar
+    _derrubar(replicas, 0)
+    _derrubar(replicas, 1)
+    client.put(f"/api/v1/formularios/{primario}", json={"ordem": 2})
+    assert _servido_por(client) == "primario"
+    assert replicas.leituras == {"replica": 2, "primario": 4, "sem_replica_disponivel": 0}
@@ -0,0 +1,47 @@
+"""
+Validação das submissões de `POST /formularios/{id}/respostas` (app/ingestao.py)
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.main import app
+from app.models import OpcoesRespostas, Pergunta
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def pergunta_de_escolha(criar_formulario, db):
+    """(formulario_id, pergunta_id, opcao_id) de um formulário com uma pergunta `unica_escolha`"""
+    formulario_id = criar_formulario(1)
+    pergunta_id, opcao_id = db.execute(
+        select(Pergunta.id, OpcoesRespostas.id)
+        .join(OpcoesRespostas, OpcoesRespostas.id_pergunta == Pergunta.id)
+        .where(Pergunta.id_formulario == formulario_id)
+        .limit(1)
+    ).one()
+    return formulario_id, pergunta_id, opcao_id
+
+
+def test_pergunta_de_escolha_sem_opcao_e_recusada(client, pergunta_de_escolha):
+    formulario_id, pergunta_id, _ = pergunta_de_escolha
+    resposta = client.post(
+        f"/api/v1/formularios/{formulario_id}/respostas",
+        json={"valores": [{"id_pergunta": pergunta_id, "valor": "Qualquer texto"}]},
+    )
+    assert resposta.status_code == 400
+    assert "id_opcao_resposta" in resposta.json()["detail"]
+
+
+def test_pergunta_de_escolha_com_opcao_e_aceita(client, pergunta_de_escolha):
+    formulario_id, pergunta_id, opcao_id = pergunta_de_escolha
+    resposta = client.post(
+        f"/api/v1/formularios/{formulario_id}/respostas",
+        json={"valores": [{"id_pergunta": pergunta_id, "id_opcao_resposta": opcao_id, "valor": "Complemento"}]},
+    )
+    assert resposta.status_code == 202
@@ -0,0 +1,72 @@
+"""
+Script para exportar e importar formulários entre ambientes em NDJSON
+
+Uso:
+    python transferir_formularios.py exportar formularios.ndjson
+    python transferir_formularios.py importar formularios.ndjson [--lote 1000]
+
+Use "-" como arquivo para ler da entrada padrão ou escrever na saída padrão.
+"""
+import argparse
+import os
+import sys
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.transferencia import TAMANHO_LOTE, exportar_ndjson, importar_ndjson
+
+
+def exportar(caminho: str):
+    db = SessionLocal()
+    saida = sys.stdout if caminho == "-" else open(caminho, "w", encoding="utf-8")
+    try:
+        linhas = 0
+        for linha in exportar_ndjson(db):
+            saida.write(linha + "\n")
+            linhas += 1
+        print(f"{linhas} linhas exportadas", file=sys.stderr)
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+        db.close()
+
+
+def importar(caminho: str, tamanho_lote: int):
+    db = SessionLocal()
+    entrada = sys.stdin if caminho == "-" else open(caminho, encoding="utf-8")
+    try:
+        inicio = time.perf_counter()
+        resultado = importar_ndjson(db, entrada, tamanho_lote=tamanho_lote)
+        duracao = time.perf_counter() - inicio
+
+        print(f"Importação concluída em {duracao:.1f}s ({resultado['linhas'] / max(duracao, 1e-9):.0f} linhas/s)")
+        for chave, valor in resultado.items():
+            if chave != "primeiros_erros":
+                print(f"  {chave}: {valor}")
+        for erro in resultado["primeiros_erros"]:
+            print(f"  linha {erro['linha']}: {erro['detail']}")
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta/importa formulários em NDJSON")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    parser_exportar = subparsers.add_parser("exportar", help="Exporta todos os formulários")
+    parser_exportar.add_argument("arquivo")
+
+    parser_importar = subparsers.add_parser("importar", help="Importa formulários (upsert por código de pergunta)")
+    parser_importar.add_argument("arquivo")
+    parser_importar.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="Perguntas por transação")
+
+    args = parser.parse_args()
+    if args.comando == "exportar":
+        exportar(args.arquivo)
+    else:
+        importar(args.arquivo, args.lote)